@@ -0,0 +1,232 @@
+"""Набор бенчмарков для горячих участков симуляции и обработки контуров
+
+Результаты сохраняются в JSON; команда сравнения отмечает замедления
+сверх допустимого относительного порога.
+"""
+import json
+import platform
+import time
+
+import numpy as np
+
+from drone_simulation import DroneSwarm
+
+
+DRONE_COUNTS = (10, 100, 1000, 10000, 100000)
+CONTOUR_SIZES = (10, 1000, 100000, 1000000)
+SHAPES = ("circle", "star", "polygon")
+
+# Полный попарный перебор слишком медленный для больших роев
+BRUTE_FORCE_LIMIT = 5000
+
+
+# ------------------------------------------------------------
+# синтетические формации
+
+def shape_outline(shape, num_points, radius=50.0, seed=0):
+    """Замкнутый 2D контур заданной формы из num_points точек"""
+    angles = np.linspace(0.0, 2.0 * np.pi, num_points, endpoint=False)
+
+    if shape == "circle":
+        radii = np.full(num_points, radius)
+    elif shape == "star":
+        # Пятилучевая звезда: радиус меняется между вершинами и впадинами
+        radii = radius * (0.6 + 0.4 * np.cos(5.0 * angles))
+    elif shape == "polygon":
+        rng = np.random.default_rng(seed)
+        vertices = rng.uniform(0.5, 1.0, size=12) * radius
+        vertex_angles = np.linspace(0.0, 2.0 * np.pi, 13)
+        radii = np.interp(angles, vertex_angles, np.r_[vertices, vertices[0]])
+    else:
+        raise ValueError(f"Неизвестная форма: {shape}")
+
+    return np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])
+
+
+def shape_targets(shape, num_points, radius=50.0, seed=0):
+    """Целевые 3D точки формации (x - восток, y - высота, z - север)"""
+    outline = shape_outline(shape, num_points, radius, seed)
+    return np.column_stack([outline[:, 0], np.zeros(num_points), -outline[:, 1]])
+
+
+def shape_contour(shape, num_points, image_size=4096, seed=0):
+    """Контур в пиксельных координатах в формате OpenCV (N, 1, 2)"""
+    outline = shape_outline(shape, num_points, image_size * 0.4, seed)
+    pixels = np.round(outline + image_size / 2).astype(np.int32)
+    return pixels.reshape(-1, 1, 2)
+
+
+# ------------------------------------------------------------
+# измерение
+
+def measure(func, setup=None, repeats=5, budget=2.0):
+    """Время одного вызова func: не более repeats замеров или budget секунд"""
+    state = setup() if setup else None
+    func(state)  # прогрев
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeats:
+        t0 = time.perf_counter()
+        func(state)
+        samples.append(time.perf_counter() - t0)
+        if time.perf_counter() - started > budget:
+            break
+
+    samples = np.array(samples)
+    return {
+        "min": float(samples.min()),
+        "median": float(np.median(samples)),
+        "mean": float(samples.mean()),
+        "repeats": int(len(samples)),
+    }
+
+
+def make_swarm(shape, num_drones):
+    return DroneSwarm(num_drones, shape_targets(shape, num_drones), seed=0)
+
+
+def make_clustered_swarm(shape, num_drones):
+    """Рой, стартующий с одной площадки: все дроны в шаре радиусом около 1 м"""
+    swarm = make_swarm(shape, num_drones)
+    swarm.positions[:] = np.random.default_rng(0).normal(0.0, 0.5, size=(num_drones, 3))
+    swarm.best_positions[:] = swarm.positions
+    return swarm
+
+
+def drift_and_separate(swarm):
+    """Малый сдвиг всех дронов и расчет отталкивания по спискам Верле
+
+    Сдвиг за вызов (по каждой оси skin / 40) накапливается, и списки
+    перестраиваются примерно раз в 12 вызовов, как между шагами симуляции:
+    среднее время включает и переиспользование, и перестроение.
+    """
+    swarm.positions += swarm.verlet_skin / 40.0
+    return swarm.compute_separation_verlet()
+
+
+def swarm_cases(drone_counts, shapes):
+    """Случаи для DroneSwarm: шаг, назначение целей, отталкивание"""
+    for shape in shapes:
+        for n in drone_counts:
+            yield (
+                f"swarm_update/{shape}/n={n}",
+                lambda shape=shape, n=n: make_swarm(shape, n),
+                lambda swarm: swarm.update_positions(),
+            )
+            yield (
+                f"assign_targets/{shape}/n={n}",
+                lambda shape=shape, n=n: make_swarm(shape, n),
+                lambda swarm: swarm.assign_targets_dynamically(),
+            )
+            yield (
+                f"assign_clustered/{shape}/n={n}",
+                lambda shape=shape, n=n: make_clustered_swarm(shape, n),
+                lambda swarm: swarm.assign_targets_dynamically(),
+            )
+            yield (
+                f"separation_grid/{shape}/n={n}",
+                lambda shape=shape, n=n: make_swarm(shape, n),
+                lambda swarm: swarm.compute_separation_grid(),
+            )
+            yield (
+                f"separation_verlet/{shape}/n={n}",
+                lambda shape=shape, n=n: make_swarm(shape, n),
+                lambda swarm: swarm.compute_separation_verlet(),
+            )
+            yield (
+                f"separation_verlet_steps/{shape}/n={n}",
+                lambda shape=shape, n=n: make_swarm(shape, n),
+                drift_and_separate,
+            )
+            yield (
+                f"verlet_rebuild/{shape}/n={n}",
+                lambda shape=shape, n=n: make_swarm(shape, n),
+                lambda swarm: swarm.verlet_list.build(swarm.positions),
+            )
+            if n <= BRUTE_FORCE_LIMIT:
+                yield (
+                    f"separation_brute/{shape}/n={n}",
+                    lambda shape=shape, n=n: make_swarm(shape, n),
+                    lambda swarm: swarm.compute_separation_all(),
+                )
+
+
+def contour_cases(contour_sizes, shapes):
+    """Случаи для ImageProcessor: contour_to_3d и distribute_points_evenly"""
+    # OpenCV нужен только для этих случаев
+    from image_processor import ImageProcessor
+
+    def make_processor(shape, size):
+        processor = ImageProcessor()
+        processor.image_shape = (4096, 4096)
+        contour = shape_contour(shape, size)
+        processor.contour_points = np.asarray(processor.contour_to_3d(contour))
+        return processor, contour
+
+    for shape in shapes:
+        for size in contour_sizes:
+            yield (
+                f"contour_to_3d/{shape}/points={size}",
+                lambda shape=shape, size=size: make_processor(shape, size),
+                lambda state: state[0].contour_to_3d(state[1]),
+            )
+            yield (
+                f"distribute_evenly/{shape}/points={size}",
+                lambda shape=shape, size=size: make_processor(shape, size),
+                lambda state, size=size: state[0].distribute_points_evenly(max(2, size // 10)),
+            )
+
+
+def run_benchmarks(drone_counts=DRONE_COUNTS, contour_sizes=CONTOUR_SIZES, shapes=SHAPES,
+                   repeats=5, budget=2.0, pattern=None, log=print):
+    """Прогон всех случаев; pattern - подстрока для отбора случаев"""
+    cases = list(swarm_cases(drone_counts, shapes))
+    try:
+        cases += list(contour_cases(contour_sizes, shapes))
+    except ImportError as e:
+        log(f"пропуск бенчмарков контуров: {e}")
+
+    results = {}
+    for name, setup, func in cases:
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(func, setup, repeats, budget)
+        if log:
+            log(f"{name:45s} {results[name]['median'] * 1e3:12.3f} мс")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, tolerance=0.1):
+    """Сравнение медиан; замедление больше tolerance считается регрессией
+
+    Возвращает список строк (имя, базовое время, текущее, отношение, регрессия).
+    """
+    rows = []
+    base = baseline["results"]
+    for name, result in current["results"].items():
+        if name not in base:
+            continue
+        ratio = result["median"] / base[name]["median"] if base[name]["median"] > 0 else float("inf")
+        rows.append((name, base[name]["median"], result["median"], ratio, ratio > 1.0 + tolerance))
+    return rows
@@ -1,170 +1,540 @@
+from collections import namedtuple
+
 import numpy as np
-from dataclasses import dataclass
 
+from profiling import PhaseProfiler
+from spatial_index import SpatialGrid, VerletList
+from target_assignment import TargetAssigner
+
+
+# Снимок состояния роя для отрисовки и экспорта: виды только для чтения
+# на массивы N×3 позиций и целей, идентификаторы и номер поколения.
+# Поколение меняется при каждом изменении позиций или целей.
+DroneState = namedtuple("DroneState", ("positions", "target_positions", "ids", "generation"))
 
-@dataclass
-class Drone:
-    position: np.ndarray
-    velocity: np.ndarray
-    best_position: np.ndarray
-    target_position: np.ndarray
-    best_fitness: float
-    current_target_index: int = -1
-    is_dragging: bool = False
-    id: int = 0
+# Значения параметров PSO по умолчанию (общие для роя и ансамбля)
+PSO_DEFAULTS = {
+    "inertia_weight": 0.6,
+    "cognitive_param": 1.2,
+    "social_param": 1.4,
+    "max_velocity": 1.5,
+    "slowdown_factor": 0.15,
+    "personal_space": 2.0,
+    "separation_weight": 1.0,
+}
+
+
+def read_only(array):
+    """Вид на массив без права записи (без копирования)"""
+    view = array.view()
+    view.flags.writeable = False
+    return view
 
 
 class DroneSwarm:
-    """Класс управления роем дронов"""
+    """Класс управления роем дронов
+
+    Состояние роя хранится в виде непрерывных массивов (structure of arrays):
+    позиции, скорости, лучшие позиции и цели - массивы N×3, приспособленность,
+    индексы целей и флаги перетаскивания - массивы длины N. Один шаг PSO
+    выполняется несколькими векторизованными операциями над всем роем.
+    """
 
-    def __init__(self, num_drones, target_points):
+    def __init__(self, num_drones, target_points, seed=None):
         self.num_drones = num_drones
-        self.target_points = np.array(target_points)
-        self.drones = []
+        self.target_points = np.array(target_points, dtype=float).reshape(-1, 3)
+
+        # Собственный генератор: прогоны с одинаковым seed воспроизводимы побитно
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
 
         # Параметры PSO
-        self.inertia_weight = 0.6
-        self.cognitive_param = 1.2
-        self.social_param = 1.4
+        self.inertia_weight = PSO_DEFAULTS["inertia_weight"]
+        self.cognitive_param = PSO_DEFAULTS["cognitive_param"]
+        self.social_param = PSO_DEFAULTS["social_param"]
 
         # Скорость движения
-        self.max_velocity = 1.5
-        self.slowdown_factor = 0.15
+        self.max_velocity = PSO_DEFAULTS["max_velocity"]
+        self.slowdown_factor = PSO_DEFAULTS["slowdown_factor"]
 
         # Личное пространство
-        self.personal_space = 2.0
-        self.separation_weight = 1.0
+        self.personal_space = PSO_DEFAULTS["personal_space"]
+        self.separation_weight = PSO_DEFAULTS["separation_weight"]
+
+        # Расчет отталкивания: "verlet" - списки соседей, переиспользуемые
+        # между шагами, "grid" - через сетку ячеек на каждом шаге,
+        # "brute" - полный попарный перебор (эталонная реализация)
+        self.separation_mode = "verlet"
+        self.separation_block_size = 256
+        self.spatial_grid = SpatialGrid(self.personal_space)
+
+        # Запас списков Верле: списки перестраиваются, только когда какой-либо
+        # дрон сместился больше чем на verlet_skin / 2
+        self.verlet_skin = 1.0
+        self.verlet_list = VerletList(self.personal_space, self.verlet_skin)
+
+        # Назначение целей: "auto", "optimal", "auction", "nearest", "greedy"
+        self.target_assigner = TargetAssigner("auto")
+
+        # Инкрементальное переназначение: "incremental" - заново решаются только
+        # дроны, чье расстояние до цели превысило расстояние до ближайшей цели
+        # в reassign_hysteresis раз (и раз в reassign_interval шагов - все
+        # бодрствующие); "every_tick" - полное решение на каждом шаге
+        self.assignment_policy = "incremental"
+        self.reassign_hysteresis = 1.5
+        self.reassign_interval = 50
+        self.step_count = 0
+        self.targets_changed = True
+        self.assignment_stats = {
+            "step": 0,
+            "full": False,
+            "candidates": 0,
+            "reassigned": 0,
+            "total_reassigned": 0
+        }
+
+        # Активное множество: дроны, чьи скорость и ошибка ниже порогов
+        # в течение sleep_ticks шагов, замораживаются до пробуждения
+        # (работает с расчетом отталкивания через сетку). В плотной формации
+        # отталкивание держит дронов в стороне от целей и не дает скорости
+        # затухнуть, поэтому спокойным считается и дрон ближе personal_space
+        # к цели, не отошедший за эти шаги дальше sleep_drift от точки начала
+        self.sleep_enabled = True
+        self.sleep_speed = 0.05
+        self.sleep_error = 0.05
+        self.sleep_drift = 0.5
+        self.sleep_ticks = 30
+        self.sleeper_grid = SpatialGrid(self.personal_space)
+        self.sleepers_changed = True
+        self.active_count = 0
+
+        # Номер поколения состояния для get_state
+        self.generation = 0
+
+        # Замер фаз шага (по умолчанию выключен)
+        self.profiler = PhaseProfiler()
 
         # Создание дронов
         self.random_distribute_drones()
 
     # ------------------------------------------------------------
 
-    def random_distribute_drones(self):
-        self.drones = []
+    def _allocate_state(self, count):
+        """Выделение массивов состояния роя"""
+        self.positions = np.zeros((count, 3))
+        self.velocities = np.zeros((count, 3))
+        self.best_positions = np.zeros((count, 3))
+        self.target_positions = np.zeros((count, 3))
+        self.best_fitness = np.zeros(count)
+        self.target_indices = np.full(count, -1, dtype=np.int64)
+        self.dragging = np.zeros(count, dtype=bool)
+        self.sleeping = np.zeros(count, dtype=bool)
+        self.calm_ticks = np.zeros(count, dtype=np.int64)
+        self.calm_anchor = np.zeros((count, 3))
+        self.sleeper_index = np.zeros(0, dtype=np.int64)
+        self.ids = np.arange(count, dtype=np.int64)
+        self.sleepers_changed = True
+        self.generation += 1
 
+    def random_distribute_drones(self):
         if len(self.target_points) == 0:
+            self._allocate_state(0)
             return
 
+        self._allocate_state(self.num_drones)
+
         min_vals = self.target_points.min(axis=0) - 50
         max_vals = self.target_points.max(axis=0) + 50
 
-        for i in range(self.num_drones):
-            pos = np.array([
-                np.random.uniform(min_vals[0], max_vals[0]),
-                np.random.uniform(min_vals[1], max_vals[1]),
-                np.random.uniform(min_vals[2], max_vals[2])
-            ])
-
-            drone = Drone(
-                position=pos,
-                velocity=np.zeros(3),
-                best_position=pos.copy(),
-                target_position=self.target_points[i % len(self.target_points)],
-                best_fitness=np.linalg.norm(pos - self.target_points[i % len(self.target_points)]),
-                id=i
-            )
-            self.drones.append(drone)
+        self.positions[:] = self.rng.uniform(min_vals, max_vals, size=(self.num_drones, 3))
+        self.best_positions[:] = self.positions
+
+        cyclic = np.arange(self.num_drones) % len(self.target_points)
+        self.target_positions[:] = self.target_points[cyclic]
+        self.best_fitness[:] = np.linalg.norm(self.positions - self.target_positions, axis=1)
 
     # ------------------------------------------------------------
 
     def assign_targets_dynamically(self):
-        """Каждый дрон выбирает ближайшую свободную цель"""
+        """Назначение целей дронам выбранным режимом TargetAssigner"""
 
         if len(self.target_points) == 0:
             return
 
-        occupied = set()
+        indices = self.target_assigner.assign(self.positions, self.target_points)
+        self._apply_assignment(indices, full=True)
 
-        # сначала сбрасываем текущие цели
-        for drone in self.drones:
-            drone.current_target_index = -1
+    def reassign_targets(self, mode="auto"):
+        """Полное перераспределение целей
 
-        for drone in self.drones:
-            min_dist = float("inf")
-            best_idx = -1
+        В режиме "auto" точное решение (минимум суммарного расстояния)
+        применяется, пока позволяет optimal_limit; "optimal" требует его
+        при любом размере роя.
+        """
 
-            for idx, target in enumerate(self.target_points):
-                if idx in occupied:
-                    continue
-                dist = np.linalg.norm(drone.position - target)
-                if dist < min_dist:
-                    min_dist = dist
-                    best_idx = idx
+        if len(self.target_points) == 0:
+            return
+
+        indices = self.target_assigner.assign(self.positions, self.target_points, mode=mode)
+        self._apply_assignment(indices, full=True)
+
+    def set_target_points(self, target_points):
+        """Замена набора целей; назначение будет решено заново на следующем шаге"""
+        self.target_points = np.array(target_points, dtype=float).reshape(-1, 3)
+        self.targets_changed = True
+
+    def stale_assignments(self):
+        """Индексы дронов, назначение которых нужно пересмотреть"""
+        # Спящие дроны стоят у своих целей, проверяются только активные
+        awake = np.flatnonzero(~self.sleeping & (self.target_indices >= 0))
+        current = np.linalg.norm(self.positions[awake] - self.target_positions[awake], axis=1)
+        nearest = self.target_assigner.nearest_target_distance(
+            self.positions[awake], self.target_points
+        )
+
+        # Дрон уже у цели (в пределах личного пространства) не пересматривается
+        stale = (current > self.personal_space) & (current > self.reassign_hysteresis * nearest)
+        stale = awake[stale]
 
-            if best_idx != -1:
-                drone.current_target_index = best_idx
-                drone.target_position = self.target_points[best_idx]
-                occupied.add(best_idx)
+        # Свободные дроны участвуют, только пока есть свободные цели
+        unassigned = np.flatnonzero(self.target_indices < 0)
+        if len(unassigned) > 0 and len(self.positions) - len(unassigned) < len(self.target_points):
+            stale = np.union1d(stale, unassigned)
+
+        return stale
+
+    def update_assignment(self):
+        """Назначение целей на очередном шаге с учетом политики переназначения"""
+
+        if len(self.target_points) == 0:
+            return
+
+        if self.assignment_policy == "every_tick" or self.targets_changed:
+            self.assign_targets_dynamically()
+            return
+
+        # Периодически пересматриваются все бодрствующие дроны (спящие
+        # стоят у своих целей), так что цена не растет с размером роя
+        candidates = self.stale_assignments()
+        if self.reassign_interval and self.step_count % self.reassign_interval == 0:
+            awake = np.flatnonzero(~self.sleeping & (self.target_indices >= 0))
+            candidates = np.union1d(candidates, awake)
+        if len(candidates) == 0:
+            self._record_assignment(False, 0, 0)
+            return
+
+        # Кандидаты делят между собой свои цели и все незанятые
+        held = np.zeros(len(self.target_points), dtype=bool)
+        keep = np.ones(len(self.positions), dtype=bool)
+        keep[candidates] = False
+        kept = self.target_indices[keep]
+        held[kept[kept >= 0]] = True
+        free_targets = np.flatnonzero(~held)
+
+        # Решатель выбирается по размеру всей задачи: иначе в режиме auto
+        # сотни кандидатов, остающихся устаревшими, решались бы точно
+        # (плотная матрица) на каждом шаге
+        mode = self.target_assigner.resolve_mode(len(self.positions), len(self.target_points))
+        sub = self.target_assigner.assign(
+            self.positions[candidates], self.target_points[free_targets], mode=mode
+        )
+
+        indices = self.target_indices.copy()
+        indices[candidates] = np.where(sub >= 0, free_targets[np.maximum(sub, 0)], -1)
+        self._apply_assignment(indices, full=False, candidates=len(candidates))
+
+    def _apply_assignment(self, indices, full, candidates=None):
+        """Применение назначения; дроны без цели сохраняют прежнюю"""
+        assigned = indices >= 0
+        changed = assigned & (indices != self.target_indices)
+        if self.targets_changed:
+            # При смене набора целей прежние индексы ничего не значат
+            changed = assigned
+
+        self.target_indices[:] = indices
+        self.target_positions[assigned] = self.target_points[indices[assigned]]
+
+        # Личный лучший результат имеет смысл только относительно своей цели
+        self.best_positions[changed] = self.positions[changed]
+        self.best_fitness[changed] = np.linalg.norm(
+            self.positions[changed] - self.target_positions[changed], axis=1
+        )
+        self.wake(np.flatnonzero(changed))
+        if changed.any():
+            self.generation += 1
+
+        if full:
+            self.targets_changed = False
+        if candidates is None:
+            candidates = len(indices)
+        self._record_assignment(full, candidates, int(changed.sum()))
+
+    def _record_assignment(self, full, candidates, reassigned):
+        """Счетчики переназначения за текущий шаг"""
+        self.assignment_stats["step"] = self.step_count
+        self.assignment_stats["full"] = full
+        self.assignment_stats["candidates"] = candidates
+        self.assignment_stats["reassigned"] = reassigned
+        self.assignment_stats["total_reassigned"] += reassigned
 
     # ------------------------------------------------------------
 
-    def compute_separation(self, drone):
-        """Сила отталкивания от соседних дронов"""
-        separation = np.zeros(3)
+    def compute_separation(self, drone_index):
+        """Сила отталкивания от соседних дронов (для одного дрона)"""
+        diff = self.positions[drone_index] - self.positions
+        dist = np.linalg.norm(diff, axis=1)
+
+        mask = (dist > 0) & (dist < self.personal_space)
+        mask[drone_index] = False
+
+        push = (self.personal_space - dist[mask]) / dist[mask]
+        separation = (diff[mask] * push[:, None]).sum(axis=0)
+
+        return separation * self.separation_weight
+
+    def compute_separation_all(self):
+        """Силы отталкивания для всего роя полным попарным перебором"""
+        count = len(self.positions)
+        separation = np.zeros((count, 3))
+
+        for start in range(0, count, self.separation_block_size):
+            stop = min(start + self.separation_block_size, count)
 
-        for other in self.drones:
-            if other is drone:
-                continue
+            diff = self.positions[start:stop, None, :] - self.positions[None, :, :]
+            dist = np.linalg.norm(diff, axis=2)
 
-            diff = drone.position - other.position
-            dist = np.linalg.norm(diff)
+            # Нулевое расстояние (в том числе до самого себя) не учитывается
+            mask = (dist > 0) & (dist < self.personal_space)
+            push = np.where(mask, self.personal_space - dist, 0.0)
+            push = np.divide(push, dist, out=np.zeros_like(push), where=mask)
 
-            if 0 < dist < self.personal_space:
-                separation += (diff / dist) * (self.personal_space - dist)
+            separation[start:stop] = np.einsum("ij,ijk->ik", push, diff)
 
         return separation * self.separation_weight
 
-    # ------------------------------------------------------------
+    def compute_separation_grid(self):
+        """Силы отталкивания для всего роя только по соседним ячейкам сетки"""
+        count = len(self.positions)
+        self.spatial_grid.cell_size = self.personal_space
+        pair_i, pair_j = self.spatial_grid.query_pairs(self.positions, self.personal_space)
+
+        return self._separation_from_pairs(pair_i, pair_j, pair_i, count)
+
+    def compute_separation_awake(self, awake, wakers):
+        """Силы отталкивания для бодрствующих дронов (в порядке awake)
+
+        Спящие дроны хранятся в отдельной сетке, которая перестраивается только
+        при изменении множества спящих. Спящие соседи в личном пространстве
+        дронов из маски wakers пробуждаются.
+        """
+        self.spatial_grid.cell_size = self.personal_space
+        local_i, local_j = self.spatial_grid.query_pairs(self.positions[awake], self.personal_space)
+
+        if self.sleepers_changed:
+            self.sleeper_index = np.flatnonzero(self.sleeping)
+            self.sleeper_grid.cell_size = self.personal_space
+            self.sleeper_grid.build(self.positions[self.sleeper_index])
+            self.sleepers_changed = False
+
+        query_i, sleeper_j = self.sleeper_grid.query_points(self.positions[awake], self.personal_space)
+        touched = self.sleeper_index[sleeper_j]
+
+        pair_i = np.concatenate([awake[local_i], awake[query_i]])
+        pair_j = np.concatenate([awake[local_j], touched])
+        owners = np.concatenate([local_i, query_i])
+        separation = self._separation_from_pairs(pair_i, pair_j, owners, len(awake))
+
+        self.wake(np.unique(touched[wakers[query_i]]))
+        return separation
+
+    def compute_separation_verlet(self, awake=None, wakers=None):
+        """Силы отталкивания по спискам Верле (в порядке awake)
+
+        Списки строятся по всем дронам, включая спящих, и перестраиваются
+        только после смещения какого-либо дрона больше чем на verlet_skin / 2.
+        Спящие соседи в личном пространстве дронов из маски wakers
+        пробуждаются.
+        """
+        if awake is None:
+            awake = np.arange(len(self.positions))
+
+        verlet = self.verlet_list
+        verlet.cutoff = self.personal_space
+        verlet.skin = self.verlet_skin
+        if verlet.needs_rebuild(self.positions):
+            verlet.build(self.positions)
+
+        owners, pair_j = verlet.pairs_for(awake)
+        pair_i = awake[owners]
+        separation = self._separation_from_pairs(pair_i, pair_j, owners, len(awake))
+
+        if wakers is not None:
+            candidates = self.sleeping[pair_j] & wakers[owners]
+            diff = self.positions[pair_i[candidates]] - self.positions[pair_j[candidates]]
+            close = np.einsum("ij,ij->i", diff, diff) < self.personal_space ** 2
+            self.wake(np.unique(pair_j[candidates][close]))
+
+        return separation
+
+    def _separation_from_pairs(self, pair_i, pair_j, owners, count):
+        """Суммирование отталкивания по списку направленных пар
+
+        owners - номер строки результата, в которую идет вклад пары.
+        """
+        diff = self.positions[pair_i] - self.positions[pair_j]
+        dist = np.linalg.norm(diff, axis=1)
+
+        mask = (dist > 0) & (dist < self.personal_space)
+        push = (self.personal_space - dist[mask]) / dist[mask]
+        contrib = diff[mask] * push[:, None]
+        owners = owners[mask]
+
+        separation = np.empty((count, 3))
+        for axis in range(3):
+            separation[:, axis] = np.bincount(owners, weights=contrib[:, axis], minlength=count)
 
-    def update_positions(self):
-        """Основной шаг симуляции"""
+        return separation * self.separation_weight
 
-        # Назначаем ближайшие свободные цели
-        self.assign_targets_dynamically()
+    def compute_separation_forces(self):
+        """Силы отталкивания для всего роя выбранным способом"""
+        if self.separation_mode == "brute":
+            return self.compute_separation_all()
+        if self.separation_mode == "verlet":
+            return self.compute_separation_verlet()
+        return self.compute_separation_grid()
+
+    # ------------------------------------------------------------
 
-        for drone in self.drones:
-            if drone.is_dragging:
-                continue
+    def wake(self, indices):
+        """Пробуждение спящих дронов"""
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0:
+            return
+        self.calm_ticks[indices] = 0
+        self.calm_anchor[indices] = self.positions[indices]
+        if self.sleeping[indices].any():
+            self.sleeping[indices] = False
+            self.sleepers_changed = True
+
+    def _update_sleep(self, moving, speed, error):
+        """Усыпление дронов, которые sleep_ticks шагов стоят у цели"""
+        positions = self.positions[moving]
+        drift = positions - self.calm_anchor[moving]
+        held = (
+            (np.einsum("ij,ij->i", drift, drift) < self.sleep_drift ** 2) &
+            (error < self.personal_space)
+        )
+        calm = ((speed < self.sleep_speed) & (error < self.sleep_error)) | held
+        self.calm_ticks[moving] = np.where(calm, self.calm_ticks[moving] + 1, 0)
+
+        # Отсчет смещения начинается заново с последнего неспокойного шага
+        restart = moving[~calm]
+        self.calm_anchor[restart] = positions[~calm]
+
+        asleep = moving[self.calm_ticks[moving] >= self.sleep_ticks]
+        if len(asleep) > 0:
+            self.sleeping[asleep] = True
+            self.velocities[asleep] = 0.0
+            self.sleepers_changed = True
 
-            r1 = np.random.random(3)
-            r2 = np.random.random(3)
+    def update_positions(self):
+        """Основной шаг симуляции (только для бодрствующих дронов)"""
 
-            cognitive = self.cognitive_param * r1 * (drone.best_position - drone.position)
-            social = self.social_param * r2 * (drone.target_position - drone.position)
-            separation = self.compute_separation(drone)
+        profiler = self.profiler
 
-            drone.velocity = (
-                self.inertia_weight * drone.velocity +
-                cognitive +
-                social +
-                separation
-            )
+        # Назначаем цели
+        with profiler.phase("assignment"):
+            self.update_assignment()
+        self.step_count += 1
 
-            # Ограничение скорости
-            speed = np.linalg.norm(drone.velocity)
-            if speed > self.max_velocity:
-                drone.velocity = drone.velocity / speed * self.max_velocity
+        use_sleep = self.sleep_enabled and self.separation_mode in ("grid", "verlet")
+        if not use_sleep and self.sleeping.any():
+            self.wake(np.flatnonzero(self.sleeping))
 
-            # Перемещение
-            drone.position += drone.velocity * self.slowdown_factor
+        awake = np.flatnonzero(~self.sleeping)
+        free = ~self.dragging[awake]
+        moving = awake[free]
+        self.active_count = len(moving)
+        # Перетаскиваемые дроны не двигаются сами, но будят соседей
+        if len(moving) == 0 and not (use_sleep and len(awake) > 0):
+            return
 
-            # Обновление личного лучшего
-            fitness = np.linalg.norm(drone.position - drone.target_position)
-            if fitness < drone.best_fitness:
-                drone.best_fitness = fitness
-                drone.best_position = drone.position.copy()
+        with profiler.phase("separation"):
+            if use_sleep:
+                # Будят соседей только движущиеся и перетаскиваемые дроны
+                wakers = (self.calm_ticks[awake] == 0) | ~free
+                if self.separation_mode == "verlet":
+                    separation = self.compute_separation_verlet(awake, wakers)[free]
+                else:
+                    separation = self.compute_separation_awake(awake, wakers)[free]
+            else:
+                separation = self.compute_separation_forces()[moving]
+
+        if len(moving) == 0:
+            return
+        with profiler.phase("integration"):
+            self._integrate(moving, separation, use_sleep)
+
+    def _integrate(self, moving, separation, use_sleep):
+        """Шаг PSO для движущихся дронов"""
+        positions = self.positions[moving]
+
+        # Коэффициенты r1 и r2 для всех движущихся дронов одним вызовом
+        r1, r2 = self.rng.random((2, len(moving), 3))
+
+        cognitive = self.cognitive_param * r1 * (self.best_positions[moving] - positions)
+        social = self.social_param * r2 * (self.target_positions[moving] - positions)
+
+        velocity = (
+            self.inertia_weight * self.velocities[moving] +
+            cognitive +
+            social +
+            separation
+        )
+
+        # Ограничение скорости
+        speed = np.linalg.norm(velocity, axis=1)
+        too_fast = speed > self.max_velocity
+        velocity[too_fast] *= (self.max_velocity / speed[too_fast])[:, None]
+        speed = np.minimum(speed, self.max_velocity)
+
+        # Перемещение (перетаскиваемые и спящие дроны не двигаются)
+        positions += velocity * self.slowdown_factor
+        self.velocities[moving] = velocity
+        self.positions[moving] = positions
+        self.generation += 1
+
+        # Обновление личного лучшего
+        fitness = np.linalg.norm(positions - self.target_positions[moving], axis=1)
+        improved = fitness < self.best_fitness[moving]
+        self.best_fitness[moving[improved]] = fitness[improved]
+        self.best_positions[moving[improved]] = positions[improved]
+
+        if use_sleep:
+            self._update_sleep(moving, speed, fitness)
 
     # ------------------------------------------------------------
 
+    def get_state(self):
+        """Снимок состояния для отрисовки (виды только для чтения, без копирования)"""
+        return DroneState(
+            read_only(self.positions),
+            read_only(self.target_positions),
+            read_only(self.ids),
+            self.generation
+        )
+
     def get_drones(self):
-        """Для визуализации"""
-        return [(drone.position, drone.target_position, drone.id) for drone in self.drones]
+        """Строки массивов состояния по одному дрону (без копирования)"""
+        return [
+            (self.positions[i], self.target_positions[i], int(self.ids[i]))
+            for i in range(len(self.positions))
+        ]
 
     # ------------------------------------------------------------
 
     def get_average_error(self):
-        errors = [np.linalg.norm(d.position - d.target_position) for d in self.drones]
+        errors = np.linalg.norm(self.positions - self.target_positions, axis=1)
         return np.mean(errors)
 
     def is_converged(self, threshold=1.0):
@@ -174,28 +544,30 @@ class DroneSwarm:
     # функции для перетаскивания мышью
 
     def set_drone_position(self, drone_index, new_position):
-        if 0 <= drone_index < len(self.drones):
-            self.drones[drone_index].position = new_position
+        if 0 <= drone_index < len(self.positions):
+            self.positions[drone_index] = new_position
+            self.generation += 1
+            self.wake([drone_index])
 
     def start_dragging(self, drone_index):
-        if 0 <= drone_index < len(self.drones):
-            self.drones[drone_index].is_dragging = True
-            self.drones[drone_index].velocity = np.zeros(3)
+        if 0 <= drone_index < len(self.positions):
+            self.dragging[drone_index] = True
+            self.velocities[drone_index] = 0.0
+            self.wake([drone_index])
 
     def stop_dragging(self, drone_index):
-        if 0 <= drone_index < len(self.drones):
-            self.drones[drone_index].is_dragging = False
+        if 0 <= drone_index < len(self.positions):
+            self.dragging[drone_index] = False
 
     # ------------------------------------------------------------
 
     def get_drone_info(self, drone_index):
-        if 0 <= drone_index < len(self.drones):
-            d = self.drones[drone_index]
+        if 0 <= drone_index < len(self.positions):
             return {
-                "position": d.position,
-                "velocity": d.velocity,
-                "target": d.target_position,
-                "fitness": d.best_fitness,
-                "id": d.id
+                "position": self.positions[drone_index],
+                "velocity": self.velocities[drone_index],
+                "target": self.target_positions[drone_index],
+                "fitness": float(self.best_fitness[drone_index]),
+                "id": int(self.ids[drone_index])
             }
         return None
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""Кэш результатов обработки изображений
+
+Ключ - хэш содержимого изображения и всех параметров обработки, поэтому
+переименование файла не сбрасывает кэш, а изменение параметров не выдает
+устаревший результат. Массивы хранятся на диске как .npy; при превышении
+max_bytes удаляются давно не использованные файлы. Поверх диска работает
+небольшой кэш в памяти; попадание в него тоже обновляет время изменения
+файла, иначе часто используемые формации выглядели бы самыми старыми.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pso_formations")
+
+
+def content_key(data, params):
+    """Ключ кэша по байтам изображения и параметрам обработки"""
+    digest = hashlib.sha1(data)
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FormationCache:
+    """Двухуровневый LRU-кэш массивов: память и каталог с .npy"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=256 * 1024 * 1024,
+                 memory_items=32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        # Объем каталога ведется при записи; каталог сканируется, только
+        # когда объем превысил max_bytes (его могли изменить другие процессы)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key, name):
+        return os.path.join(self.directory, f"{key}_{name}.npy")
+
+    def _entries(self):
+        """(время изменения, размер, путь) файлов кэша"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _touch(self, path):
+        # Время изменения файла служит отметкой последнего использования
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def get(self, key, name):
+        """Массив из кэша или None"""
+        item = (key, name)
+        path = self._path(key, name)
+        if item in self.memory:
+            self.memory.move_to_end(item)
+            self._touch(path)
+            self.hits += 1
+            return self.memory[item]
+
+        try:
+            array = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self._touch(path)
+        self.hits += 1
+        self._remember(item, array)
+        return array
+
+    def put(self, key, name, array):
+        array = np.ascontiguousarray(array)
+        path = self._path(key, name)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+
+        # Запись через временный файл: параллельное чтение не увидит обрезанный .npy
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            np.save(f, array, allow_pickle=False)
+        size = os.path.getsize(temp)
+        os.replace(temp, path)
+
+        # В памяти хранится копия: массив вызывающего остается изменяемым
+        self._remember((key, name), array.copy())
+        self.total_bytes += size - previous
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def _remember(self, item, array):
+        array.flags.writeable = False
+        self.memory[item] = array
+        self.memory.move_to_end(item)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        """Удаление давно не использованных файлов сверх max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self.total_bytes = total
+
+    def clear(self):
+        self.memory.clear()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                os.remove(entry.path)
+        self.total_bytes = 0
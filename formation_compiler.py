@@ -0,0 +1,120 @@
+"""Пакетная подготовка формаций из каталога изображений
+
+Каждое изображение обрабатывается в пуле процессов (выделение контура и
+равномерное распределение точек), результат пишется отдельным файлом
+целей .npy (float32, N×3). Манифест manifest.json перечисляет файлы в
+порядке изображений, поэтому каталог описывает последовательность формаций
+шоу. Файлы целей читаются load_targets без OpenCV.
+"""
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+MANIFEST_NAME = "manifest.json"
+
+
+def find_images(source):
+    """Изображения каталога (по имени) или файлы по шаблону glob"""
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+    else:
+        paths = glob.glob(source)
+    return sorted(paths)
+
+
+def _compile_image(index, image_path, num_drones, output_dir, cache_dir, multi_contour):
+    """Обработка одного изображения в рабочем процессе"""
+    # OpenCV нужен только здесь, поэтому импортируется в рабочем процессе
+    from formation_cache import FormationCache
+    from image_processor import ImageProcessor
+    from simulation_runner import targets_from_image
+
+    processor = ImageProcessor(cache=FormationCache(cache_dir) if cache_dir else None)
+    processor.multi_contour = multi_contour
+    targets, num_drones = targets_from_image(image_path, num_drones, processor=processor)
+
+    # Границы частей формации: после распределения точек или контуров как есть
+    offsets = processor.target_offsets
+    if offsets is None:
+        offsets = processor.contour_offsets
+
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    name = f"{index:04d}_{stem}.npy"
+    np.save(os.path.join(output_dir, name), np.asarray(targets, dtype=np.float32))
+
+    return {
+        "image": os.path.abspath(image_path),
+        "targets": name,
+        "num_targets": int(len(targets)),
+        "num_drones": int(num_drones),
+        "offsets": [int(offset) for offset in offsets],
+    }
+
+
+def compile_formations(source, num_drones, output_dir, workers=None, cache_dir=None,
+                       multi_contour=False, log=None):
+    """Подготовка файлов целей и манифеста для всех изображений source
+
+    offsets в манифесте - границы частей формации (контуров) в файле целей.
+    Ошибки отдельных изображений записываются в манифест и не прерывают
+    обработку остальных. Возвращает содержимое манифеста.
+    """
+    images = find_images(source)
+    os.makedirs(output_dir, exist_ok=True)
+
+    entries = [None] * len(images)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_compile_image, index, path, num_drones, output_dir, cache_dir,
+                        multi_contour): index
+            for index, path in enumerate(images)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            try:
+                entries[index] = future.result()
+            except Exception as e:
+                entries[index] = {"image": os.path.abspath(images[index]), "error": str(e)}
+            if log is not None:
+                log(f"[{done}/{len(images)}] {images[index]}")
+
+    manifest = {"num_drones": num_drones, "formations": entries}
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def find_manifest(path):
+    """Путь к манифесту, если path - манифест или каталог с ним, иначе None"""
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+        return path if os.path.isfile(path) else None
+    return path if path.endswith(".json") and os.path.isfile(path) else None
+
+
+def load_manifest(path):
+    """Формации из манифеста (путь к файлу или каталогу) с полными путями
+
+    index - номер изображения в манифесте. Изображения, которые не удалось
+    обработать, пропускаются.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    formations = []
+    for index, entry in enumerate(manifest["formations"]):
+        if "error" in entry:
+            continue
+        formations.append(dict(entry, index=index, targets=os.path.join(directory, entry["targets"])))
+    return formations
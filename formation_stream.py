@@ -0,0 +1,258 @@
+"""Потоковое построение формаций по видео или последовательности изображений
+
+Поток чтения декодирует кадры в градациях серого, пул рабочих потоков
+выделяет контуры и распределяет точки (у каждого потока свой
+ImageProcessor; OpenCV и numpy отпускают GIL на тяжелых операциях).
+Кадров, прочитанных, но еще не выданных потребителю, не больше
+max_pending: когда потребитель (рой) не успевает, чтение ждет, поэтому
+расход памяти не зависит от длины видео. Результаты выдаются в порядке
+кадров; формации, почти не отличающиеся от предыдущей выданной,
+пропускаются. Формации, заранее подготовленные pso compile, читаются
+из манифеста (manifest_formations).
+"""
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from glob import has_magic
+
+import cv2
+import numpy as np
+
+from formation_compiler import find_images, load_manifest
+from image_processor import ImageProcessor
+from simulation_runner import load_targets
+from target_assignment import nearest_points
+
+
+# Формация кадра: номер кадра, цели N×3 и границы частей формации
+Formation = namedtuple("Formation", ("frame", "targets", "offsets"))
+
+_END = "end"
+_ERROR = "error"
+
+
+def read_frames(source, frame_step=1):
+    """Кадры (номер, изображение в градациях серого) видеофайла или изображений
+
+    source - видеофайл, каталог изображений или шаблон glob. Берется
+    каждый frame_step-й кадр; пропущенные кадры видео не декодируются.
+    """
+    if os.path.isdir(source) or has_magic(source):
+        for index, path in enumerate(find_images(source)):
+            if index % frame_step:
+                continue
+            gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                raise ValueError(f"Не удалось загрузить изображение {path}")
+            yield index, gray
+        return
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Не удалось открыть видео {source}")
+    try:
+        index = 0
+        while True:
+            if index % frame_step:
+                if not capture.grab():
+                    break
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield index, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            index += 1
+    finally:
+        capture.release()
+
+
+def manifest_formations(path):
+    """Формации Formation из манифеста pso compile; номер кадра - номер изображения"""
+    for entry in load_manifest(path):
+        yield Formation(entry["index"], load_targets(entry["targets"]), np.array(entry["offsets"]))
+
+
+def target_change(previous, targets):
+    """Отличие наборов целей: симметричное среднее расстояние до ближайшей точки"""
+    forward = nearest_points(previous, targets)[1].mean()
+    backward = nearest_points(targets, previous)[1].mean()
+    return 0.5 * (forward + backward)
+
+
+class FormationStream:
+    """Итератор формаций Formation по кадрам source для num_drones дронов
+
+    configure(processor) настраивает ImageProcessor каждого рабочего потока
+    (например, multi_contour или fill_mode). Формация пропускается, если ее
+    отличие от предыдущей выданной (target_change) меньше min_change метров.
+    Кадры без контура пропускаются и учитываются в failed.
+    """
+
+    def __init__(self, source, num_drones, workers=2, max_pending=8, min_change=0.25,
+                 frame_step=1, configure=None):
+        self.source = source
+        self.num_drones = num_drones
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.min_change = min_change
+        self.frame_step = frame_step
+        self.configure = configure
+
+        self.frames_read = 0
+        self.skipped = 0
+        self.failed = 0
+        self.emitted = 0
+
+        self._slots = threading.Semaphore(self.max_pending)
+        self._frames = queue.Queue()
+        self._results = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._threads.append(threading.Thread(target=self._read, daemon=True))
+        for _ in range(self.workers):
+            self._threads.append(threading.Thread(target=self._work, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _read(self):
+        """Поток чтения: кадр читается, только когда есть свободный слот"""
+        frames = read_frames(self.source, self.frame_step)
+        count = 0
+        try:
+            while True:
+                while not self._slots.acquire(timeout=0.1):
+                    if self._stop.is_set():
+                        return
+                if self._stop.is_set():
+                    return
+                item = next(frames, None)
+                if item is None:
+                    break
+                self._frames.put((count,) + item)
+                count += 1
+                self.frames_read = count
+            self._results.put((_END, count))
+        except Exception as e:
+            self._results.put((_ERROR, e))
+        finally:
+            frames.close()
+            for _ in range(self.workers):
+                self._frames.put(None)
+
+    def _work(self):
+        """Рабочий поток: контур кадра и цели формации"""
+        processor = ImageProcessor()
+        if self.configure is not None:
+            self.configure(processor)
+
+        while True:
+            item = self._frames.get()
+            if item is None:
+                return
+            sequence, index, gray = item
+            if self._stop.is_set():
+                continue
+            try:
+                processor.process_frame(gray, self.num_drones)
+                targets = processor.formation_points(self.num_drones, seed=0)
+                offsets = processor.target_offsets
+                self._results.put((sequence, Formation(index, targets, offsets)))
+            except ValueError:
+                self._results.put((sequence, None))
+            except Exception as e:
+                self._results.put((_ERROR, e))
+
+    def __iter__(self):
+        self.start()
+        pending = {}
+        sequence = 0
+        total = None
+        previous = None
+        try:
+            while total is None or sequence < total:
+                if sequence in pending:
+                    formation = pending.pop(sequence)
+                else:
+                    key, value = self._results.get()
+                    if key == _END:
+                        total = value
+                        continue
+                    if key == _ERROR:
+                        raise value
+                    if key != sequence:
+                        pending[key] = value
+                        continue
+                    formation = value
+
+                # Кадр покидает конвейер: чтение может взять следующий
+                sequence += 1
+                self._slots.release()
+
+                if formation is None:
+                    self.failed += 1
+                    continue
+                if previous is not None and target_change(previous, formation.targets) < self.min_change:
+                    self.skipped += 1
+                    continue
+                previous = formation.targets
+                self.emitted += 1
+                yield formation
+        finally:
+            self.close()
+
+    def close(self):
+        """Остановка потоков; необработанные кадры отбрасываются"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def play_formations(swarm, formations, steps_per_formation, recorder=None, log=None):
+    """Подача формаций в рой: новая формация каждые steps_per_formation шагов
+
+    Следующая формация запрашивается только после шагов текущей, поэтому
+    медленная симуляция через FormationStream притормаживает чтение кадров.
+    Возвращает словарь с результатами, пригодный для сериализации в JSON.
+    """
+    errors = []
+    frames = []
+    steps = 0
+
+    start = time.perf_counter()
+    for formation in formations:
+        swarm.set_target_points(formation.targets)
+        for _ in range(steps_per_formation):
+            swarm.update_positions()
+            if recorder is not None:
+                recorder.record(swarm)
+        steps += steps_per_formation
+
+        frames.append(int(formation.frame))
+        errors.append(float(swarm.get_average_error()))
+        if log is not None:
+            log(f"кадр {formation.frame}: ошибка {errors[-1]:.3f}")
+
+    wall_time = time.perf_counter() - start
+    return {
+        "num_drones": int(len(swarm.positions)),
+        "formations": len(frames),
+        "steps_per_formation": steps_per_formation,
+        "steps": steps,
+        "wall_time": wall_time,
+        "frames": frames,
+        "errors": errors,
+        "mean_error": float(np.mean(errors)) if errors else None,
+    }
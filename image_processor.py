@@ -1,30 +1,392 @@
+import struct
+
 import cv2
 import numpy as np
 
+from formation_cache import content_key
+
+
+# Флаги чтения в градациях серого с уменьшением при декодировании
+REDUCED_GRAYSCALE = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+# Маркеры JPEG с размерами кадра (SOF0-SOF15, кроме DHT, JPG и DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_size(data):
+    """Ширина и высота по заголовку PNG, JPEG или BMP без декодирования
+
+    Для других форматов возвращает None.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        return width, abs(height)
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 <= len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker in JPEG_SOF_MARKERS:
+                height, width = struct.unpack(">HH", data[i + 5:i + 9])
+                return width, height
+            if marker == 0xFF or marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                i += 2 if marker != 0xFF else 1
+                continue
+            i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    return None
+
+
+def loop_segments(points, offsets):
+    """Сегменты замкнутых контуров points[offsets[k]:offsets[k + 1]]
+
+    Возвращает векторы сегментов, их длины и накопленную длину дуги до
+    начала каждого сегмента (сквозную по контурам, на один элемент длиннее);
+    последний сегмент каждого контура замыкает его на первую точку.
+    Результат можно передать в loop_lengths и resample_loops, чтобы не
+    считать его дважды.
+    """
+    starts, ends = offsets[:-1], offsets[1:]
+    nonempty = ends > starts
+
+    # Разности соседних точек срезами (без выборки по индексам), затем
+    # замыкающие сегменты контуров
+    segments = np.empty_like(points)
+    segments[:-1] = points[1:] - points[:-1]
+    last = ends[nonempty] - 1
+    segments[last] = points[starts[nonempty]] - points[last]
+
+    lengths = np.sqrt(np.einsum("ij,ij->i", segments, segments))
+    arc = np.concatenate([[0.0], np.cumsum(lengths)])
+    return segments, lengths, arc
+
+
+def loop_lengths(points, offsets, segments=None):
+    """Периметры замкнутых контуров (segments - результат loop_segments)"""
+    if segments is None:
+        segments = loop_segments(points, offsets)
+    arc = segments[2]
+    return arc[offsets[1:]] - arc[offsets[:-1]]
+
+
+def allocate_budget(weights, total, minimum=0):
+    """Деление total точек пропорционально weights (метод наибольших остатков)
+
+    Каждая часть получает не меньше minimum точек, если их хватает на все части.
+    """
+    weights = np.asarray(weights, dtype=float)
+    parts = len(weights)
+    if parts == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    base = min(minimum, total // parts)
+    rest = total - base * parts
+    if weights.sum() > 0:
+        share = weights / weights.sum() * rest
+    else:
+        share = np.full(parts, rest / parts)
+
+    counts = np.floor(share).astype(np.int64)
+    remainder = rest - int(counts.sum())
+    order = np.argsort(-(share - counts), kind="stable")
+    counts[order[:remainder]] += 1
+    return counts + base
+
+
+def resample_loops(points, offsets, counts, segments=None):
+    """Точки через равные промежутки длины дуги для нескольких замкнутых контуров
+
+    Контур k (строки offsets[k]:offsets[k + 1]) получает counts[k] точек;
+    результат идет подряд по контурам без цикла по ним. segments - уже
+    посчитанный для points результат loop_segments.
+    """
+    points = np.asarray(points, dtype=float)
+    counts = np.asarray(counts, dtype=np.int64)
+    if segments is None:
+        segments = loop_segments(points, offsets)
+    segments, lengths, arc = segments
+
+    loop_start = arc[offsets[:-1]]
+    perimeter = arc[offsets[1:]] - loop_start
+
+    loop = np.repeat(np.arange(len(counts)), counts)
+    first = np.cumsum(counts) - counts
+    rank = np.arange(int(counts.sum())) - first[loop]
+    step = np.divide(perimeter, counts, out=np.zeros(len(counts)), where=counts > 0)
+    distances = loop_start[loop] + rank * step[loop]
+
+    # Для каждой точки - сегмент, на котором она лежит, и доля сегмента;
+    # side="right" пропускает сегменты нулевой длины
+    segment = np.searchsorted(arc[:-1], distances, side="right") - 1
+    t = np.divide(distances - arc[segment], lengths[segment],
+                  out=np.zeros(len(segment)), where=lengths[segment] > 0)
+    # np.take по строкам заметно быстрее индексации points[segment]
+    result = np.take(points, segment, axis=0) + t[:, None] * np.take(segments, segment, axis=0)
+
+    # Вырожденные контуры нулевой длины - все точки в первой точке контура
+    degenerate = perimeter[loop] == 0
+    result[degenerate] = points[offsets[:-1][loop[degenerate]]]
+    return result
+
+
+# Смещения соседних ячеек фоновой сетки, в которых может лежать точка ближе
+# spacing (ячейка со стороной spacing / √2, без угловых и центральной)
+# Ближние ячейки идут первыми: они чаще всего отклоняют кандидата
+POISSON_OFFSETS = sorted(
+    [(dy, dx) for dy in range(-2, 3) for dx in range(-2, 3)
+     if (dy, dx) != (0, 0) and abs(dy) + abs(dx) < 4],
+    key=lambda offset: offset[0] ** 2 + offset[1] ** 2
+)
+
+
+def poisson_disk_samples(mask, spacing, rng, attempts=6):
+    """Выборка Пуассона внутри маски с минимальным расстоянием spacing (в пикселях)
+
+    Фоновая сетка со стороной ячейки spacing / √2 хранит не больше одной
+    точки на ячейку. Ячейки обрабатываются девятью группами (i mod 3, j mod 3):
+    точки ячеек одной группы заведомо дальше spacing друг от друга, поэтому
+    все пустые ячейки группы получают кандидата одновременно, и кандидат
+    проверяется только по соседним ячейкам. Возвращает координаты (x, y).
+    """
+    height, width = mask.shape
+    cell = spacing / np.sqrt(2)
+    grid_w = int(np.ceil(width / cell))
+    grid_h = int(np.ceil(height / cell))
+
+    # Ячейки, в которые попадает хотя бы часть маски
+    coverage = cv2.resize(mask.astype(np.float32), (grid_w, grid_h), interpolation=cv2.INTER_AREA)
+    active = coverage > 0
+
+    # Координаты точек по ячейкам (NaN - пусто) с полями в две ячейки,
+    # чтобы соседи не выходили за границы; индексация плоская
+    stride = grid_w + 4
+    xs = np.full((grid_h + 4) * stride, np.nan)
+    ys = np.full((grid_h + 4) * stride, np.nan)
+    neighbors = np.array([dy * stride + dx for dy, dx in POISSON_OFFSETS])
+    limit = spacing * spacing
+
+    # Плоские индексы активных ячеек каждой группы
+    phases = []
+    for phase_y in range(3):
+        for phase_x in range(3):
+            cy, cx = np.nonzero(active[phase_y::3, phase_x::3])
+            cy = cy * 3 + phase_y
+            cx = cx * 3 + phase_x
+            phases.append(((cy + 2) * stride + cx + 2, cx, cy))
+
+    for _ in range(attempts):
+        for index, (flat, cx, cy) in enumerate(phases):
+            empty = np.isnan(xs[flat])
+            flat, cx, cy = flat[empty], cx[empty], cy[empty]
+            phases[index] = (flat, cx, cy)
+            if len(flat) == 0:
+                continue
+
+            offset = rng.random((2, len(flat)))
+            px = (cx + offset[0]) * cell
+            py = (cy + offset[1]) * cell
+            ok = mask[np.minimum(py.astype(np.int64), height - 1),
+                      np.minimum(px.astype(np.int64), width - 1)]
+            flat, px, py = flat[ok], px[ok], py[ok]
+
+            # Пустые соседи дают NaN, сравнение с NaN ложно; после ближних
+            # восьми ячеек отклоненные кандидаты отбрасываются
+            ok = np.ones(len(flat), dtype=bool)
+            for number, shift in enumerate(neighbors):
+                other = flat + shift
+                ok &= ~((px - xs[other]) ** 2 + (py - ys[other]) ** 2 < limit)
+                if number == 7:
+                    flat, px, py = flat[ok], px[ok], py[ok]
+                    ok = ok[ok]
+
+            xs[flat[ok]] = px[ok]
+            ys[flat[ok]] = py[ok]
+
+    filled = ~np.isnan(xs)
+    return np.stack([xs[filled], ys[filled]], axis=1)
+
+
 class ImageProcessor:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.image = None
+        self.image_shape = None
         self.contours = None
+        self.arc_lengths = None
         self.contour_points = None
 
-    def process_image(self, image_path):
-        """Обработка изображения и извлечение контуров"""
-        # Загрузка изображения
-        self.image = cv2.imread(image_path)
-        if self.image is None:
-            raise ValueError("Не удалось загрузить изображение")
+        # Для resimplify после адаптивной обработки: изображение, масштаб
+        # уровня пирамиды, контуры на нем и их длины (_pyramid), либо путь
+        # и число дронов изображения, контур которого взят из кэша (_source)
+        self._pyramid = None
+        self._source = None
+
+        # Границы частей формации в contour_points и в результате
+        # distribute_points_evenly: часть k - строки offsets[k]:offsets[k + 1]
+        self.contour_offsets = None
+        self.target_offsets = None
+
+        # Параметры обработки (входят в ключ кэша)
+        self.blur_size = 5
+        self.binary_threshold = 127
+        self.canny_low = 50
+        self.canny_high = 150
+        self.epsilon_ratio = 0.005
+        self.scale = 100.0
+
+        # Несколько контуров: все внешние контуры и отверстия (иерархия
+        # RETR_CCOMP), периметр которых не меньше min_contour_ratio от
+        # периметра самого длинного
+        self.multi_contour = False
+        self.min_contour_ratio = 0.05
+
+        # Целевые точки формации: "outline" - по контуру, "fill" - внутри
+        # фигуры (выборка Пуассона), "auto" - заполнение, если на контуре
+        # точки оказались бы ближе min_outline_spacing
+        self.fill_mode = "auto"
+        self.min_outline_spacing = 2.0
+        # Доля плотности максимальной выборки Пуассона (около 0.7 / spacing²)
+        # и предельный размер маски фигуры
+        self.fill_density = 0.5
+        self.max_fill_mask = 4096
+        self.fill_spacing = None
+
+        # Подбор epsilon под заданное число вершин: допустимое относительное
+        # отклонение и предел числа шагов бинарного поиска
+        self.target_tolerance = 0.02
+        self.max_epsilon_steps = 40
+
+        # Адаптивный режим: изображение читается в градациях серого, контур
+        # ищется на уровне пирамиды, выбранном по числу дронов, а вершины
+        # контура уточняются по исходному разрешению. Оценка пиковой памяти
+        # (сжатые данные и 4 байта на пиксель) не превышает memory_limit:
+        # при необходимости изображение уменьшается уже при декодировании.
+        self.adaptive = True
+        self.memory_limit = 512 * 1024 * 1024
+        self.min_level_size = 1024
+        self.oversample = 4
+        # Предел переносов окна при уточнении одной вершины
+        self.max_refine_steps = 4
+
+        # Кэш результатов (FormationCache) и ключ текущего изображения
+        self.cache = cache
+        self.cache_key = None
 
-        # Преобразование в градации серого
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+    def processing_params(self, num_drones=None, target_count=None):
+        params = {
+            "blur_size": self.blur_size,
+            "binary_threshold": self.binary_threshold,
+            "canny_low": self.canny_low,
+            "canny_high": self.canny_high,
+            "epsilon_ratio": self.epsilon_ratio,
+            "scale": self.scale,
+            "adaptive": self.adaptive,
+            "multi_contour": self.multi_contour,
+            "fill_density": self.fill_density,
+            "max_fill_mask": self.max_fill_mask,
+        }
+        if self.multi_contour:
+            params["min_contour_ratio"] = self.min_contour_ratio
+        if target_count is not None:
+            params.update({
+                "target_count": target_count,
+                "target_tolerance": self.target_tolerance,
+                "max_epsilon_steps": self.max_epsilon_steps,
+            })
+        if self.adaptive:
+            params.update({
+                "memory_limit": self.memory_limit,
+                "min_level_size": self.min_level_size,
+                "oversample": self.oversample,
+                "max_refine_steps": self.max_refine_steps,
+                "num_drones": num_drones,
+            })
+        return params
 
+    def process_image(self, image_path, num_drones=None, target_count=None):
+        """Обработка изображения и извлечение контуров
+
+        num_drones (если известно) определяет уровень пирамиды в адаптивном
+        режиме. Если задано target_count, контуры упрощаются примерно до
+        target_count вершин в сумме (см. simplify). При наличии кэша повторная
+        обработка того же содержимого с теми же параметрами не обращается
+        к OpenCV.
+        """
+        self.cache_key = None
+        self._pyramid = None
+        self._source = None
+        data = None
+        if self.cache is not None or self.adaptive:
+            with open(image_path, "rb") as f:
+                data = f.read()
+
+        if self.cache is not None:
+            self.cache_key = content_key(data, self.processing_params(num_drones, target_count))
+            if self._load_cached():
+                if self.adaptive:
+                    self._source = (image_path, num_drones)
+                return self.contour_points
+
+        if self.adaptive:
+            contours, approx_contours = self._adaptive_contours(data, num_drones, target_count)
+        else:
+            if data is not None:
+                self.image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            else:
+                self.image = cv2.imread(image_path)
+
+            if self.image is None:
+                raise ValueError("Не удалось загрузить изображение")
+            self.image_shape = self.image.shape[:2]
+
+            # Преобразование в градации серого
+            gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+            contours = self._find_contours(gray)
+
+            # Упрощение контуров для уменьшения количества точек
+            approx_contours = self._simplify_all(contours, target_count)
+
+        self.contours = contours
+        self._set_contour_points(approx_contours)
+
+        if self.cache_key is not None:
+            raw = np.concatenate([contour.reshape(-1, 2) for contour in contours])
+            raw_offsets = np.cumsum([0] + [len(contour) for contour in contours])
+            self.cache.put(self.cache_key, "contour", raw)
+            self.cache.put(self.cache_key, "contour_splits", raw_offsets)
+            self.cache.put(self.cache_key, "shape", np.array(self.image_shape))
+            self.cache.put(self.cache_key, "points", self.contour_points)
+            self.cache.put(self.cache_key, "point_offsets", self.contour_offsets)
+        return self.contour_points
+
+    def _set_contour_points(self, approx_contours):
+        """3D точки всех упрощенных контуров подряд и границы частей"""
+        self.contour_points = np.concatenate([self.contour_to_3d(approx) for approx in approx_contours])
+        self.contour_offsets = np.cumsum([0] + [len(approx) for approx in approx_contours])
+        self.target_offsets = None
+
+    def _find_contours(self, gray):
+        """Значимые контуры изображения в градациях серого, самый длинный первым"""
         # Размытие для уменьшения шума
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        blurred = cv2.GaussianBlur(gray, (self.blur_size, self.blur_size), 0)
 
         # Бинаризация изображения для лучшего выделения контуров
-        _, binary = cv2.threshold(blurred, 127, 255, cv2.THRESH_BINARY)
+        _, binary = cv2.threshold(blurred, self.binary_threshold, 255, cv2.THRESH_BINARY)
+        del blurred
+
+        if self.multi_contour:
+            return self._significant_contours(binary)
 
         # Обнаружение краев
-        edges = cv2.Canny(binary, 50, 150)
+        edges = cv2.Canny(binary, self.canny_low, self.canny_high)
+        del binary
 
         # Нахождение контуров
         contours, _ = cv2.findContours(
@@ -37,93 +399,433 @@ class ImageProcessor:
         if not contours:
             raise ValueError("Контуры не найдены")
 
-        main_contour = max(contours, key=cv2.contourArea)
-        self.contours = [main_contour]
+        return [max(contours, key=cv2.contourArea)]
+
+    def _significant_contours(self, binary):
+        """Внешние контуры и отверстия бинарного изображения без мелких деталей"""
+        # Фигура считается светлой; если светлый фон (по краям изображения), цвета меняются
+        border = np.concatenate([binary[0], binary[-1], binary[:, 0], binary[:, -1]])
+        if border.mean() > 127:
+            binary = cv2.bitwise_not(binary)
+
+        contours, _ = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+        contours = [contour for contour in contours if len(contour) >= 3]
+        if not contours:
+            raise ValueError("Контуры не найдены")
+
+        perimeters = np.array([cv2.arcLength(contour, True) for contour in contours])
+        order = np.argsort(-perimeters, kind="stable")
+        keep = order[perimeters[order] >= self.min_contour_ratio * perimeters[order[0]]]
+        return [contours[k] for k in keep]
+
+    def _simplify_all(self, contours, target_count=None):
+        """Упрощение всех контуров; target_count делится пропорционально периметру"""
+        self.arc_lengths = np.array([cv2.arcLength(contour, True) for contour in contours])
+        if target_count is None:
+            counts = [None] * len(contours)
+        else:
+            counts = allocate_budget(self.arc_lengths, target_count, minimum=3)
+
+        return [
+            self.simplify(contour, None if count is None else int(count), arc_length)
+            for contour, count, arc_length in zip(contours, counts, self.arc_lengths)
+        ]
+
+    def simplify(self, contour, target_count=None, arc_length=None):
+        """Упрощение контура approxPolyDP
+
+        Без target_count epsilon равен epsilon_ratio от длины контура. С
+        target_count epsilon подбирается бинарным поиском в логарифмической
+        шкале (число вершин убывает с ростом epsilon), пока число вершин не
+        окажется в пределах target_tolerance от target_count; иначе
+        возвращается ближайший найденный вариант.
+        """
+        if arc_length is None:
+            arc_length = cv2.arcLength(contour, True)
+        if target_count is None:
+            return cv2.approxPolyDP(contour, self.epsilon_ratio * arc_length, True)
+        if len(contour) <= target_count:
+            return contour
+
+        tolerance = max(1, int(self.target_tolerance * target_count))
+        low, high = 1e-3, max(arc_length, 1e-3)
+
+        # Предварительное упрощение на полпикселя убирает ступеньки растра и
+        # сокращает работу каждого шага поиска на длинных контурах
+        if len(contour) > 4 * target_count:
+            reduced = cv2.approxPolyDP(contour, 0.5, True)
+            if len(reduced) > target_count:
+                contour, low = reduced, 0.5
+        best = None
+        for _ in range(self.max_epsilon_steps):
+            epsilon = np.sqrt(low * high)
+            approx = cv2.approxPolyDP(contour, epsilon, True)
+            error = len(approx) - target_count
+            if best is None or abs(error) < abs(len(best) - target_count):
+                best = approx
+            if abs(error) <= tolerance:
+                break
+            if error > 0:
+                low = epsilon
+            else:
+                high = epsilon
+        return best
+
+    def resimplify(self, target_count):
+        """Упрощение последних контуров под другое число целей без обработки изображения
+
+        После адаптивной обработки упрощаются контуры уровня пирамиды и
+        вершины снова уточняются по изображению. Если адаптивный контур взят
+        из кэша, изображения нет, и оно обрабатывается заново (process_image).
+        """
+        if self._pyramid is not None:
+            level_contours, level_arcs = self._pyramid[3:]
+            counts = allocate_budget(level_arcs, target_count, minimum=3)
+            approx_contours = [
+                self.simplify(contour, int(count), arc_length)
+                for contour, count, arc_length in zip(level_contours, counts, level_arcs)
+            ]
+            self._set_contour_points(self._refine_all(approx_contours))
+            self.cache_key = None
+            return self.contour_points
+        if self._source is not None:
+            image_path, num_drones = self._source
+            return self.process_image(image_path, num_drones, target_count)
 
-        # Упрощение контура для уменьшения количества точек
-        epsilon = 0.005 * cv2.arcLength(main_contour, True)
-        approx_contour = cv2.approxPolyDP(main_contour, epsilon, True)
+        if not self.contours:
+            raise ValueError("Контур не определен")
 
-        # Преобразование точек контура в 3D координаты
-        points_3d = self.contour_to_3d(approx_contour)
+        if self.arc_lengths is None:
+            self.arc_lengths = np.array([cv2.arcLength(contour, True) for contour in self.contours])
+        counts = allocate_budget(self.arc_lengths, target_count, minimum=3)
+        approx_contours = [
+            self.simplify(contour, int(count), arc_length)
+            for contour, count, arc_length in zip(self.contours, counts, self.arc_lengths)
+        ]
 
-        self.contour_points = np.array(points_3d)
+        self._set_contour_points(approx_contours)
+        self.cache_key = None
         return self.contour_points
 
-    def contour_to_3d(self, contour):
-        """Преобразование 2D контура в 3D точки с равномерным распределением"""
-        height, width = self.image.shape[:2]
-        scale = 100.0  # Масштаб для 3D пространства
+    def _peak_bytes(self, width, height, encoded):
+        return encoded + 4 * width * height
+
+    def _decode_gray(self, data):
+        """Декодирование в градациях серого в пределах memory_limit
+
+        Возвращает изображение и коэффициент уменьшения при декодировании.
+        """
+        size = image_size(data)
+        factor = 1
+        if size is not None:
+            width, height = size
+            for factor in REDUCED_GRAYSCALE:
+                if self._peak_bytes(width // factor, height // factor, len(data)) <= self.memory_limit:
+                    break
+            else:
+                raise ValueError("Изображение не помещается в лимит памяти")
+            self.image_shape = (height, width)
 
-        # Вычисляем центр изображения
-        center_x = width / 2
-        center_y = height / 2
+        gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), REDUCED_GRAYSCALE[factor])
+        if gray is None:
+            raise ValueError("Не удалось загрузить изображение")
+
+        if size is None:
+            # Размер стал известен только после декодирования
+            if self._peak_bytes(gray.shape[1], gray.shape[0], len(data)) > self.memory_limit:
+                raise ValueError("Изображение не помещается в лимит памяти")
+            self.image_shape = gray.shape[:2]
+        return gray, factor
 
-        # Преобразуем контур в массив точек
-        points_2d = []
-        for point in contour:
-            points_2d.append([point[0][0], point[0][1]])
-        points_2d = np.array(points_2d)
+    def pyramid_level(self, width, height, num_drones=None):
+        """Уровень пирамиды: каждый уровень вдвое меньше предыдущего
 
-        # Вычисляем центр контура
-        contour_center = np.mean(points_2d, axis=0)
+        Уровень не меньше min_level_size по длинной стороне, а периметр
+        изображения на нем вмещает oversample точек на дрона.
+        """
+        needed = self.oversample * num_drones if num_drones else 0
+        level = 0
+        while (max(width, height) >> (level + 1) >= self.min_level_size and
+               2 * (width + height) >> (level + 1) >= needed):
+            level += 1
+        return level
+
+    def process_frame(self, frame, num_drones=None, target_count=None):
+        """Обработка уже декодированного кадра (BGR или градации серого)
+
+        Используется для кадров видео: кэш не применяется, в адаптивном
+        режиме контур ищется на уровне пирамиды, как в process_image.
+        """
+        self.cache_key = None
+        self.image = None
+        self._pyramid = None
+        self._source = None
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.image_shape = gray.shape[:2]
+
+        if self.adaptive:
+            contours, approx_contours = self._pyramid_contours(gray, 1, num_drones, target_count)
+        else:
+            contours = self._find_contours(gray)
+            approx_contours = self._simplify_all(contours, target_count)
+
+        self.contours = contours
+        self._set_contour_points(approx_contours)
+        return self.contour_points
+
+    def _adaptive_contours(self, data, num_drones, target_count=None):
+        """Контуры на уровне пирамиды с уточнением вершин; координаты исходные"""
+        self.image = None
+        full, factor = self._decode_gray(data)
+        return self._pyramid_contours(full, factor, num_drones, target_count)
+
+    def _pyramid_contours(self, full, factor, num_drones, target_count=None):
+        """Контуры изображения full, уменьшенного при декодировании в factor раз"""
+        level = self.pyramid_level(full.shape[1], full.shape[0], max(num_drones or 0, target_count or 0))
+        gray = full
+        for _ in range(level):
+            gray = cv2.pyrDown(gray)
+
+        contours = self._find_contours(gray)
+        del gray
+
+        approx_contours = self._simplify_all(contours, target_count)
+
+        # Изображение (1 байт на пиксель, в пределах оценки memory_limit)
+        # остается для уточнения вершин в resimplify
+        scale = 1 << level
+        self._pyramid = (full, factor, scale, contours, self.arc_lengths)
+        vertices = self._refine_all(approx_contours)
+
+        self.arc_lengths = self.arc_lengths * (scale * factor)
+        contours = [
+            np.round(((contour.reshape(-1, 2) + 0.5) * scale - 0.5) * factor)
+            .astype(np.int32).reshape(-1, 1, 2)
+            for contour in contours
+        ]
+        return contours, vertices
+
+    def _refine_all(self, approx_contours):
+        """Вершины упрощенных контуров уровня пирамиды в исходных координатах"""
+        full, factor, scale = self._pyramid[:3]
+        return [
+            (self._refine_vertices(full, approx.reshape(-1, 2), scale) * factor).reshape(-1, 1, 2)
+            for approx in approx_contours
+        ]
+
+    def _refine_vertices(self, full, vertices, scale):
+        """Уточнение вершин контура с уровня пирамиды по полному изображению
+
+        Около каждой вершины окно ±2·scale пикселей бинаризуется так же, как
+        уровень пирамиды, и вершина переносится на пиксель границы, наиболее
+        удаленный от хорды между соседними вершинами (как в approxPolyDP),
+        поэтому скругленные на малом уровне углы восстанавливаются. На тупом
+        углу вершина уровня может сползти вдоль стороны дальше окна: тогда
+        окно переносится в найденную точку, пока она не перестанет меняться.
+        """
+        predicted = (vertices + 0.5) * scale - 0.5
+        if scale == 1:
+            return predicted
+
+        height, width = full.shape[:2]
+        radius = 2 * scale
+        refined = predicted.copy()
+        for k in range(len(predicted)):
+            chord = predicted[(k + 1) % len(predicted)] - predicted[k - 1]
+            for _ in range(self.max_refine_steps):
+                x, y = refined[k]
+                x0, y0 = max(int(x) - radius, 0), max(int(y) - radius, 0)
+                x1, y1 = min(int(x) + radius + 1, width), min(int(y) + radius + 1, height)
+                window = cv2.GaussianBlur(full[y0:y1, x0:x1], (self.blur_size, self.blur_size), 0)
+                binary = window > self.binary_threshold
+
+                # Граница - пиксели, соседние с пикселем другого класса
+                edge = np.zeros_like(binary)
+                edge[:, 1:] |= binary[:, 1:] != binary[:, :-1]
+                edge[1:, :] |= binary[1:, :] != binary[:-1, :]
+                ys, xs = np.nonzero(edge)
+                if len(xs) == 0:
+                    break
+                xs = xs + x0
+                ys = ys + y0
+
+                if chord.any():
+                    offset = np.abs(chord[0] * (ys - predicted[k - 1][1]) - chord[1] * (xs - predicted[k - 1][0]))
+                    best = np.argmax(offset)
+                else:
+                    best = np.argmin((xs - x) ** 2 + (ys - y) ** 2)
+                if (xs[best], ys[best]) == (x, y):
+                    break
+                refined[k] = (xs[best], ys[best])
+
+        return refined
+
+    def _load_cached(self):
+        """Контур и 3D точки из кэша; False, если чего-то не хватает"""
+        names = ("contour", "contour_splits", "shape", "points", "point_offsets")
+        arrays = [self.cache.get(self.cache_key, name) for name in names]
+        if any(array is None for array in arrays):
+            return False
+        contour, splits, shape, points, offsets = arrays
+
+        self.image = None
+        self.image_shape = tuple(int(size) for size in shape)
+        self.contours = [part.reshape(-1, 1, 2) for part in np.split(contour, splits[1:-1])]
+        self.arc_lengths = None
+        self.contour_points = points
+        self.contour_offsets = offsets
+        self.target_offsets = None
+        return True
+
+    def contour_to_3d(self, contour):
+        """Преобразование 2D контура в 3D точки (массив N×3)"""
+        height, width = self.image_shape
+        scale = self.scale  # Масштаб для 3D пространства
+
+        # Контур OpenCV имеет форму (N, 1, 2)
+        points_2d = np.asarray(contour, dtype=float).reshape(-1, 2)
 
         # Нормализуем точки относительно центра изображения
-        normalized_points = []
-        for point in points_2d:
-            x = (point[0] - center_x) * scale / width
-            y = (point[1] - center_y) * scale / height
-            normalized_points.append([x, y])
-
-        # Преобразуем в 3D точки (x, y, z), где z - высота над поверхностью
-        points_3d = []
-        for point in normalized_points:
-            # Инвертируем y для правильной ориентации в 3D
-            # x - восток, y - высота (в данном случае постоянная), z - север
-            points_3d.append(np.array([point[0], 0, -point[1]]))
+        x = (points_2d[:, 0] - width / 2) * scale / width
+        y = (points_2d[:, 1] - height / 2) * scale / height
 
+        # Инвертируем y для правильной ориентации в 3D
+        # x - восток, y - высота (в данном случае постоянная), z - север
+        points_3d = np.zeros((len(points_2d), 3))
+        points_3d[:, 0] = x
+        points_3d[:, 2] = -y
         return points_3d
 
     def distribute_points_evenly(self, num_points):
-        """Равномерно распределяет указанное количество точек по контуру"""
+        """Равномерно распределяет указанное количество точек по контурам
+
+        Точки делятся между контурами пропорционально их длине и ставятся на
+        каждом замкнутом контуре через равные промежутки длины дуги, начиная
+        с его первой точки. Границы частей сохраняются в target_offsets.
+        """
         if self.contour_points is None or len(self.contour_points) < 2:
             raise ValueError("Контур не определен или слишком короткий")
 
-        # Вычисляем периметр контура (приближенно, используя евклидово расстояние)
-        perimeter = 0
-        for i in range(len(self.contour_points)):
-            next_idx = (i + 1) % len(self.contour_points)
-            perimeter += np.linalg.norm(self.contour_points[next_idx] - self.contour_points[i])
-
-        # Шаг между точками
-        step = perimeter / num_points
-
-        # Равномерно распределяем точки
-        result = []
-        current_dist = 0
-        current_idx = 0
-        result.append(self.contour_points[0].copy())
-
-        for _ in range(1, num_points):
-            remaining_dist = step
-            while True:
-                next_idx = (current_idx + 1) % len(self.contour_points)
-                segment_length = np.linalg.norm(self.contour_points[next_idx] - self.contour_points[current_idx])
-
-                if current_dist + segment_length >= remaining_dist:
-                    # Интерполируем точку на сегменте
-                    t = (remaining_dist - current_dist) / segment_length
-                    new_point = self.contour_points[current_idx] + t * (self.contour_points[next_idx] - self.contour_points[current_idx])
-                    result.append(new_point)
-                    current_dist = 0
-                    current_idx = next_idx if t == 1 else current_idx
-                    break
-                else:
-                    remaining_dist -= (segment_length - current_dist)
-                    current_dist = 0
-                    current_idx = next_idx
+        offsets = self.contour_offsets
+        if offsets is None:
+            offsets = np.array([0, len(self.contour_points)])
+        points = np.asarray(self.contour_points, dtype=float)
+
+        segments = loop_segments(points, offsets)
+        counts = allocate_budget(loop_lengths(points, offsets, segments), num_points, minimum=3)
+        self.target_offsets = np.cumsum(np.concatenate([[0], counts]))
+
+        name = f"targets_{num_points}"
+        if self.cache_key is not None:
+            cached = self.cache.get(self.cache_key, name)
+            if cached is not None:
+                return cached
+
+        targets = resample_loops(points, offsets, counts, segments)
+        if self.cache_key is not None:
+            self.cache.put(self.cache_key, name, targets)
+        return targets
+
+    def formation_points(self, num_points, seed=None):
+        """Целевые точки формации для num_points дронов в режиме fill_mode"""
+        if self.contour_points is None or len(self.contour_points) < 2:
+            raise ValueError("Контур не определен или слишком короткий")
+
+        mode = self.fill_mode
+        if mode == "auto":
+            offsets = self.contour_offsets
+            if offsets is None:
+                offsets = np.array([0, len(self.contour_points)])
+            outline = loop_lengths(np.asarray(self.contour_points, dtype=float), offsets).sum()
+            mode = "fill" if outline / num_points < self.min_outline_spacing else "outline"
+
+        if mode == "fill":
+            return self.fill_points(num_points, seed)
+        if len(self.contour_points) == num_points:
+            self.target_offsets = self.contour_offsets
+            return self.contour_points
+        return self.distribute_points_evenly(num_points)
+
+    def _shape_mask(self, size):
+        """Маска фигуры size×size в координатах формации (отверстия пустые)"""
+        height, width = self.image_shape
+        factor = np.array([size / width, size / height])
+        polygons = [
+            np.round(contour.reshape(-1, 2) * factor).astype(np.int32)
+            for contour in self.contours
+        ]
+        mask = np.zeros((size, size), dtype=np.uint8)
+        cv2.fillPoly(mask, polygons, 1)
+        return mask.astype(bool)
+
+    def fill_points(self, num_points, seed=None):
+        """Точки внутри фигуры с минимальным расстоянием (синий шум)
+
+        Расстояние подбирается по площади фигуры так, чтобы выборка Пуассона
+        дала не меньше num_points точек, лишние точки отбрасываются случайно.
+        Пока точек не хватает, расстояние уменьшается (маска при этом
+        уточняется до max_fill_mask); если фигура не вмещает num_points точек
+        и на расстоянии в пиксель маски, недостающие ставятся на исходный
+        (не упрощенный) контур.
+        Достигнутое минимальное расстояние сохраняется в fill_spacing.
+        """
+        if not self.contours:
+            raise ValueError("Контур не определен")
+
+        name = f"fill_{num_points}_{seed}"
+        if self.cache_key is not None and seed is not None:
+            cached = self.cache.get(self.cache_key, name)
+            if cached is not None:
+                self.target_offsets = np.array([0, len(cached)])
+                return cached
+
+        rng = np.random.default_rng(seed)
+        size = 512
+        mask = self._shape_mask(size)
+        if not mask.any():
+            raise ValueError("Фигура не содержит внутренних точек")
+
+        # Расстояние в единицах формации (сторона области - scale)
+        area = mask.mean() * self.scale ** 2
+        spacing = np.sqrt(self.fill_density * area / num_points)
+
+        # Маска достаточно подробная, чтобы на расстояние приходилось 3 пикселя
+        fine = int(np.clip(np.ceil(3 * self.scale / spacing), size, self.max_fill_mask))
+        if fine != size:
+            size = fine
+            mask = self._shape_mask(size)
+        pixel = self.scale / size
+
+        while True:
+            samples = poisson_disk_samples(mask, spacing / pixel, rng)
+            if len(samples) >= num_points or spacing < pixel:
+                break
+            spacing *= 0.9
+            if spacing < 3 * pixel and size < self.max_fill_mask:
+                size = min(2 * size, self.max_fill_mask)
+                mask = self._shape_mask(size)
+                pixel = self.scale / size
+
+        if len(samples) > num_points:
+            samples = samples[np.sort(rng.choice(len(samples), num_points, replace=False))]
+        self.fill_spacing = spacing
+
+        # Центр пикселя маски i соответствует непрерывной координате i + 0.5
+        height, width = self.image_shape
+        image_xy = (samples - 0.5) * np.array([width / size, height / size])
+        points = self.contour_to_3d(image_xy)
+        if len(points) < num_points:
+            outline = [self.contour_to_3d(contour) for contour in self.contours]
+            offsets = np.cumsum([0] + [len(part) for part in outline])
+            outline = np.concatenate(outline)
+            segments = loop_segments(outline, offsets)
+            counts = allocate_budget(loop_lengths(outline, offsets, segments), num_points - len(points))
+            points = np.concatenate([points, resample_loops(outline, offsets, counts, segments)])
 
-        return np.array(result)
+        self.target_offsets = np.array([0, len(points)])
+        if self.cache_key is not None and seed is not None:
+            self.cache.put(self.cache_key, name, points)
+        return points
 
     def get_recommended_drone_count(self):
         """Рекомендуемое число дронов равно точкам"""
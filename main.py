@@ -5,8 +5,12 @@ import cv2
 from PIL import Image, ImageTk
 import json
 from drone_simulation import DroneSwarm
+from simulation_worker import SimulationProcess
 from visualization import Visualization3D
 from image_processor import ImageProcessor
+from formation_cache import FormationCache
+from simulation_runner import load_targets
+from formation_compiler import load_manifest
 
 class DroneSwarmApp(tk.Tk):
     def __init__(self):
@@ -18,7 +22,15 @@ class DroneSwarmApp(tk.Tk):
         # Инициализация компонентов
         self.drone_swarm = None
         self.visualization = None
-        self.image_processor = ImageProcessor()
+
+        # Симуляция в отдельном процессе, чтобы тяжелый шаг не блокировал GUI
+        self.use_worker_process = tk.BooleanVar(value=True)
+        self.image_processor = ImageProcessor(cache=self.create_cache())
+        # Рой построен по изображению (а не по файлу целей)
+        self.image_loaded = False
+        # Формации шоу из манифеста pso compile и номер текущей
+        self.show_formations = []
+        self.show_index = 0
         
         # Установка базовых координат
         self.base_latitude = 55.7558
@@ -31,6 +43,13 @@ class DroneSwarmApp(tk.Tk):
         # Планирование обновления информации о рое
         self.after(1000, self.update_swarm_info)
         
+    def create_cache(self):
+        """Кэш обработанных изображений (без кэша, если каталог недоступен)"""
+        try:
+            return FormationCache()
+        except OSError:
+            return None
+
     def create_menu(self):
         """Создание главного меню"""
         menubar = tk.Menu(self)
@@ -40,6 +59,14 @@ class DroneSwarmApp(tk.Tk):
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Файл", menu=file_menu)
         file_menu.add_command(label="Загрузить изображение", command=self.load_image)
+        file_menu.add_command(label="Загрузить файл целей...", command=self.load_targets_file)
+        file_menu.add_command(label="Открыть шоу (манифест)...", command=self.load_show)
+        file_menu.add_command(label="Следующая формация шоу", command=self.next_show_formation)
+        file_menu.add_separator()
+        file_menu.add_command(label="Записать траекторию...", command=self.start_recording)
+        file_menu.add_command(label="Остановить запись", command=self.stop_recording)
+        file_menu.add_command(label="Открыть запись траектории...", command=self.open_replay)
+        file_menu.add_command(label="Экспорт профиля...", command=self.export_profile)
         file_menu.add_separator()
         file_menu.add_command(label="Выход", command=self.quit)
         
@@ -50,11 +77,38 @@ class DroneSwarmApp(tk.Tk):
                                 command=self.set_base_coordinates)
         settings_menu.add_command(label="Перераспределить цели",
                                 command=self.reassign_targets)
+        self.max_speed_var = tk.BooleanVar(value=False)
+        settings_menu.add_checkbutton(label="Максимальная скорость симуляции",
+                                      variable=self.max_speed_var,
+                                      command=self.toggle_max_speed)
+        settings_menu.add_checkbutton(label="Симуляция в отдельном процессе",
+                                      variable=self.use_worker_process)
+        self.fill_mode_var = tk.StringVar(value=self.image_processor.fill_mode)
+        fill_menu = tk.Menu(settings_menu, tearoff=0)
+        settings_menu.add_cascade(label="Размещение целей", menu=fill_menu)
+        for label, mode in (("Автоматически", "auto"),
+                            ("По контуру", "outline"),
+                            ("Заполнение фигуры", "fill")):
+            fill_menu.add_radiobutton(label=label, value=mode,
+                                      variable=self.fill_mode_var,
+                                      command=self.set_fill_mode)
+        self.multi_contour_var = tk.BooleanVar(value=False)
+        settings_menu.add_checkbutton(label="Все контуры изображения",
+                                      variable=self.multi_contour_var,
+                                      command=self.toggle_multi_contour)
+        self.fit_contour_var = tk.BooleanVar(value=False)
+        settings_menu.add_checkbutton(label="Контур под количество дронов",
+                                      variable=self.fit_contour_var,
+                                      command=self.toggle_fit_contour)
         
         # Меню Вид
         view_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Вид", menu=view_menu)
         view_menu.add_command(label="Сброс камеры", command=self.reset_camera)
+        self.profiling_var = tk.BooleanVar(value=False)
+        view_menu.add_checkbutton(label="Профилирование",
+                                  variable=self.profiling_var,
+                                  command=self.toggle_profiling)
         
         # Меню Справка
         help_menu = tk.Menu(menubar, tearoff=0)
@@ -64,15 +118,21 @@ class DroneSwarmApp(tk.Tk):
     
     def update_swarm_info(self):
         """Обновление информации о состоянии роя"""
-        if self.drone_swarm:
-            error = self.drone_swarm.get_average_error()
-            self.error_var.set(f"{error:.2f} м")
-            
-            if self.drone_swarm.is_converged():
-                self.converge_var.set("Сходимость достигнута")
-            else:
-                self.converge_var.set("В процессе")
-        
+        profiler = self.visualization.profiler
+        with profiler.phase("status_labels"):
+            if self.drone_swarm:
+                error = self.drone_swarm.get_average_error()
+                self.error_var.set(f"{error:.2f} м")
+
+                if self.drone_swarm.is_converged():
+                    self.converge_var.set("Сходимость достигнута")
+                else:
+                    self.converge_var.set("В процессе")
+
+        if profiler.enabled:
+            self.visualization.update_profile()
+            self.profile_var.set(profiler.format_summary())
+
         # Планирование следующего обновления
         self.after(1000, self.update_swarm_info)
     
@@ -95,6 +155,90 @@ class DroneSwarmApp(tk.Tk):
                 "Сначала необходимо загрузить изображение и создать рой"
             )
     
+    def toggle_multi_contour(self):
+        """Выделение всех значимых контуров (с отверстиями) вместо одного"""
+        self.image_processor.multi_contour = self.multi_contour_var.get()
+
+    def toggle_fit_contour(self):
+        """Упрощение контура до вершины на дрона (для уже загруженного - без обработки)"""
+        if not (self.fit_contour_var.get() and self.image_loaded):
+            return
+        try:
+            drone_count = int(self.drone_count_var.get())
+            contour_points = self.image_processor.resimplify(drone_count)
+            target_points = self.image_processor.formation_points(drone_count, seed=0)
+            self.replace_swarm(drone_count, target_points, contour_points,
+                               self.image_processor.contour_offsets)
+        except Exception as e:
+            messagebox.showerror(
+                "Ошибка",
+                f"Ошибка при упрощении контура: {str(e)}"
+            )
+
+    def set_fill_mode(self):
+        """Размещение целей по контуру или внутри фигуры"""
+        self.image_processor.fill_mode = self.fill_mode_var.get()
+
+    def toggle_max_speed(self):
+        """Переключение режима максимальной скорости симуляции"""
+        if self.visualization:
+            self.visualization.set_max_speed(self.max_speed_var.get())
+
+    def toggle_profiling(self):
+        """Включение замера времени фаз шага и кадра"""
+        enabled = self.profiling_var.get()
+        self.visualization.set_profiling(enabled)
+        self.profile_var.set("Включено" if enabled else "Выключено")
+
+    def export_profile(self):
+        """Сохранение статистики фаз в CSV или JSON"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json"), ("Все файлы", "*.*")]
+        )
+        if filename:
+            self.visualization.update_profile()
+            self.visualization.profiler.export(filename)
+
+    def start_recording(self):
+        """Запись траектории роя в файл"""
+        if not self.drone_swarm or self.visualization.replay is not None:
+            messagebox.showerror(
+                "Ошибка",
+                "Сначала необходимо загрузить изображение и создать рой"
+            )
+            return
+
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".traj",
+            filetypes=[("Траектории", "*.traj"), ("Все файлы", "*.*")]
+        )
+        if filename:
+            self.visualization.start_recording(filename)
+
+    def stop_recording(self):
+        """Остановка записи траектории"""
+        self.visualization.stop_recording()
+
+    def open_replay(self):
+        """Воспроизведение записанной траектории"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("Траектории", "*.traj"), ("Все файлы", "*.*")]
+        )
+        if not filename:
+            return
+
+        try:
+            previous_swarm = self.drone_swarm
+            self.drone_swarm = self.visualization.start_replay(filename)
+            self.close_swarm(previous_swarm)
+            self.start_button['state'] = tk.NORMAL
+        except Exception as e:
+            messagebox.showerror(
+                "Ошибка",
+                f"Ошибка при открытии записи: {str(e)}"
+            )
+
     def start_simulation(self):
         """Запуск симуляции"""
         self.start_button['state'] = tk.DISABLED
@@ -148,6 +292,17 @@ class DroneSwarmApp(tk.Tk):
         - Колесико мыши: масштабирование
         - Клавиша R: сброс положения камеры
         - Пробел: перераспределение целевых точек
+        - Клавиша M: режим максимальной скорости симуляции
+        
+        Меню 'Вид' -> 'Профилирование' включает замер времени фаз шага
+        и кадра; статистика выводится в панели статуса роя и сохраняется
+        через 'Файл' -> 'Экспорт профиля...'
+        
+        При воспроизведении записи траектории:
+        - Пробел: пауза / продолжение
+        - Стрелки влево/вправо: кадр назад/вперед
+        - Стрелки вверх/вниз: ускорение/замедление
+        - Backspace: обратное направление, Home/End: начало/конец записи
         
         В режиме симуляции:
         - Дроны автоматически выстраиваются по контуру изображения
@@ -240,6 +395,10 @@ class DroneSwarmApp(tk.Tk):
         ttk.Label(self.status_frame, text="Статус сходимости:").pack(anchor=tk.W)
         self.converge_var = tk.StringVar(value="N/A")
         ttk.Label(self.status_frame, textvariable=self.converge_var).pack(anchor=tk.W)
+
+        ttk.Label(self.status_frame, text="Время фаз, мс (p50 / p95 / p99):").pack(anchor=tk.W)
+        self.profile_var = tk.StringVar(value="Выключено")
+        ttk.Label(self.status_frame, textvariable=self.profile_var, justify=tk.LEFT).pack(anchor=tk.W)
         
         # Область визуализации
         self.visualization = Visualization3D(self.visualization_frame)
@@ -260,35 +419,32 @@ class DroneSwarmApp(tk.Tk):
         
         if filename:
             try:
-                # Обработка изображения
-                contour_points = self.image_processor.process_image(filename)
+                # Обработка изображения; контур можно упростить до
+                # вершины на дрона (см. ImageProcessor.simplify)
+                target_count = None
+                if self.fit_contour_var.get():
+                    target_count = int(self.drone_count_var.get())
+                contour_points = self.image_processor.process_image(
+                    filename, target_count, target_count
+                )
+                self.image_loaded = True
                 
                 # Активация кнопки автоматического расчета
                 self.auto_count_button['state'] = tk.NORMAL
                 
                 # Получение рекомендуемого количества дронов
                 recommended = self.image_processor.get_recommended_drone_count()
-                self.drone_count_var.set(str(recommended))
+                if target_count is None:
+                    self.drone_count_var.set(str(recommended))
                 
                 # Получение количества дронов из поля ввода
                 drone_count = int(self.drone_count_var.get())
                 
-                # Равномерное распределение точек
-                if len(contour_points) > drone_count:
-                    # Если точек больше чем дронов, равномерно распределяем
-                    evenly_distributed_points = self.image_processor.distribute_points_evenly(drone_count)
-                    self.drone_swarm = DroneSwarm(drone_count, evenly_distributed_points)
-                else:
-                    # Иначе используем все точки контура
-                    self.drone_swarm = DroneSwarm(drone_count, contour_points)
+                # Точки по контуру или внутри фигуры (см. ImageProcessor.fill_mode)
+                target_points = self.image_processor.formation_points(drone_count, seed=0)
                 
-                # Обновление визуализации
-                self.visualization.set_target_points(contour_points)
-                self.visualization.set_drones(self.drone_swarm.get_drones())
-                self.visualization.set_drone_swarm(self.drone_swarm)
-                
-                # Активация кнопок
-                self.start_button['state'] = tk.NORMAL
+                self.replace_swarm(drone_count, target_points, contour_points,
+                                   self.image_processor.contour_offsets)
                 
                 messagebox.showinfo(
                     "Успех",
@@ -303,6 +459,90 @@ class DroneSwarmApp(tk.Tk):
                     f"Ошибка при загрузке изображения: {str(e)}"
                 )
     
+    def load_targets_file(self):
+        """Загрузка готового файла целей (например, из pso compile)"""
+        filename = filedialog.askopenfilename(
+            filetypes=[
+                ("Файлы целей", "*.npy *.npz *.csv"),
+                ("Все файлы", "*.*")
+            ]
+        )
+
+        if filename:
+            try:
+                target_points = load_targets(filename)
+                self.image_loaded = False
+                self.drone_count_var.set(str(len(target_points)))
+                self.replace_swarm(len(target_points), target_points, target_points)
+            except Exception as e:
+                messagebox.showerror(
+                    "Ошибка",
+                    f"Ошибка при загрузке файла целей: {str(e)}"
+                )
+
+    def load_show(self):
+        """Загрузка последовательности формаций из манифеста pso compile"""
+        filename = filedialog.askopenfilename(
+            filetypes=[
+                ("Манифест шоу", "manifest.json"),
+                ("Все файлы", "*.*")
+            ]
+        )
+
+        if filename:
+            try:
+                formations = load_manifest(filename)
+                if not formations:
+                    raise ValueError("В манифесте нет формаций")
+                target_points = load_targets(formations[0]["targets"])
+                drone_count = formations[0]["num_drones"]
+                self.image_loaded = False
+                self.drone_count_var.set(str(drone_count))
+                self.replace_swarm(drone_count, target_points, target_points,
+                                   formations[0]["offsets"])
+                self.show_formations = formations
+            except Exception as e:
+                messagebox.showerror(
+                    "Ошибка",
+                    f"Ошибка при загрузке манифеста: {str(e)}"
+                )
+
+    def next_show_formation(self):
+        """Переход роя к следующей формации шоу (по кругу)"""
+        if not self.show_formations or not self.drone_swarm:
+            return
+
+        self.show_index = (self.show_index + 1) % len(self.show_formations)
+        formation = self.show_formations[self.show_index]
+        try:
+            target_points = load_targets(formation["targets"])
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Ошибка при загрузке формации: {str(e)}")
+            return
+        self.drone_swarm.set_target_points(target_points)
+        self.visualization.set_target_points(target_points, formation["offsets"])
+
+    def replace_swarm(self, drone_count, target_points, outline_points, outline_offsets=None):
+        """Создание нового роя вместо текущего (шоу из манифеста сбрасывается)"""
+        previous_swarm = self.drone_swarm
+        self.show_formations = []
+        self.show_index = 0
+        self.visualization.stop_recording()
+        self.visualization.stop_replay()
+        if self.use_worker_process.get():
+            self.drone_swarm = SimulationProcess(drone_count, target_points)
+        else:
+            self.drone_swarm = DroneSwarm(drone_count, target_points)
+
+        # Обновление визуализации
+        self.visualization.set_target_points(outline_points, outline_offsets)
+        self.visualization.set_state(self.drone_swarm.get_state())
+        self.visualization.set_drone_swarm(self.drone_swarm)
+        self.close_swarm(previous_swarm)
+
+        # Активация кнопок
+        self.start_button['state'] = tk.NORMAL
+
     def set_base_coordinates(self):
         """Диалог установки базовых координат"""
         dialog = tk.Toplevel(self)
@@ -350,10 +590,16 @@ class DroneSwarmApp(tk.Tk):
         
         ttk.Button(dialog, text="Применить", command=apply_coordinates).pack(pady=10)
         
+    def close_swarm(self, swarm):
+        """Остановка рабочего процесса симуляции, если он есть"""
+        if getattr(swarm, "runs_in_background", False):
+            swarm.close()
+
     def on_closing(self):
         """Обработка закрытия приложения"""
         if self.visualization:
             self.visualization.cleanup()
+        self.close_swarm(self.drone_swarm)
         self.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""Перебор параметров PSO в пуле процессов
+
+Целевые точки один раз копируются в разделяемую память, и все рабочие
+процессы читают один и тот же массив без сериализации. Каждый завершенный
+прогон сразу дописывается строкой JSON в файл результатов, поэтому
+прерванный перебор продолжается с места остановки.
+"""
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simulation_runner import PSO_PARAMS, create_swarm, run_swarm
+
+
+# Целевые точки в рабочем процессе (вид на разделяемую память)
+_worker_memory = None
+_worker_targets = None
+
+
+def grid_configs(space):
+    """Все сочетания значений: space = {параметр: [значения]}"""
+    names = sorted(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_configs(space, count, seed=0):
+    """Случайные конфигурации: space = {параметр: (минимум, максимум)}"""
+    rng = np.random.default_rng(seed)
+    names = sorted(space)
+    for _ in range(count):
+        yield {name: float(rng.uniform(*space[name])) for name in names}
+
+
+def targets_digest(target_points):
+    """Хэш набора целевых точек (форма и значения float64)"""
+    targets = np.ascontiguousarray(target_points, dtype=float)
+    digest = hashlib.sha1(str(targets.shape).encode("utf-8"))
+    digest.update(targets.tobytes())
+    return digest.hexdigest()
+
+
+def config_id(params, num_drones, seed, targets_key=None, run_options=None):
+    """Устойчивый идентификатор прогона для продолжения перебора
+
+    Кроме параметров PSO учитываются набор целей (targets_key) и параметры
+    прогона, поэтому файл результатов другого перебора не дает ложных
+    "уже выполненных" прогонов.
+    """
+    key = json.dumps({
+        "params": params,
+        "drones": num_drones,
+        "seed": seed,
+        "targets": targets_key,
+        "run_options": run_options or {},
+    }, sort_keys=True)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _init_worker(memory_name, shape, dtype):
+    global _worker_memory, _worker_targets
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    _worker_targets = np.ndarray(shape, dtype=dtype, buffer=_worker_memory.buf)
+    _worker_targets.flags.writeable = False
+
+
+def _run_config(run_id, params, num_drones, seed, run_options):
+    swarm = create_swarm(num_drones, _worker_targets, params, seed=seed)
+    result = run_swarm(swarm, **run_options)
+    result["id"] = run_id
+    return result
+
+
+def load_finished(results_path):
+    """Результаты уже завершенных прогонов {id: результат}"""
+    finished = {}
+    if not os.path.exists(results_path):
+        return finished
+
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # Последняя строка могла оборваться при прерывании
+                continue
+            finished[result["id"]] = result
+    return finished
+
+
+def run_sweep(target_points, num_drones, configs, results_path, seeds=(0,),
+              workers=None, run_options=None, log=print):
+    """Перебор конфигураций; возвращает список результатов всех прогонов"""
+    configs = list(configs)
+    for params in configs:
+        for name in params:
+            if name not in PSO_PARAMS:
+                raise ValueError(f"Неизвестный параметр PSO: {name}")
+
+    run_options = run_options or {}
+    targets_key = targets_digest(target_points)
+    finished = load_finished(results_path)
+
+    pending = []
+    for params in configs:
+        for seed in seeds:
+            run_id = config_id(params, num_drones, seed, targets_key, run_options)
+            if run_id not in finished:
+                pending.append((run_id, params, seed))
+
+    if log:
+        total = len(configs) * len(seeds)
+        log(f"Прогонов: {total}, уже выполнено: {total - len(pending)}")
+
+    if pending:
+        targets = np.ascontiguousarray(target_points, dtype=float)
+        memory = shared_memory.SharedMemory(create=True, size=max(targets.nbytes, 1))
+        try:
+            np.ndarray(targets.shape, dtype=targets.dtype, buffer=memory.buf)[:] = targets
+
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(memory.name, targets.shape, targets.dtype.str),
+            ) as pool, open(results_path, "a", encoding="utf-8") as out:
+                futures = [
+                    pool.submit(_run_config, run_id, params, num_drones, seed, run_options)
+                    for run_id, params, seed in pending
+                ]
+                for done, future in enumerate(as_completed(futures), 1):
+                    result = future.result()
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                    finished[result["id"]] = result
+                    if log:
+                        log(f"[{done}/{len(pending)}] ошибка {result['final_error']:.3f}, "
+                            f"шагов {result['steps']}")
+        finally:
+            memory.close()
+            memory.unlink()
+
+    wanted = {
+        config_id(params, num_drones, seed, targets_key, run_options)
+        for params in configs for seed in seeds
+    }
+    return [result for run_id, result in finished.items() if run_id in wanted]
+
+
+def summarize(results, names):
+    """Сводка по конфигурациям (усреднение по seed)
+
+    Возвращает строки (параметры, доля сходимости, среднее число шагов до
+    сходимости, среднее время, средняя итоговая ошибка), отсортированные по
+    ошибке.
+    """
+    groups = {}
+    for result in results:
+        key = tuple(result["params"][name] for name in names)
+        groups.setdefault(key, []).append(result)
+
+    rows = []
+    for key, group in groups.items():
+        converged = [r["steps_to_convergence"] for r in group if r["converged"]]
+        rows.append((
+            dict(zip(names, key)),
+            len(converged) / len(group),
+            float(np.mean(converged)) if converged else None,
+            float(np.mean([r["wall_time"] for r in group])),
+            float(np.mean([r["final_error"] for r in group])),
+        ))
+
+    rows.sort(key=lambda row: row[4])
+    return rows
@@ -0,0 +1,118 @@
+"""Замер времени фаз шага симуляции и кадра отрисовки
+
+Профилировщик хранит последние window замеров каждой фазы в кольцевом
+буфере и выдает скользящие процентили. Выключенный профилировщик
+возвращает общий пустой контекст и ничего не замеряет.
+"""
+import contextlib
+import csv
+import json
+import time
+
+import numpy as np
+
+
+_NULL_PHASE = contextlib.nullcontext()
+
+SUMMARY_FIELDS = ("phase", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+class _Phase:
+    """Замер одной фазы; объект переиспользуется между вызовами"""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = self.profiler.timer()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.profiler.timer() - self.start)
+        return False
+
+
+class PhaseProfiler:
+    """Скользящая статистика длительности именованных фаз
+
+    Использование: with profiler.phase("separation"): ...
+    """
+
+    def __init__(self, window=600, enabled=False, timer=time.perf_counter):
+        self.window = window
+        self.enabled = enabled
+        self.timer = timer
+
+        self.samples = {}
+        self.counts = {}
+        self._phases = {}
+        # Готовая статистика фаз из другого процесса (рабочего процесса роя)
+        self.external = []
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_PHASE
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def add(self, name, seconds):
+        """Добавление замера фазы (в секундах)"""
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = np.zeros(self.window)
+            self.counts[name] = 0
+        samples[self.counts[name] % self.window] = seconds
+        self.counts[name] += 1
+
+    def reset(self):
+        self.samples.clear()
+        self.counts.clear()
+        self.external = []
+
+    def set_external(self, rows):
+        """Статистика фаз, замеренных в другом процессе (строки summary)"""
+        self.external = list(rows)
+
+    def summary(self):
+        """Статистика по фазам в миллисекундах, в порядке первого замера"""
+        rows = []
+        for name, samples in self.samples.items():
+            count = self.counts[name]
+            recent = samples[:min(count, self.window)] * 1000.0
+            p50, p95, p99 = np.percentile(recent, (50, 95, 99))
+            rows.append({
+                "phase": name,
+                "count": count,
+                "mean_ms": float(recent.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(recent.max()),
+            })
+        return rows + self.external
+
+    def format_summary(self):
+        """Текст для панели статуса: фаза p50/p95/p99 в мс"""
+        lines = [
+            f"{row['phase']}: {row['p50_ms']:.2f} / {row['p95_ms']:.2f} / {row['p99_ms']:.2f}"
+            for row in self.summary()
+        ]
+        return "\n".join(lines) if lines else "Нет данных"
+
+    def export(self, path):
+        """Сохранение статистики в .json или .csv (по расширению файла)"""
+        rows = self.summary()
+        if path.endswith(".json"):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"window": self.window, "phases": rows}, f, ensure_ascii=False, indent=2)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
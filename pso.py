@@ -0,0 +1,445 @@
+"""Командная строка для запуска роя без графического интерфейса
+
+Примеры:
+    python -m pso run --targets formation.npy --drones 500 --steps 5000
+    python -m pso compile show/ --drones 500 --output show_targets/
+    python -m pso show clip.mp4 --drones 500 --formation-rate 2 --record show.traj
+    python -m pso show show_targets/ --formation-rate 0.5
+    python -m pso bench --output baseline.json
+    python -m pso compare baseline.json current.json --tolerance 0.1
+    python -m pso sweep --targets formation.npy --results sweep.jsonl \
+        --grid inertia_weight=0.5,0.6,0.7 --grid social_param=1.2,1.4
+    python -m pso ensemble --targets formation.npy --drones 200 --swarms 4 \
+        --vary inertia_weight=0.4,0.5,0.6,0.7
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import sys
+import time
+
+import benchmarks
+import formation_compiler
+import formation_stream
+import parameter_sweep
+from formation_cache import FormationCache
+from swarm_checkpoint import load_checkpoint, save_checkpoint
+from swarm_ensemble import SwarmEnsemble
+from trajectory import TrajectoryRecorder
+from simulation_runner import (
+    PSO_PARAMS, create_swarm, load_targets, run_swarm, targets_from_image
+)
+
+
+def add_pso_arguments(parser):
+    """Общие параметры PSO для подкоманд"""
+    group = parser.add_argument_group("параметры PSO")
+    group.add_argument("--inertia-weight", type=float)
+    group.add_argument("--cognitive-param", type=float)
+    group.add_argument("--social-param", type=float)
+    group.add_argument("--max-velocity", type=float)
+    group.add_argument("--slowdown-factor", type=float)
+    group.add_argument("--personal-space", type=float)
+    group.add_argument("--separation-weight", type=float)
+
+
+def pso_params_from_args(args):
+    return {name: getattr(args, name) for name in PSO_PARAMS if getattr(args, name) is not None}
+
+
+def load_formation(args):
+    """Целевые точки и число дронов из аргументов --image/--targets/--drones"""
+    if args.image:
+        cache = FormationCache(args.cache_dir) if args.cache_dir else None
+        return targets_from_image(args.image, args.drones, cache=cache,
+                                  target_count=args.contour_points)
+
+    targets = load_targets(args.targets)
+    return targets, args.drones if args.drones is not None else len(targets)
+
+
+def write_json(result, output):
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def command_run(args):
+    if args.resume:
+        swarm = load_checkpoint(args.resume)
+        for name, value in pso_params_from_args(args).items():
+            setattr(swarm, name, value)
+    else:
+        targets, num_drones = load_formation(args)
+        swarm = create_swarm(num_drones, targets, pso_params_from_args(args), seed=args.seed)
+
+    recorder = None
+    if args.record:
+        recorder = TrajectoryRecorder(args.record, len(swarm.positions), dtype=args.record_dtype)
+    swarm.profiler.enabled = bool(args.profile)
+
+    try:
+        result = run_swarm(
+            swarm,
+            max_steps=args.steps,
+            time_budget=args.time_budget,
+            threshold=args.threshold,
+            stop_on_convergence=not args.no_stop,
+            recorder=recorder,
+        )
+    finally:
+        if recorder is not None:
+            recorder.close()
+    result["source"] = args.image or args.targets or args.resume
+    if args.checkpoint:
+        save_checkpoint(swarm, args.checkpoint)
+    if args.profile:
+        swarm.profiler.export(args.profile)
+    write_json(result, args.output)
+    return 0
+
+
+def command_bench(args):
+    drone_counts = benchmarks.DRONE_COUNTS
+    contour_sizes = benchmarks.CONTOUR_SIZES
+    if args.quick:
+        drone_counts = tuple(n for n in drone_counts if n <= 1000)
+        contour_sizes = tuple(n for n in contour_sizes if n <= 1000)
+
+    results = benchmarks.run_benchmarks(
+        drone_counts=drone_counts,
+        contour_sizes=contour_sizes,
+        repeats=args.repeats,
+        budget=args.budget,
+        pattern=args.filter,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+    if args.output:
+        benchmarks.save_results(results, args.output)
+    else:
+        write_json(results, None)
+    return 0
+
+
+def command_compare(args):
+    rows = benchmarks.compare_results(
+        benchmarks.load_results(args.baseline),
+        benchmarks.load_results(args.current),
+        args.tolerance,
+    )
+
+    regressions = 0
+    for name, base, current, ratio, regression in rows:
+        mark = "ЗАМЕДЛЕНИЕ" if regression else ""
+        print(f"{name:45s} {base * 1e3:12.3f} {current * 1e3:12.3f} мс  x{ratio:6.2f}  {mark}")
+        regressions += regression
+
+    print(f"Случаев: {len(rows)}, замедлений: {regressions}")
+    return 1 if regressions else 0
+
+
+def parse_space(items, random_mode):
+    """Разбор "имя=1,2,3" (сетка) или "имя=мин:макс" (случайный поиск)"""
+    space = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        name = name.strip().replace("-", "_")
+        if random_mode:
+            low, high = values.split(":")
+            space[name] = (float(low), float(high))
+        else:
+            space[name] = [float(v) for v in values.split(",")]
+    return space
+
+
+def command_sweep(args):
+    targets, num_drones = load_formation(args)
+
+    if args.random:
+        names = sorted(parse_space(args.random, True))
+        configs = parameter_sweep.random_configs(
+            parse_space(args.random, True), args.samples, args.sweep_seed
+        )
+    else:
+        names = sorted(parse_space(args.grid, False))
+        configs = parameter_sweep.grid_configs(parse_space(args.grid, False))
+
+    results = parameter_sweep.run_sweep(
+        targets,
+        num_drones,
+        configs,
+        args.results,
+        seeds=list(range(args.seeds)),
+        workers=args.workers,
+        run_options={
+            "max_steps": args.steps,
+            "time_budget": args.time_budget,
+            "threshold": args.threshold,
+        },
+        log=lambda line: print(line, file=sys.stderr),
+    )
+
+    rows = parameter_sweep.summarize(results, names)
+    if args.json:
+        write_json([
+            {
+                "params": params,
+                "converged_share": share,
+                "mean_steps_to_convergence": steps,
+                "mean_wall_time": wall_time,
+                "mean_final_error": error,
+            }
+            for params, share, steps, wall_time, error in rows
+        ], None)
+        return 0
+
+    header = " ".join(f"{name:>16s}" for name in names)
+    print(f"{header} {'сходимость':>10s} {'шагов':>10s} {'время, с':>10s} {'ошибка':>10s}")
+    for params, share, steps, wall_time, error in rows:
+        values = " ".join(f"{params[name]:16.4f}" for name in names)
+        steps_str = f"{steps:10.1f}" if steps is not None else f"{'-':>10s}"
+        print(f"{values} {share:10.0%} {steps_str} {wall_time:10.3f} {error:10.3f}")
+    return 0
+
+
+def command_ensemble(args):
+    targets, num_drones = load_formation(args)
+
+    # Значения --vary задаются по одному на рой; остальные параметры общие
+    params = pso_params_from_args(args)
+    params.update(parse_space(args.vary or [], False))
+    num_swarms = args.swarms or max([len(values) for values in params.values()
+                                     if isinstance(values, list)], default=1)
+
+    start = time.perf_counter()
+    ensemble = SwarmEnsemble(num_swarms, num_drones, targets, params, seed=args.seed)
+    ensemble.convergence_threshold = args.threshold
+    ensemble.run(args.steps)
+
+    write_json({
+        "source": args.image or args.targets,
+        "num_swarms": num_swarms,
+        "num_drones": num_drones,
+        "steps": ensemble.step_count,
+        "wall_time": time.perf_counter() - start,
+        "swarms": ensemble.get_results(),
+    }, args.output)
+    return 0
+
+
+def command_compile(args):
+    manifest = formation_compiler.compile_formations(
+        args.source,
+        args.drones,
+        args.output,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        multi_contour=args.multi_contour,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+    failed = [entry for entry in manifest["formations"] if "error" in entry]
+    for entry in failed:
+        print(f"{entry['image']}: {entry['error']}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def command_show(args):
+    # Каталог pso compile (или его manifest.json) проигрывается без обработки кадров
+    manifest = formation_compiler.find_manifest(args.source)
+    if manifest is not None:
+        stream = contextlib.nullcontext()
+        formations = formation_stream.manifest_formations(manifest)
+    elif args.drones is None:
+        print("Для видео и изображений нужно задать --drones", file=sys.stderr)
+        return 2
+    else:
+        def configure(processor):
+            processor.multi_contour = args.multi_contour
+            processor.fill_mode = args.fill_mode
+
+        stream = formation_stream.FormationStream(
+            args.source,
+            args.drones,
+            workers=args.workers,
+            max_pending=args.max_pending,
+            min_change=args.min_change,
+            frame_step=args.frame_step,
+            configure=configure,
+        )
+        formations = stream
+    steps_per_formation = max(1, round(1.0 / (args.formation_rate * args.dt)))
+
+    recorder = None
+    with stream:
+        formations = iter(formations)
+        first = next(formations, None)
+        if first is None:
+            print("В источнике нет кадров с контуром", file=sys.stderr)
+            return 1
+
+        num_drones = args.drones if args.drones is not None else len(first.targets)
+        swarm = create_swarm(num_drones, first.targets, pso_params_from_args(args), seed=args.seed)
+        if args.record:
+            recorder = TrajectoryRecorder(args.record, num_drones, dtype=args.record_dtype)
+        try:
+            result = formation_stream.play_formations(
+                swarm,
+                itertools.chain([first], formations),
+                steps_per_formation,
+                recorder=recorder,
+                log=(lambda line: print(line, file=sys.stderr)) if args.verbose else None,
+            )
+        finally:
+            if recorder is not None:
+                recorder.close()
+
+    result["source"] = args.source
+    if manifest is None:
+        result.update({
+            "frames_read": stream.frames_read,
+            "skipped": stream.skipped,
+            "failed": stream.failed,
+        })
+    write_json(result, args.output)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pso", description="Симуляция роя дронов без GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="прогон роя до сходимости или исчерпания бюджета")
+    source = run.add_mutually_exclusive_group(required=True)
+    source.add_argument("--image", help="изображение с контуром формации")
+    source.add_argument("--targets", help="файл целевых точек (.npy, .npz, .csv)")
+    source.add_argument("--resume", help="продолжить с контрольной точки (.npz)")
+    run.add_argument("--drones", type=int, help="количество дронов")
+    run.add_argument("--cache-dir", help="каталог кэша обработанных изображений")
+    run.add_argument("--contour-points", type=int,
+                     help="упростить контур изображения примерно до стольких вершин")
+    run.add_argument("--steps", type=int, default=10000, help="максимум шагов")
+    run.add_argument("--seed", type=int, help="seed генератора случайных чисел")
+    run.add_argument("--checkpoint", help="сохранить состояние роя после прогона (.npz)")
+    run.add_argument("--record", help="записать траекторию в файл")
+    run.add_argument("--record-dtype", choices=("float32", "float64"), default="float32",
+                     help="точность записи траектории")
+    run.add_argument("--profile", help="сохранить время фаз шага (.csv или .json)")
+    run.add_argument("--time-budget", type=float, help="ограничение по времени, с")
+    run.add_argument("--threshold", type=float, default=1.0, help="порог сходимости, м")
+    run.add_argument("--no-stop", action="store_true",
+                     help="не останавливаться при достижении сходимости")
+    run.add_argument("--output", help="файл для JSON-отчета (по умолчанию stdout)")
+    add_pso_arguments(run)
+    run.set_defaults(handler=command_run)
+
+    sweep = commands.add_parser("sweep", help="перебор параметров PSO в пуле процессов")
+    source = sweep.add_mutually_exclusive_group(required=True)
+    source.add_argument("--image", help="изображение с контуром формации")
+    source.add_argument("--targets", help="файл целевых точек (.npy, .npz, .csv)")
+    sweep.add_argument("--drones", type=int, help="количество дронов")
+    sweep.add_argument("--cache-dir", help="каталог кэша обработанных изображений")
+    sweep.add_argument("--contour-points", type=int,
+                        help="упростить контур изображения примерно до стольких вершин")
+    space = sweep.add_mutually_exclusive_group(required=True)
+    space.add_argument("--grid", action="append", metavar="ИМЯ=З1,З2,...",
+                       help="значения параметра для перебора по сетке")
+    space.add_argument("--random", action="append", metavar="ИМЯ=МИН:МАКС",
+                       help="диапазон параметра для случайного поиска")
+    sweep.add_argument("--samples", type=int, default=20, help="число случайных конфигураций")
+    sweep.add_argument("--sweep-seed", type=int, default=0, help="seed случайного поиска")
+    sweep.add_argument("--seeds", type=int, default=1, help="прогонов на конфигурацию")
+    sweep.add_argument("--workers", type=int, help="число процессов")
+    sweep.add_argument("--results", required=True,
+                       help="файл результатов (JSON lines), используется для продолжения")
+    sweep.add_argument("--steps", type=int, default=10000, help="максимум шагов")
+    sweep.add_argument("--time-budget", type=float, help="ограничение по времени на прогон, с")
+    sweep.add_argument("--threshold", type=float, default=1.0, help="порог сходимости, м")
+    sweep.add_argument("--json", action="store_true", help="сводка в формате JSON")
+    sweep.set_defaults(handler=command_sweep)
+
+    ensemble = commands.add_parser("ensemble", help="ансамбль роев одной формации в одном процессе")
+    source = ensemble.add_mutually_exclusive_group(required=True)
+    source.add_argument("--image", help="изображение с контуром формации")
+    source.add_argument("--targets", help="файл целевых точек (.npy, .npz, .csv)")
+    ensemble.add_argument("--drones", type=int, help="количество дронов в каждом рое")
+    ensemble.add_argument("--cache-dir", help="каталог кэша обработанных изображений")
+    ensemble.add_argument("--contour-points", type=int,
+                            help="упростить контур изображения примерно до стольких вершин")
+    ensemble.add_argument("--swarms", type=int,
+                          help="число роев (по умолчанию - по числу значений --vary)")
+    ensemble.add_argument("--vary", action="append", metavar="ИМЯ=З1,З2,...",
+                          help="значения параметра PSO по роям")
+    ensemble.add_argument("--seed", type=int, help="seed генератора случайных чисел")
+    ensemble.add_argument("--steps", type=int, default=10000, help="максимум шагов")
+    ensemble.add_argument("--threshold", type=float, default=1.0, help="порог сходимости, м")
+    ensemble.add_argument("--output", help="файл для JSON-отчета (по умолчанию stdout)")
+    add_pso_arguments(ensemble)
+    ensemble.set_defaults(handler=command_ensemble)
+
+    compile_ = commands.add_parser("compile", help="файлы целей для каталога изображений")
+    compile_.add_argument("source", help="каталог изображений или шаблон glob")
+    compile_.add_argument("--drones", type=int,
+                          help="количество дронов (по умолчанию - по числу точек контура)")
+    compile_.add_argument("--output", required=True, help="каталог для файлов целей и манифеста")
+    compile_.add_argument("--workers", type=int, help="число процессов")
+    compile_.add_argument("--cache-dir", help="каталог кэша обработанных изображений")
+    compile_.add_argument("--multi-contour", action="store_true",
+                          help="все значимые контуры изображения, включая отверстия")
+    compile_.set_defaults(handler=command_compile)
+
+    show = commands.add_parser("show", help="анимированное шоу по видео или последовательности изображений")
+    show.add_argument("source",
+                      help="видеофайл, каталог изображений, шаблон glob или манифест pso compile")
+    show.add_argument("--drones", type=int,
+                      help="количество дронов (для манифеста - по числу целей первой формации)")
+    show.add_argument("--formation-rate", type=float, default=2.0,
+                      help="формаций в секунду времени симуляции")
+    show.add_argument("--dt", type=float, default=1.0 / 60.0, help="шаг симуляции, с")
+    show.add_argument("--frame-step", type=int, default=1, help="брать каждый n-й кадр")
+    show.add_argument("--min-change", type=float, default=0.25,
+                      help="пропускать формации, сместившиеся меньше чем на столько метров")
+    show.add_argument("--workers", type=int, default=2, help="число потоков обработки кадров")
+    show.add_argument("--max-pending", type=int, default=8,
+                      help="предел кадров в конвейере (ограничивает память)")
+    show.add_argument("--multi-contour", action="store_true",
+                      help="все значимые контуры кадра, включая отверстия")
+    show.add_argument("--fill-mode", choices=("auto", "outline", "fill"), default="auto",
+                      help="размещение целей: по контуру или внутри фигуры")
+    show.add_argument("--seed", type=int, help="seed генератора случайных чисел")
+    show.add_argument("--record", help="записать траекторию в файл")
+    show.add_argument("--record-dtype", choices=("float32", "float64"), default="float32",
+                      help="точность записи траектории")
+    show.add_argument("--verbose", action="store_true", help="ошибка после каждой формации")
+    show.add_argument("--output", help="файл для JSON-отчета (по умолчанию stdout)")
+    add_pso_arguments(show)
+    show.set_defaults(handler=command_show)
+
+    bench = commands.add_parser("bench", help="бенчмарки горячих участков")
+    bench.add_argument("--output", help="файл для JSON-результатов (по умолчанию stdout)")
+    bench.add_argument("--quick", action="store_true", help="только небольшие размеры")
+    bench.add_argument("--filter", help="подстрока в имени случая")
+    bench.add_argument("--repeats", type=int, default=5, help="замеров на случай")
+    bench.add_argument("--budget", type=float, default=2.0, help="время на случай, с")
+    bench.set_defaults(handler=command_bench)
+
+    compare = commands.add_parser("compare", help="сравнение результатов с базовыми")
+    compare.add_argument("baseline", help="базовые результаты (JSON)")
+    compare.add_argument("current", help="текущие результаты (JSON)")
+    compare.add_argument("--tolerance", type=float, default=0.1,
+                         help="допустимое относительное замедление")
+    compare.set_defaults(handler=command_compare)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
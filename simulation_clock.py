@@ -0,0 +1,73 @@
+import time
+
+
+class SimulationClock:
+    """Часы симуляции с фиксированным шагом
+
+    Реальное время накапливается в аккумуляторе и расходуется шагами
+    физики длительностью dt, поэтому скорость симуляции не зависит от
+    стоимости отрисовки. Число шагов за кадр ограничено max_substeps:
+    если кадр был слишком долгим, лишнее время отбрасывается, и симуляция
+    не уходит в спираль догоняющих вычислений.
+
+    В режиме максимальной скорости физика считается без привязки к
+    реальному времени, пока не истечет max_speed_budget секунд, после чего
+    кадр отрисовывается.
+    """
+
+    def __init__(self, dt=1.0 / 60.0, max_substeps=5, timer=time.perf_counter):
+        self.dt = dt
+        self.max_substeps = max_substeps
+        self.timer = timer
+
+        self.max_speed = False
+        self.max_speed_budget = 0.05
+
+        self.accumulator = 0.0
+        self.last_time = None
+        self.dropped_time = 0.0
+        self.total_steps = 0
+
+    def reset(self):
+        """Сброс аккумулятора (например, после паузы)"""
+        self.accumulator = 0.0
+        self.last_time = self.timer()
+
+    def advance(self):
+        """Число шагов физики, которые нужно выполнить в текущем кадре"""
+        now = self.timer()
+        if self.last_time is None:
+            self.last_time = now
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        steps = int(self.accumulator // self.dt)
+        if steps > self.max_substeps:
+            # Отбрасывается все накопленное сверх max_substeps шагов, включая остаток
+            self.dropped_time += self.accumulator - self.max_substeps * self.dt
+            steps = self.max_substeps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.dt
+
+        return steps
+
+    def run(self, step):
+        """Выполнение шагов физики за один кадр; возвращает число шагов"""
+        if self.max_speed:
+            deadline = self.timer() + self.max_speed_budget
+            steps = 0
+            while True:
+                step()
+                steps += 1
+                if self.timer() >= deadline:
+                    break
+            # После выхода из режима время не должно накапливаться
+            self.reset()
+        else:
+            steps = self.advance()
+            for _ in range(steps):
+                step()
+
+        self.total_steps += steps
+        return steps
@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+
+from drone_simulation import DroneSwarm
+
+
+# Параметры PSO, которые можно задать снаружи (имя атрибута DroneSwarm)
+PSO_PARAMS = (
+    "inertia_weight",
+    "cognitive_param",
+    "social_param",
+    "max_velocity",
+    "slowdown_factor",
+    "personal_space",
+    "separation_weight",
+)
+
+
+def load_targets(path):
+    """Загрузка сохраненных целевых точек (.npy, .npz или текстовый файл)"""
+    if path.endswith(".npy"):
+        points = np.load(path)
+    elif path.endswith(".npz"):
+        with np.load(path) as data:
+            points = data["targets"]
+    else:
+        points = np.loadtxt(path, delimiter=",")
+
+    points = np.asarray(points, dtype=float)
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise ValueError("Файл целей должен содержать массив N×3")
+    return points
+
+
+def targets_from_image(image_path, num_drones=None, cache=None, processor=None, target_count=None):
+    """Целевые точки по контуру изображения (как при загрузке в GUI)
+
+    cache - FormationCache для повторных загрузок того же изображения;
+    processor - настроенный ImageProcessor (например, с multi_contour);
+    target_count - число вершин упрощенного контура (см. ImageProcessor.simplify).
+    """
+    if processor is None:
+        # OpenCV нужен только для изображений, поэтому импортируется здесь
+        from image_processor import ImageProcessor
+
+        processor = ImageProcessor(cache=cache)
+    processor.process_image(image_path, num_drones, target_count)
+
+    if num_drones is None:
+        num_drones = processor.get_recommended_drone_count()
+    return processor.formation_points(num_drones, seed=0), num_drones
+
+
+def create_swarm(num_drones, target_points, params=None, seed=None):
+    """Создание роя с заданными параметрами PSO"""
+    swarm = DroneSwarm(num_drones, target_points, seed=seed)
+    for name, value in (params or {}).items():
+        if name not in PSO_PARAMS:
+            raise ValueError(f"Неизвестный параметр PSO: {name}")
+        setattr(swarm, name, value)
+    return swarm
+
+
+def run_swarm(swarm, max_steps=10000, time_budget=None, threshold=1.0,
+              stop_on_convergence=True, recorder=None):
+    """Прогон роя без визуализации с максимальной скоростью
+
+    recorder (TrajectoryRecorder) получает кадр после каждого шага.
+    Возвращает словарь с результатами, пригодный для сериализации в JSON.
+    """
+    steps = 0
+    steps_to_convergence = None
+
+    start = time.perf_counter()
+    while steps < max_steps:
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            break
+
+        swarm.update_positions()
+        steps += 1
+        if recorder is not None:
+            recorder.record(swarm)
+
+        if steps_to_convergence is None and swarm.is_converged(threshold):
+            steps_to_convergence = steps
+            if stop_on_convergence:
+                break
+
+    wall_time = time.perf_counter() - start
+    final_error = swarm.get_average_error() if len(swarm.positions) else None
+
+    return {
+        "num_drones": int(len(swarm.positions)),
+        "num_targets": int(len(swarm.target_points)),
+        "seed": swarm.seed,
+        "params": {name: getattr(swarm, name) for name in PSO_PARAMS},
+        "threshold": threshold,
+        "steps": steps,
+        "converged": steps_to_convergence is not None,
+        "steps_to_convergence": steps_to_convergence,
+        "wall_time": wall_time,
+        "steps_per_second": steps / wall_time if wall_time > 0 else None,
+        "final_error": None if final_error is None else float(final_error),
+    }
@@ -0,0 +1,372 @@
+"""Симуляция роя в отдельном процессе
+
+Рабочий процесс владеет DroneSwarm и публикует состояние в разделяемую
+память с тройной буферизацией: запись идет в слот, который не является ни
+текущим, ни занятым читателем, после чего слот становится текущим. GUI
+занимает текущий слот и читает его без копирования, пока не займет
+следующий, поэтому кадр не перезаписывается во время отрисовки. Команды
+(перетаскивание, перераспределение целей, пауза) передаются в рабочий
+процесс через очередь.
+"""
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from drone_simulation import DroneState, DroneSwarm, read_only
+from simulation_clock import SimulationClock
+from trajectory import TrajectoryRecorder
+
+
+# Период отправки статистики профилирования из рабочего процесса, с
+PROFILE_INTERVAL = 0.5
+
+
+class SharedFrameBuffer:
+    """Тройной буфер кадров в разделяемой памяти
+
+    Заголовок (int64): номер текущего слота, слот, занятый читателем, число
+    дронов. Метаданные слота (float64): номер кадра, шаг, средняя ошибка,
+    число активных дронов. Данные слота: позиции, цели, скорости (N×3) и
+    приспособленность (N).
+
+    Выбор слота для записи и захват слота читателем выполняются под общей
+    блокировкой lock; сами запись и чтение идут без блокировки. Писатель
+    никогда не пишет в слот читателя, а читатель видит только полностью
+    записанные слоты.
+    """
+
+    SLOTS = 3
+    HEADER_SIZE = 3
+    META_SIZE = 4
+
+    def __init__(self, num_drones, name=None, lock=None):
+        self.num_drones = num_drones
+        self.lock = lock
+
+        header_bytes = self.HEADER_SIZE * 8
+        meta_bytes = self.SLOTS * self.META_SIZE * 8
+        vectors_bytes = self.SLOTS * 3 * num_drones * 3 * 8
+        fitness_bytes = self.SLOTS * num_drones * 8
+        size = header_bytes + meta_bytes + vectors_bytes + fitness_bytes
+
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        buf = self.memory.buf
+        offset = 0
+        self.header = np.ndarray((self.HEADER_SIZE,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += header_bytes
+        self.meta = np.ndarray((self.SLOTS, self.META_SIZE), dtype=np.float64, buffer=buf, offset=offset)
+        offset += meta_bytes
+        self.vectors = np.ndarray((self.SLOTS, 3, num_drones, 3), dtype=np.float64, buffer=buf, offset=offset)
+        offset += vectors_bytes
+        self.fitness = np.ndarray((self.SLOTS, num_drones), dtype=np.float64, buffer=buf, offset=offset)
+
+        if self.owner:
+            self.header[:] = (0, 0, num_drones)
+            self.meta[:] = 0.0
+            self.vectors[:] = 0.0
+            self.fitness[:] = 0.0
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def publish(self, swarm, frame):
+        """Запись состояния роя в свободный слот и переключение на него"""
+        with self.lock:
+            busy = {int(self.header[0]), int(self.header[1])}
+        slot = next(k for k in range(self.SLOTS) if k not in busy)
+
+        self.vectors[slot, 0] = swarm.positions
+        self.vectors[slot, 1] = swarm.target_positions
+        self.vectors[slot, 2] = swarm.velocities
+        self.fitness[slot] = swarm.best_fitness
+        self.meta[slot] = (
+            frame,
+            swarm.step_count,
+            swarm.get_average_error() if self.num_drones else 0.0,
+            swarm.active_count,
+        )
+
+        with self.lock:
+            self.header[0] = slot
+
+    def acquire(self):
+        """Захват текущего слота читателем; предыдущий слот освобождается"""
+        with self.lock:
+            slot = int(self.header[0])
+            self.header[1] = slot
+        return slot
+
+    def close(self):
+        # Виды на буфер нужно освободить до закрытия разделяемой памяти
+        self.header = self.meta = self.vectors = self.fitness = None
+        try:
+            self.memory.close()
+        except BufferError:
+            # Внешние виды еще живы; память освободится вместе с ними
+            pass
+        if self.owner:
+            self.memory.unlink()
+
+
+def run_worker(memory_name, lock, num_drones, target_points, params, seed, commands, profiles, dt):
+    """Главный цикл рабочего процесса
+
+    При включенном профилировании статистика фаз шага роя раз в
+    PROFILE_INTERVAL секунд отправляется в очередь profiles.
+    """
+    buffer = SharedFrameBuffer(num_drones, name=memory_name, lock=lock)
+    swarm = DroneSwarm(num_drones, target_points, seed=seed)
+    for name, value in params.items():
+        setattr(swarm, name, value)
+
+    clock = SimulationClock(dt=dt)
+    running = False
+    frame = 0
+    buffer.publish(swarm, frame)
+
+    recorder = None
+    profile_sent = time.perf_counter()
+
+    def step():
+        swarm.update_positions()
+        if recorder is not None:
+            recorder.record(swarm)
+
+    try:
+        while True:
+            # Пока симуляция на паузе, ждем команду, не расходуя процессор
+            try:
+                command = commands.get(timeout=0.05) if not running else commands.get_nowait()
+            except queue.Empty:
+                command = None
+
+            handled = command is not None
+            while command is not None:
+                name, args = command[0], command[1:]
+                if name == "quit":
+                    return
+                elif name == "run":
+                    running = args[0]
+                    clock.reset()
+                elif name == "max_speed":
+                    clock.max_speed = args[0]
+                    clock.reset()
+                elif name == "start_dragging":
+                    swarm.start_dragging(*args)
+                elif name == "stop_dragging":
+                    swarm.stop_dragging(*args)
+                elif name == "set_drone_position":
+                    swarm.set_drone_position(args[0], np.asarray(args[1], dtype=float))
+                elif name == "reassign_targets":
+                    swarm.reassign_targets()
+                elif name == "set_target_points":
+                    swarm.set_target_points(args[0])
+                elif name == "profile":
+                    swarm.profiler.enabled = args[0]
+                    swarm.profiler.reset()
+                elif name == "record":
+                    if recorder is not None:
+                        recorder.close()
+                        recorder = None
+                    if args[0]:
+                        recorder = TrajectoryRecorder(args[0], num_drones)
+
+                try:
+                    command = commands.get_nowait()
+                except queue.Empty:
+                    command = None
+
+            steps = clock.run(step) if running else 0
+
+            if swarm.profiler.enabled and time.perf_counter() - profile_sent >= PROFILE_INTERVAL:
+                profiles.put(swarm.profiler.summary())
+                profile_sent = time.perf_counter()
+            if steps == 0:
+                if running:
+                    time.sleep(clock.dt / 4)
+                elif handled:
+                    # Перетаскивание на паузе тоже должно быть видно
+                    frame += 1
+                    buffer.publish(swarm, frame)
+                continue
+
+            frame += 1
+            buffer.publish(swarm, frame)
+    finally:
+        if recorder is not None:
+            recorder.close()
+        buffer.close()
+
+
+class SimulationProcess:
+    """Рой в отдельном процессе с интерфейсом DroneSwarm для GUI
+
+    Методы чтения возвращают виды на слот разделяемой памяти, занятый при
+    последнем вызове get_state, поэтому все данные одного кадра GUI (сцена,
+    панель дрона, статус роя) берутся из одного и того же кадра симуляции.
+    Методы управления отправляют команды в рабочий процесс.
+    """
+
+    runs_in_background = True
+
+    def __init__(self, num_drones, target_points, params=None, seed=None, dt=1.0 / 60.0):
+        target_points = np.array(target_points, dtype=float).reshape(-1, 3)
+        if len(target_points) == 0:
+            num_drones = 0
+
+        # spawn: рабочий процесс не наследует контексты pygame/OpenGL и tkinter
+        context = mp.get_context("spawn")
+        lock = context.Lock()
+
+        self.num_drones = num_drones
+        self.target_points = target_points
+        self.buffer = SharedFrameBuffer(num_drones, lock=lock)
+        self.slot = self.buffer.acquire()
+        self.ids = read_only(np.arange(num_drones, dtype=np.int64))
+
+        self.commands = context.Queue()
+        self.profiles = context.Queue()
+        self.profile_rows = []
+        self.process = context.Process(
+            target=run_worker,
+            args=(self.buffer.name, lock, num_drones, target_points, params or {}, seed,
+                  self.commands, self.profiles, dt),
+            daemon=True,
+        )
+        self.process.start()
+
+    # ------------------------------------------------------------
+    # чтение состояния
+
+    def _slot(self):
+        return self.slot
+
+    @property
+    def positions(self):
+        return self.buffer.vectors[self._slot(), 0]
+
+    @property
+    def target_positions(self):
+        return self.buffer.vectors[self._slot(), 1]
+
+    @property
+    def velocities(self):
+        return self.buffer.vectors[self._slot(), 2]
+
+    @property
+    def frame(self):
+        return int(self.buffer.meta[self._slot(), 0])
+
+    @property
+    def step_count(self):
+        return int(self.buffer.meta[self._slot(), 1])
+
+    @property
+    def active_count(self):
+        return int(self.buffer.meta[self._slot(), 3])
+
+    def get_state(self):
+        """Снимок последнего готового кадра; поколением служит номер кадра
+
+        Слот остается занятым (и не перезаписывается) до следующего вызова.
+        """
+        slot = self.slot = self.buffer.acquire()
+        return DroneState(
+            read_only(self.buffer.vectors[slot, 0]),
+            read_only(self.buffer.vectors[slot, 1]),
+            self.ids,
+            int(self.buffer.meta[slot, 0])
+        )
+
+    def get_drones(self):
+        """Строки занятого слота по одному дрону (без копирования)"""
+        positions = self.positions
+        targets = self.target_positions
+        return [(positions[i], targets[i], i) for i in range(self.num_drones)]
+
+    def get_average_error(self):
+        return float(self.buffer.meta[self._slot(), 2])
+
+    def is_converged(self, threshold=1.0):
+        return self.get_average_error() < threshold
+
+    def get_drone_info(self, drone_index):
+        if 0 <= drone_index < self.num_drones:
+            slot = self._slot()
+            return {
+                "position": self.buffer.vectors[slot, 0, drone_index],
+                "velocity": self.buffer.vectors[slot, 2, drone_index],
+                "target": self.buffer.vectors[slot, 1, drone_index],
+                "fitness": float(self.buffer.fitness[slot, drone_index]),
+                "id": drone_index
+            }
+        return None
+
+    # ------------------------------------------------------------
+    # команды
+
+    def update_positions(self):
+        """Шаги выполняет рабочий процесс"""
+
+    def resume(self):
+        self.commands.put(("run", True))
+
+    def pause(self):
+        self.commands.put(("run", False))
+
+    def set_max_speed(self, enabled):
+        self.commands.put(("max_speed", enabled))
+
+    def set_drone_position(self, drone_index, new_position):
+        self.commands.put(("set_drone_position", drone_index, np.asarray(new_position, dtype=float)))
+
+    def start_dragging(self, drone_index):
+        self.commands.put(("start_dragging", drone_index))
+
+    def stop_dragging(self, drone_index):
+        self.commands.put(("stop_dragging", drone_index))
+
+    def reassign_targets(self):
+        self.commands.put(("reassign_targets",))
+
+    def set_target_points(self, target_points):
+        self.commands.put(("set_target_points", np.asarray(target_points, dtype=float)))
+
+    def set_profiling(self, enabled):
+        """Включение замера фаз шага в рабочем процессе"""
+        self.profile_rows = []
+        self.commands.put(("profile", enabled))
+
+    def profile_summary(self):
+        """Последняя статистика фаз шага, полученная от рабочего процесса"""
+        while True:
+            try:
+                self.profile_rows = self.profiles.get_nowait()
+            except queue.Empty:
+                return self.profile_rows
+
+    def start_recording(self, path):
+        """Запись траектории ведет рабочий процесс"""
+        self.commands.put(("record", path))
+
+    def stop_recording(self):
+        self.commands.put(("record", None))
+
+    def close(self):
+        """Остановка рабочего процесса и освобождение разделяемой памяти"""
+        if self.process.is_alive():
+            self.commands.put(("quit",))
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.buffer.close()
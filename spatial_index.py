@@ -0,0 +1,218 @@
+import numpy as np
+
+
+# Смещения к 27 соседним ячейкам (включая саму ячейку)
+NEIGHBOR_OFFSETS = np.array(
+    [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)],
+    dtype=np.int64
+)
+
+
+def expand_ranges(starts, counts):
+    """Разворачивание диапазонов [start, start + count) в плоский список
+
+    Возвращает номер диапазона и индекс для каждого элемента.
+    """
+    total = int(counts.sum())
+    owners = np.repeat(np.arange(len(counts)), counts)
+    first = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return owners, first + np.arange(total)
+
+
+class SpatialGrid:
+    """Равномерная сетка ячеек (cell list) для поиска соседей
+
+    Ячейки имеют размер cell_size, поэтому все точки на расстоянии меньше
+    cell_size находятся в той же или в одной из 26 соседних ячеек. Сетка
+    перестраивается целиком сортировкой ключей ячеек - это O(N log N)
+    и полностью векторизовано.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.sorted_order = np.zeros(0, dtype=np.int64)
+        self.cell_keys = np.zeros(0, dtype=np.int64)
+        self.cell_starts = np.zeros(0, dtype=np.int64)
+        self.cell_counts = np.zeros(0, dtype=np.int64)
+        self.cells = np.zeros((0, 3), dtype=np.int64)
+        self.origin = np.zeros(3, dtype=np.int64)
+        self.dims = np.ones(3, dtype=np.int64)
+        self.points = np.zeros((0, 3))
+
+    def _keys(self, cells):
+        """Линейный ключ ячейки"""
+        return (cells[..., 0] * self.dims[1] + cells[..., 1]) * self.dims[2] + cells[..., 2]
+
+    def _cells(self, positions):
+        """Координаты ячеек в системе отсчета сетки"""
+        return np.floor(positions / self.cell_size).astype(np.int64) - self.origin
+
+    def build(self, positions):
+        """Перестроение сетки по текущим позициям"""
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        self.points = positions
+        if len(positions) == 0:
+            self.sorted_order = np.zeros(0, dtype=np.int64)
+            self.cell_keys = np.zeros(0, dtype=np.int64)
+            self.cell_starts = np.zeros(0, dtype=np.int64)
+            self.cell_counts = np.zeros(0, dtype=np.int64)
+            self.cells = np.zeros((0, 3), dtype=np.int64)
+            return
+
+        # Сдвиг на единицу оставляет место для соседей крайних ячеек
+        raw = np.floor(positions / self.cell_size).astype(np.int64)
+        self.origin = raw.min(axis=0) - 1
+        cells = raw - self.origin
+        self.dims = cells.max(axis=0) + 2
+        self.cells = cells
+
+        keys = self._keys(cells)
+        self.sorted_order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self.sorted_order]
+
+        # Занятые ячейки: ключ, начало в sorted_order и число точек
+        boundary = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        self.cell_starts = np.flatnonzero(boundary)
+        self.cell_keys = sorted_keys[self.cell_starts]
+        self.cell_counts = np.diff(np.r_[self.cell_starts, len(sorted_keys)])
+
+    def _candidates(self, query_cells, bounded=False):
+        """Пары (запрос, точка сетки) из соседних ячеек
+
+        bounded=True означает, что запросы - ячейки самой сетки, и их соседи
+        заведомо не выходят за ее пределы.
+        """
+        count = len(query_cells)
+        empty = np.zeros(0, dtype=np.int64)
+        if count == 0 or len(self.cell_keys) == 0:
+            return empty, empty
+
+        # Запросы в порядке ключей: смещение к соседней ячейке - константа
+        # для ключа, поэтому поиск идет по отсортированным значениям
+        query_keys = self._keys(query_cells)
+        query_order = np.argsort(query_keys, kind="stable")
+        query_keys = query_keys[query_order]
+        query_cells = query_cells[query_order]
+
+        pair_i = []
+        pair_j = []
+        for offset in NEIGHBOR_OFFSETS:
+            neighbor_keys = query_keys + int(self._keys(offset))
+
+            slot = np.searchsorted(self.cell_keys, neighbor_keys)
+            slot = np.minimum(slot, len(self.cell_keys) - 1)
+            found = self.cell_keys[slot] == neighbor_keys
+
+            if not bounded:
+                # Ячейки вне сетки не содержат точек, а их ключи могут совпасть
+                neighbor_cells = query_cells + offset
+                found &= ((neighbor_cells >= 0) & (neighbor_cells < self.dims)).all(axis=1)
+
+            owners = np.flatnonzero(found)
+            if len(owners) == 0:
+                continue
+
+            ranges, slots = expand_ranges(
+                self.cell_starts[slot[owners]], self.cell_counts[slot[owners]]
+            )
+            pair_i.append(query_order[owners[ranges]])
+            pair_j.append(self.sorted_order[slots])
+
+        if not pair_i:
+            return empty, empty
+        return np.concatenate(pair_i), np.concatenate(pair_j)
+
+    def candidate_pairs(self):
+        """Направленные пары (i, j), i != j, из соседних ячеек"""
+        pair_i, pair_j = self._candidates(self.cells, bounded=True)
+        distinct = pair_i != pair_j
+        return pair_i[distinct], pair_j[distinct]
+
+    def _check_radius(self, radius):
+        if radius > self.cell_size:
+            raise ValueError("Радиус поиска не может превышать размер ячейки")
+
+    def query_pairs(self, positions, radius):
+        """Направленные пары точек на расстоянии строго меньше radius"""
+        self._check_radius(radius)
+
+        self.build(positions)
+        pair_i, pair_j = self.candidate_pairs()
+
+        dist = np.linalg.norm(self.points[pair_i] - self.points[pair_j], axis=1)
+        close = dist < radius
+        return pair_i[close], pair_j[close]
+
+    def query_points(self, queries, radius):
+        """Пары (запрос, точка построенной сетки) на расстоянии меньше radius"""
+        self._check_radius(radius)
+
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        pair_i, pair_j = self._candidates(self._cells(queries))
+
+        dist = np.linalg.norm(queries[pair_i] - self.points[pair_j], axis=1)
+        close = dist < radius
+        return pair_i[close], pair_j[close]
+
+
+class VerletList:
+    """Списки соседей Верле с запасом skin
+
+    Пары строятся на расстоянии cutoff + skin и остаются верными, пока ни
+    одна точка не сместилась больше чем на skin / 2 с момента построения.
+    Пары хранятся упорядоченными по (i, j) вместе со смещениями начала
+    каждой точки, так что соседи любого подмножества точек выбираются
+    без перебора.
+    """
+
+    def __init__(self, cutoff, skin):
+        self.cutoff = float(cutoff)
+        self.skin = float(skin)
+        self.grid = SpatialGrid(self.cutoff + self.skin)
+
+        self.pair_i = np.zeros(0, dtype=np.int64)
+        self.pair_j = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.reference = None
+        self.built_radius = 0.0
+        self.rebuilds = 0
+
+    def needs_rebuild(self, positions, indices=None):
+        """Смещение точек indices (по умолчанию всех) превысило skin / 2"""
+        if self.reference is None or len(self.reference) != len(positions):
+            return True
+        if self.built_radius != self.cutoff + self.skin:
+            return True
+
+        if indices is None:
+            moved = positions - self.reference
+        else:
+            moved = positions[indices] - self.reference[indices]
+        if len(moved) == 0:
+            return False
+        return np.einsum("ij,ij->i", moved, moved).max() > (0.5 * self.skin) ** 2
+
+    def build(self, positions):
+        radius = self.cutoff + self.skin
+        self.grid.cell_size = radius
+        pair_i, pair_j = self.grid.query_pairs(positions, radius)
+
+        # Канонический порядок пар делает суммирование сил воспроизводимым
+        order = np.lexsort((pair_j, pair_i))
+        self.pair_i = pair_i[order]
+        self.pair_j = pair_j[order]
+        self.offsets = np.r_[0, np.cumsum(np.bincount(self.pair_i, minlength=len(positions)))]
+
+        self.reference = np.array(positions, dtype=float)
+        self.built_radius = radius
+        self.rebuilds += 1
+
+    def pairs_for(self, indices):
+        """Пары соседей для точек indices: (номер в indices, сосед)"""
+        if len(indices) == len(self.offsets) - 1:
+            return self.pair_i, self.pair_j
+
+        starts = self.offsets[indices]
+        counts = self.offsets[indices + 1] - starts
+        owners, slots = expand_ranges(starts, counts)
+        return owners, self.pair_j[slots]
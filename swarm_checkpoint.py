@@ -0,0 +1,111 @@
+"""Сохранение и восстановление полного состояния роя
+
+Состояние пишется в один несжатый .npz: массивы роя хранятся как есть,
+а скалярные параметры и состояние генератора случайных чисел - строкой
+JSON. Восстановленный рой продолжает симуляцию побитно так же, как
+продолжил бы исходный.
+"""
+import json
+
+import numpy as np
+
+from drone_simulation import DroneSwarm
+
+
+CHECKPOINT_VERSION = 2
+
+# Массивы состояния DroneSwarm
+STATE_ARRAYS = (
+    "target_points",
+    "positions",
+    "velocities",
+    "best_positions",
+    "target_positions",
+    "best_fitness",
+    "target_indices",
+    "dragging",
+    "sleeping",
+    "calm_ticks",
+    "calm_anchor",
+    "ids",
+)
+
+# Скалярные параметры и счетчики DroneSwarm
+STATE_SCALARS = (
+    "num_drones",
+    "seed",
+    "inertia_weight",
+    "cognitive_param",
+    "social_param",
+    "max_velocity",
+    "slowdown_factor",
+    "personal_space",
+    "separation_weight",
+    "separation_mode",
+    "separation_block_size",
+    "verlet_skin",
+    "assignment_policy",
+    "reassign_hysteresis",
+    "reassign_interval",
+    "step_count",
+    "targets_changed",
+    "assignment_stats",
+    "sleep_enabled",
+    "sleep_speed",
+    "sleep_error",
+    "sleep_drift",
+    "sleep_ticks",
+    "active_count",
+)
+
+
+def _plain(value):
+    """Приведение скаляров numpy к типам JSON"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def save_checkpoint(swarm, path, compressed=False):
+    """Запись состояния роя в .npz"""
+    config = {name: _plain(getattr(swarm, name)) for name in STATE_SCALARS}
+    config["assigner_mode"] = swarm.target_assigner.mode
+    config["assigner_optimal_limit"] = swarm.target_assigner.optimal_limit
+    config["rng_state"] = swarm.rng.bit_generator.state
+    config["version"] = CHECKPOINT_VERSION
+
+    arrays = {name: getattr(swarm, name) for name in STATE_ARRAYS}
+    save = np.savez_compressed if compressed else np.savez
+    save(path, config=np.array(json.dumps(config)), **arrays)
+
+
+def load_checkpoint(path):
+    """Восстановление роя из .npz, созданного save_checkpoint"""
+    with np.load(path, allow_pickle=False) as data:
+        config = json.loads(str(data["config"]))
+        if config.get("version") not in (1, CHECKPOINT_VERSION):
+            raise ValueError(f"Неподдерживаемая версия контрольной точки: {config.get('version')}")
+
+        # В версии 1 нет calm_anchor и sleep_drift: отсчет смещения
+        # начинается с текущих позиций, порог остается по умолчанию
+        swarm = DroneSwarm(0, data["target_points"], seed=config["seed"])
+        for name in STATE_ARRAYS:
+            if name in data.files:
+                setattr(swarm, name, data[name].copy())
+        if "calm_anchor" not in data.files:
+            swarm.calm_anchor = swarm.positions.copy()
+
+    for name in STATE_SCALARS:
+        if name in config:
+            setattr(swarm, name, config[name])
+
+    swarm.target_assigner.mode = config["assigner_mode"]
+    swarm.target_assigner.optimal_limit = config["assigner_optimal_limit"]
+    swarm.rng.bit_generator.state = config["rng_state"]
+
+    # Сетка спящих дронов строится заново при первом шаге
+    swarm.sleeper_index = np.flatnonzero(swarm.sleeping)
+    swarm.sleepers_changed = True
+    return swarm
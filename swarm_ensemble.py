@@ -0,0 +1,221 @@
+import numpy as np
+
+from drone_simulation import PSO_DEFAULTS
+from simulation_runner import PSO_PARAMS
+from spatial_index import SpatialGrid
+from target_assignment import TargetAssigner
+
+
+class SwarmEnsemble:
+    """Ансамбль из K независимых роев одной формации
+
+    Состояние всех роев хранится в массивах (K, N, 3), и шаг PSO выполняется
+    одним векторизованным проходом сразу по всему ансамблю. Параметры PSO
+    задаются числом или массивом длины K. Рой, достигший сходимости,
+    замораживается и дальше не считается.
+
+    В отличие от DroneSwarm, назначение целей решается для каждого роя целиком
+    при создании и затем раз в reassign_interval шагов.
+    """
+
+    def __init__(self, num_swarms, num_drones, target_points, params=None, seed=None):
+        self.num_swarms = num_swarms
+        self.num_drones = num_drones
+        self.target_points = np.array(target_points, dtype=float).reshape(-1, 3)
+        if len(self.target_points) == 0:
+            raise ValueError("Для ансамбля нужны целевые точки")
+
+        self.rng = np.random.default_rng(seed)
+
+        # Значения по умолчанию - те же, что у одиночного роя; словарь
+        # вызывающего кода не изменяется
+        params = dict(params or {})
+        for name in PSO_PARAMS:
+            params.setdefault(name, PSO_DEFAULTS[name])
+        for name, value in params.items():
+            if name not in PSO_PARAMS:
+                raise ValueError(f"Неизвестный параметр PSO: {name}")
+            values = np.broadcast_to(np.asarray(value, dtype=float), (num_swarms,))
+            setattr(self, name, values.copy())
+
+        self.convergence_threshold = 1.0
+        self.reassign_interval = 50
+        self.target_assigner = TargetAssigner("auto")
+        self.spatial_grid = SpatialGrid(float(self.personal_space.max()))
+
+        self.step_count = 0
+        self.active = np.ones(num_swarms, dtype=bool)
+        self.steps = np.zeros(num_swarms, dtype=np.int64)
+        self.steps_to_convergence = np.full(num_swarms, -1, dtype=np.int64)
+
+        self.random_distribute_drones()
+        self.assign_targets()
+
+    # ------------------------------------------------------------
+
+    def random_distribute_drones(self):
+        shape = (self.num_swarms, self.num_drones, 3)
+        min_vals = self.target_points.min(axis=0) - 50
+        max_vals = self.target_points.max(axis=0) + 50
+
+        self.positions = self.rng.uniform(min_vals, max_vals, size=shape)
+        self.velocities = np.zeros(shape)
+        self.best_positions = self.positions.copy()
+
+        cyclic = np.arange(self.num_drones) % len(self.target_points)
+        self.target_indices = np.broadcast_to(cyclic, shape[:2]).copy()
+        self.target_positions = self.target_points[self.target_indices]
+        self.best_fitness = np.linalg.norm(self.positions - self.target_positions, axis=2)
+
+    def assign_targets(self, swarms=None):
+        """Полное назначение целей для указанных роев (по умолчанию всех)
+
+        Задачи назначения решаются циклом по роям: решатели (венгерский
+        алгоритм, KD-дерево) принимают одну задачу, а пакетный аналог стоил
+        бы больше, чем сам цикл, который выполняется раз в reassign_interval
+        шагов. Результаты применяются ко всем роям сразу.
+        """
+        if swarms is None:
+            swarms = np.arange(self.num_swarms)
+        swarms = np.asarray(swarms, dtype=np.int64)
+        if len(swarms) == 0:
+            return
+
+        indices = np.stack([
+            self.target_assigner.assign(self.positions[k], self.target_points) for k in swarms
+        ])
+        assigned = indices >= 0
+        current = self.target_indices[swarms]
+        changed = assigned & (indices != current)
+
+        # Дроны без цели сохраняют прежнюю
+        current[assigned] = indices[assigned]
+        self.target_indices[swarms] = current
+        targets = self.target_points[current]
+        self.target_positions[swarms] = targets
+
+        # Личный лучший результат имеет смысл только относительно своей цели
+        positions = self.positions[swarms]
+        best_positions = self.best_positions[swarms]
+        best_fitness = self.best_fitness[swarms]
+        best_positions[changed] = positions[changed]
+        best_fitness[changed] = np.linalg.norm(positions[changed] - targets[changed], axis=1)
+        self.best_positions[swarms] = best_positions
+        self.best_fitness[swarms] = best_fitness
+
+    # ------------------------------------------------------------
+
+    def compute_separation(self, swarms):
+        """Силы отталкивания внутри каждого из указанных роев, массив (k, N, 3)
+
+        Рои раздвигаются вдоль оси X так, чтобы дроны разных роев никогда не
+        попадали в соседние ячейки, и затем обрабатываются одной сеткой.
+        """
+        positions = self.positions[swarms]
+        count, n = positions.shape[:2]
+
+        cell = float(self.personal_space[swarms].max())
+        span = positions[..., 0].max() - positions[..., 0].min() + 2.0 * cell
+        shifted = positions.copy()
+        shifted[..., 0] += (np.arange(count) * span)[:, None]
+
+        self.spatial_grid.cell_size = cell
+        pair_i, pair_j = self.spatial_grid.query_pairs(shifted.reshape(-1, 3), cell)
+
+        flat = positions.reshape(-1, 3)
+        owner_swarm = pair_i // n
+        space = self.personal_space[swarms][owner_swarm]
+
+        diff = flat[pair_i] - flat[pair_j]
+        dist = np.linalg.norm(diff, axis=1)
+        mask = (dist > 0) & (dist < space)
+
+        weight = self.separation_weight[swarms][owner_swarm[mask]]
+        push = weight * (space[mask] - dist[mask]) / dist[mask]
+        contrib = diff[mask] * push[:, None]
+
+        separation = np.empty((count * n, 3))
+        for axis in range(3):
+            separation[:, axis] = np.bincount(
+                pair_i[mask], weights=contrib[:, axis], minlength=count * n
+            )
+        return separation.reshape(count, n, 3)
+
+    def step(self):
+        """Один шаг PSO для всех еще не сошедшихся роев"""
+        swarms = np.flatnonzero(self.active)
+        if len(swarms) == 0:
+            return
+
+        self.step_count += 1
+        positions = self.positions[swarms]
+        targets = self.target_positions[swarms]
+        shape = positions.shape
+
+        r1 = self.rng.random(shape)
+        r2 = self.rng.random(shape)
+
+        def per_swarm(values):
+            return values[swarms][:, None, None]
+
+        velocity = (
+            per_swarm(self.inertia_weight) * self.velocities[swarms] +
+            per_swarm(self.cognitive_param) * r1 * (self.best_positions[swarms] - positions) +
+            per_swarm(self.social_param) * r2 * (targets - positions) +
+            self.compute_separation(swarms)
+        )
+
+        # Ограничение скорости
+        speed = np.linalg.norm(velocity, axis=2, keepdims=True)
+        limit = per_swarm(self.max_velocity)
+        velocity *= np.minimum(1.0, np.divide(limit, speed, out=np.ones_like(speed), where=speed > 0))
+
+        positions += velocity * per_swarm(self.slowdown_factor)
+        self.velocities[swarms] = velocity
+        self.positions[swarms] = positions
+
+        # Обновление личного лучшего
+        fitness = np.linalg.norm(positions - targets, axis=2)
+        best_fitness = self.best_fitness[swarms]
+        improved = fitness < best_fitness
+        best_fitness[improved] = fitness[improved]
+        best_positions = self.best_positions[swarms]
+        best_positions[improved] = positions[improved]
+        self.best_fitness[swarms] = best_fitness
+        self.best_positions[swarms] = best_positions
+
+        # Маски сходимости по роям
+        self.steps[swarms] += 1
+        converged = swarms[fitness.mean(axis=1) < self.convergence_threshold]
+        self.active[converged] = False
+        self.steps_to_convergence[converged] = self.steps[converged]
+
+        if self.reassign_interval and self.step_count % self.reassign_interval == 0:
+            self.assign_targets(np.flatnonzero(self.active))
+
+    def run(self, max_steps=10000):
+        """Шаги до сходимости всех роев или исчерпания max_steps"""
+        while self.active.any() and self.step_count < max_steps:
+            self.step()
+
+    # ------------------------------------------------------------
+
+    def get_average_errors(self):
+        """Средняя ошибка каждого роя, массив длины K"""
+        return np.linalg.norm(self.positions - self.target_positions, axis=2).mean(axis=1)
+
+    def get_results(self):
+        """Результаты по роям, пригодные для сериализации в JSON"""
+        errors = self.get_average_errors()
+        return [
+            {
+                "swarm": k,
+                "params": {name: float(getattr(self, name)[k]) for name in PSO_PARAMS},
+                "steps": int(self.steps[k]),
+                "converged": bool(self.steps_to_convergence[k] >= 0),
+                "steps_to_convergence": int(self.steps_to_convergence[k])
+                if self.steps_to_convergence[k] >= 0 else None,
+                "final_error": float(errors[k]),
+            }
+            for k in range(self.num_swarms)
+        ]
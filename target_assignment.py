@@ -0,0 +1,375 @@
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy необязателен: используются реализации на numpy
+    linear_sum_assignment = None
+    cKDTree = None
+
+
+ASSIGNMENT_MODES = ("auto", "optimal", "auction", "nearest", "greedy")
+
+
+def distance_matrix(points_a, points_b):
+    """Матрица евклидовых расстояний между двумя наборами точек"""
+    sq = (
+        np.einsum("ij,ij->i", points_a, points_a)[:, None] +
+        np.einsum("ij,ij->i", points_b, points_b)[None, :] -
+        2.0 * points_a @ points_b.T
+    )
+    return np.sqrt(np.maximum(sq, 0.0))
+
+
+def nearest_points(points, queries, block_size=1024):
+    """Индекс и расстояние до ближайшей точки из points для каждого запроса"""
+    if cKDTree is not None:
+        dist, idx = cKDTree(points).query(queries, k=1)
+        return np.asarray(idx, dtype=np.int64), np.asarray(dist)
+
+    idx = np.empty(len(queries), dtype=np.int64)
+    dist = np.empty(len(queries))
+    for start in range(0, len(queries), block_size):
+        stop = min(start + block_size, len(queries))
+        block = distance_matrix(queries[start:stop], points)
+        idx[start:stop] = np.argmin(block, axis=1)
+        dist[start:stop] = block[np.arange(stop - start), idx[start:stop]]
+    return idx, dist
+
+
+def auction_assignment(cost, eps_min=None):
+    """Аукционный алгоритм Бертсекаса с масштабированием eps
+
+    Минимизирует суммарную стоимость. Возвращает для каждой строки индекс
+    столбца (если строк больше, чем столбцов, лишние строки получают -1).
+    """
+    cost = np.asarray(cost, dtype=float)
+    rows, cols = cost.shape
+    if rows == 0 or cols == 0:
+        return np.full(rows, -1, dtype=np.int64)
+
+    if rows != cols:
+        # Прямой аукцион оптимален только для квадратной задачи: дополняем
+        # фиктивными строками или столбцами нулевой стоимости
+        size = max(rows, cols)
+        square = np.zeros((size, size))
+        square[:rows, :cols] = cost
+        result = auction_assignment(square, eps_min)[:rows]
+        result[result >= cols] = -1
+        return result
+
+    benefit = -cost
+    span = float(benefit.max() - benefit.min())
+    if span == 0.0:
+        return np.arange(rows, dtype=np.int64)
+
+    # При eps < span / rows / 1e3 решение оптимально с точностью до округления
+    if eps_min is None:
+        eps_min = span / (rows + 1) / 1e3
+    eps = span / 4.0
+
+    prices = np.zeros(cols)
+    row_to_col = np.full(rows, -1, dtype=np.int64)
+
+    while True:
+        row_to_col[:] = -1
+        col_to_row = np.full(cols, -1, dtype=np.int64)
+
+        while True:
+            bidders = np.flatnonzero(row_to_col == -1)
+            if len(bidders) == 0:
+                break
+
+            values = benefit[bidders] - prices
+            best = np.argmax(values, axis=1)
+            best_value = values[np.arange(len(bidders)), best]
+
+            if cols > 1:
+                values[np.arange(len(bidders)), best] = -np.inf
+                second_value = values.max(axis=1)
+            else:
+                second_value = best_value - span
+
+            bids = prices[best] + best_value - second_value + eps
+
+            # Для каждого объекта побеждает наибольшая ставка
+            order = np.lexsort((bids, best))
+            last = np.r_[best[order][1:] != best[order][:-1], True]
+            winners = order[last]
+
+            won_cols = best[winners]
+            outbid = col_to_row[won_cols]
+            row_to_col[outbid[outbid >= 0]] = -1
+
+            col_to_row[won_cols] = bidders[winners]
+            row_to_col[bidders[winners]] = won_cols
+            prices[won_cols] = bids[winners]
+
+        if eps <= eps_min:
+            return row_to_col
+        eps = max(eps / 5.0, eps_min)
+
+
+def optimal_assignment(cost):
+    """Назначение с минимальной суммарной стоимостью (венгерский алгоритм)"""
+    rows = cost.shape[0]
+    if linear_sum_assignment is None:
+        return auction_assignment(cost)
+
+    result = np.full(rows, -1, dtype=np.int64)
+    row_idx, col_idx = linear_sum_assignment(cost)
+    result[row_idx] = col_idx
+    return result
+
+
+def nearest_k(points, queries, k, block_size=1024, tree=None):
+    """Индексы и расстояния до k ближайших точек (по возрастанию) для каждого запроса
+
+    tree - готовое KD-дерево по points для нескольких запросов подряд.
+    """
+    if cKDTree is not None:
+        if tree is None:
+            tree = cKDTree(points)
+        dist, idx = tree.query(queries, k=k)
+        return (np.asarray(idx, dtype=np.int64).reshape(len(queries), k),
+                np.asarray(dist).reshape(len(queries), k))
+
+    idx = np.empty((len(queries), k), dtype=np.int64)
+    dist = np.empty((len(queries), k))
+    for start in range(0, len(queries), block_size):
+        stop = min(start + block_size, len(queries))
+        block = distance_matrix(queries[start:stop], points)
+        if k < len(points):
+            part = np.argpartition(block, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(len(points)), block.shape)
+        part_dist = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(part_dist, axis=1, kind="stable")
+        idx[start:stop] = np.take_along_axis(part, order, axis=1)
+        dist[start:stop] = np.take_along_axis(part_dist, order, axis=1)
+    return idx, dist
+
+
+def spatial_order(points, bits=10):
+    """Порядок точек вдоль кривой Мортона: соседние в порядке точки близки"""
+    low = points.min(axis=0)
+    extent = max(float((points.max(axis=0) - low).max()), 1e-12)
+    cells = ((points - low) / extent * ((1 << bits) - 1)).astype(np.int64)
+
+    code = np.zeros(len(points), dtype=np.int64)
+    for bit in range(bits):
+        for axis in range(points.shape[1]):
+            code |= ((cells[:, axis] >> bit) & 1) << (points.shape[1] * bit + axis)
+    return np.argsort(code, kind="stable")
+
+
+def nearest_free_assignment(positions, targets, batch_size=256, candidates=16,
+                            radius_factor=16.0, tolerance=0.1):
+    """Быстрое назначение ближайших свободных целей для очень больших роев
+
+    Сначала раундами: каждый свободный дрон выбирает ближайшую свободную
+    цель в радиусе radius_factor типичных расстояний между целями (поиск по
+    KD-дереву), спорную цель получает ближайший претендент. Раунды идут,
+    пока назначают заметную долю дронов.
+
+    Остальные дроны - вдали от свободных целей или в толпе у одних и тех же
+    целей (старт с площадки, смена формации) - обрабатываются пачками по
+    batch_size в порядке кривой Мортона. Для пачки один раз ищется запас из
+    4·batch_size ближайших к ее центру свободных целей; дрон берет ближайшую
+    свободную цель запаса, если по неравенству треугольника цель вне запаса
+    не может быть ближе более чем на долю tolerance, иначе ищет среди своих
+    candidates ближайших целей. Поиск ближайшей точки изнутри пустой области
+    (например, из центра кольца целей) обходит почти все дерево, поэтому
+    такие запросы ограничены радиусом или делаются один раз на пачку.
+    """
+    result = np.full(len(positions), -1, dtype=np.int64)
+    if len(positions) == 0 or len(targets) == 0:
+        return result
+
+    radius = np.inf
+    if cKDTree is not None and len(targets) > 1:
+        spacing = cKDTree(targets).query(targets, k=2)[0][:, 1]
+        radius = radius_factor * max(float(np.median(spacing)), 1e-9)
+
+    free_drones = np.arange(len(positions))
+    free_targets = np.arange(len(targets))
+    deferred = []
+
+    while len(free_drones) > 0 and len(free_targets) > 0:
+        if cKDTree is not None:
+            dist, local = cKDTree(targets[free_targets]).query(
+                positions[free_drones], k=1, distance_upper_bound=radius
+            )
+            found = np.isfinite(dist)
+            deferred.append(free_drones[~found])
+            free_drones, local, dist = free_drones[found], local[found], dist[found]
+            if len(free_drones) == 0:
+                break
+        else:
+            local, dist = nearest_points(targets[free_targets], positions[free_drones])
+
+        # Для каждой цели выигрывает ближайший дрон
+        order = np.lexsort((dist, local))
+        first = np.r_[True, local[order][1:] != local[order][:-1]]
+        winners = order[first]
+
+        result[free_drones[winners]] = free_targets[local[winners]]
+
+        taken = np.zeros(len(free_targets), dtype=bool)
+        taken[local[winners]] = True
+        free_targets = free_targets[~taken]
+
+        still_free = np.ones(len(free_drones), dtype=bool)
+        still_free[winners] = False
+        free_drones = free_drones[still_free]
+
+        # Раунд назначил малую долю дронов: дальше раунды почти бесполезны
+        if len(winners) < len(free_drones) // 4:
+            break
+
+    rest = np.concatenate(deferred + [free_drones])
+    if len(rest) == 0 or len(free_targets) == 0:
+        return result
+    rest = rest[spatial_order(positions[rest])]
+
+    used = np.ones(len(targets), dtype=bool)
+    used[free_targets] = False
+    tree = None
+    taken_since_build = 0
+
+    for start in range(0, len(rest), batch_size):
+        if tree is None or taken_since_build > min(8 * batch_size, len(tree_targets) // 2):
+            tree_targets = np.flatnonzero(~used)
+            if len(tree_targets) == 0:
+                break
+            points = targets[tree_targets]
+            tree = cKDTree(points) if cKDTree is not None else None
+            taken_since_build = 0
+
+        batch = rest[start:start + batch_size]
+        center = positions[batch].mean(axis=0, keepdims=True)
+
+        # Запас: ближайшие к центру пачки свободные цели. Занятых среди
+        # найденных не больше taken_since_build, поэтому свободных хватает.
+        size = min(4 * len(batch) + taken_since_build, len(tree_targets))
+        pool, pool_dist = nearest_k(points, center, size, tree=tree)
+        pool = tree_targets[pool[0]]
+        keep = ~used[pool]
+        pool, pool_dist = pool[keep][:4 * len(batch)], pool_dist[0][keep][:4 * len(batch)]
+        if len(pool) == 0:
+            break
+        # Свободные цели вне запаса не ближе limit к центру пачки
+        limit = pool_dist[-1] if len(pool) < np.count_nonzero(~used) else np.inf
+
+        dist = distance_matrix(positions[batch], targets[pool])
+        delta = np.linalg.norm(positions[batch] - center, axis=1)
+        column = np.full(len(targets), -1, dtype=np.int64)
+        column[pool] = np.arange(len(pool))
+
+        # Внутри пачки первыми выбирают дроны, ближайшие к целям
+        for row in np.argsort(dist.min(axis=1), kind="stable"):
+            drone = batch[row]
+            best = int(np.argmin(dist[row]))
+            if not np.isfinite(dist[row, best]):
+                # Целей меньше, чем дронов: остальным дронам не хватило
+                break
+
+            choice = pool[best]
+            if dist[row, best] - (limit - delta[row]) > tolerance * dist[row, best]:
+                # Заметно более близкая свободная цель может лежать вне запаса
+                own, _ = nearest_k(points, positions[drone:drone + 1],
+                                   min(candidates, len(tree_targets)), tree=tree)
+                own = tree_targets[own[0]]
+                own = own[~used[own]]
+                if len(own) > 0:
+                    choice = own[0]
+
+            used[choice] = True
+            if column[choice] >= 0:
+                dist[:, column[choice]] = np.inf
+            result[drone] = choice
+            taken_since_build += 1
+
+    return result
+
+
+def greedy_assignment(positions, targets):
+    """Прежнее жадное назначение: дроны по порядку берут ближайшую свободную цель"""
+    result = np.full(len(positions), -1, dtype=np.int64)
+    free = np.ones(len(targets), dtype=bool)
+
+    for i in range(len(positions)):
+        if not free.any():
+            break
+
+        dist = np.linalg.norm(targets - positions[i], axis=1)
+        dist[~free] = np.inf
+        best_idx = int(np.argmin(dist))
+
+        result[i] = best_idx
+        free[best_idx] = False
+
+    return result
+
+
+class TargetAssigner:
+    """Назначение целевых точек дронам
+
+    Режимы:
+        "optimal" - минимум суммарного расстояния (scipy, иначе аукцион)
+        "auction" - аукционный алгоритм на numpy
+        "nearest" - ближайшая свободная цель через KD-дерево
+        "greedy"  - прежний жадный перебор (эталон)
+        "auto"    - "optimal" для небольших задач, иначе "nearest"
+    """
+
+    def __init__(self, mode="auto", optimal_limit=1_000_000):
+        if mode not in ASSIGNMENT_MODES:
+            raise ValueError(f"Неизвестный режим назначения: {mode}")
+        self.mode = mode
+        # Максимальный размер матрицы стоимостей для точного решения в режиме auto
+        self.optimal_limit = optimal_limit
+
+        # KD-дерево по последнему набору целей (цели меняются редко)
+        self._tree = None
+        self._tree_targets = None
+
+    def resolve_mode(self, num_drones, num_targets, mode=None):
+        """Режим решения задачи данного размера (mode заменяет режим назначателя)"""
+        mode = mode or self.mode
+        if mode != "auto":
+            return mode
+        if num_drones * num_targets <= self.optimal_limit:
+            return "optimal"
+        return "nearest"
+
+    def nearest_target_distance(self, positions, targets):
+        """Расстояние от каждого дрона до ближайшей цели (любой, не только свободной)"""
+        if cKDTree is None:
+            return nearest_points(targets, positions)[1]
+
+        if self._tree_targets is not targets:
+            self._tree = cKDTree(targets)
+            self._tree_targets = targets
+        return np.asarray(self._tree.query(positions, k=1)[0])
+
+    def assign(self, positions, targets, mode=None):
+        """Индекс цели для каждого дрона (-1, если целей не хватило)"""
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        targets = np.asarray(targets, dtype=float).reshape(-1, 3)
+
+        if len(positions) == 0 or len(targets) == 0:
+            return np.full(len(positions), -1, dtype=np.int64)
+
+        mode = self.resolve_mode(len(positions), len(targets), mode)
+
+        if mode == "optimal":
+            return optimal_assignment(distance_matrix(positions, targets))
+        if mode == "auction":
+            return auction_assignment(distance_matrix(positions, targets))
+        if mode == "nearest":
+            return nearest_free_assignment(positions, targets)
+        if mode == "greedy":
+            return greedy_assignment(positions, targets)
+
+        raise ValueError(f"Неизвестный режим назначения: {mode}")
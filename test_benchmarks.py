@@ -0,0 +1,30 @@
+"""Бенчмарки: сохранение результатов и сравнение с базовыми"""
+import pso
+from benchmarks import compare_results, load_results, save_results
+
+
+def results(**medians):
+    return {"meta": {}, "results": {name: {"median": value} for name, value in medians.items()}}
+
+
+def test_compare_results_flags_regressions():
+    rows = compare_results(results(a=1.0, b=2.0, gone=1.0), results(a=1.05, b=3.0, new=1.0), 0.1)
+    assert [(name, regression) for name, _, _, _, regression in rows] == [("a", False), ("b", True)]
+    assert rows[1][3] == 1.5
+
+
+def test_save_and_load_results(tmp_path):
+    path = str(tmp_path / "bench.json")
+    save_results(results(a=0.5), path)
+    assert load_results(path) == results(a=0.5)
+
+
+def test_bench_output_feeds_compare(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    code = pso.main(["bench", "--quick", "--filter", "swarm_update/circle",
+                     "--repeats", "2", "--budget", "0.1", "--output", path])
+    assert code == 0
+    saved = load_results(path)
+    assert list(saved["results"]) == [f"swarm_update/circle/n={n}" for n in (10, 100, 1000)]
+    assert saved["results"]["swarm_update/circle/n=10"]["repeats"] == 2
+    assert pso.main(["compare", path, path]) == 0
@@ -0,0 +1,161 @@
+"""Шаг роя: переназначение целей, сон дронов и снимок состояния"""
+import numpy as np
+
+from drone_simulation import DroneSwarm
+
+
+def ring(count, radius):
+    angle = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    return np.stack([radius * np.cos(angle), np.zeros(count), radius * np.sin(angle)], axis=1)
+
+
+def record_solves(swarm):
+    """Подмена assign, запоминающая размер и режим каждого решения"""
+    solves = []
+    assign = swarm.target_assigner.assign
+
+    def counted(positions, targets, mode=None):
+        solves.append((len(positions), mode))
+        return assign(positions, targets, mode=mode)
+
+    swarm.target_assigner.assign = counted
+    return solves
+
+
+def settled_swarm(policy, count=120, steps=200):
+    swarm = DroneSwarm(count, ring(count, 60.0), seed=4)
+    swarm.assignment_policy = policy
+    for _ in range(steps):
+        swarm.update_positions()
+    return swarm
+
+
+def test_incremental_does_less_work_on_settled_swarm():
+    work = {}
+    for policy in ("incremental", "every_tick"):
+        swarm = settled_swarm(policy)
+        solves = record_solves(swarm)
+        candidates = 0
+        for _ in range(49):
+            swarm.update_positions()
+            candidates += swarm.assignment_stats["candidates"]
+        work[policy] = (candidates, sum(rows for rows, _ in solves))
+
+    assert work["every_tick"] == (49 * 120, 49 * 120)
+    assert work["incremental"][0] < work["every_tick"][0] / 10
+    assert work["incremental"][1] < work["every_tick"][1] / 10
+
+
+def test_incremental_solver_follows_full_problem_size():
+    swarm = DroneSwarm(200, ring(200, 30.0), seed=1)
+    swarm.target_assigner.optimal_limit = 200 * 200 - 1
+    swarm.update_positions()
+    solves = record_solves(swarm)
+
+    for _ in range(10):
+        swarm.update_positions()
+    partial = [mode for rows, mode in solves if mode is not None]
+    assert partial and all(mode == "nearest" for mode in partial)
+
+
+def test_dense_ring_falls_asleep():
+    # Расстояние между целями меньше personal_space: ошибка не падает до sleep_error
+    swarm = DroneSwarm(200, ring(200, 40.0), seed=0)
+    for _ in range(800):
+        swarm.update_positions()
+    assert swarm.sleeping.all()
+    assert swarm.active_count == 0
+    assert np.all(swarm.velocities == 0)
+
+
+def asleep_swarm():
+    swarm = DroneSwarm(60, ring(60, 40.0), seed=2)
+    for _ in range(600):
+        swarm.update_positions()
+    assert swarm.sleeping.all()
+    return swarm
+
+
+def test_sleeping_drones_do_not_move():
+    swarm = asleep_swarm()
+    positions = swarm.positions.copy()
+    generation = swarm.generation
+    solves = record_solves(swarm)
+
+    # Шагов больше reassign_interval: периодический пересмотр тоже пропускается
+    for _ in range(swarm.reassign_interval + 10):
+        swarm.update_positions()
+    np.testing.assert_array_equal(swarm.positions, positions)
+    assert swarm.generation == generation
+    assert swarm.assignment_stats["candidates"] == 0
+    assert solves == []
+
+
+def test_drag_wakes_drone_and_neighbors():
+    swarm = asleep_swarm()
+    swarm.start_dragging(0)
+    assert not swarm.sleeping[0]
+
+    # Перетаскиваемый дрон будит соседей в своем личном пространстве
+    neighbor = np.argsort(np.linalg.norm(swarm.positions - swarm.positions[5], axis=1))[1]
+    swarm.set_drone_position(0, swarm.positions[neighbor] + [0.3, 0.0, 0.0])
+    swarm.update_positions()
+    assert not swarm.sleeping[neighbor]
+    swarm.update_positions()
+    assert swarm.active_count > 0
+
+    swarm.stop_dragging(0)
+    for _ in range(400):
+        swarm.update_positions()
+    assert swarm.sleeping.all()
+
+
+def test_new_targets_wake_swarm():
+    swarm = asleep_swarm()
+    swarm.set_target_points(ring(60, 40.0) + [0.0, 10.0, 0.0])
+    swarm.update_positions()
+    assert not swarm.sleeping.any()
+    assert swarm.active_count == 60
+
+
+def test_active_set_step_matches_awake_drones():
+    swarm = asleep_swarm()
+    woken = np.array([3, 30])
+    swarm.wake(woken)
+    positions = swarm.positions.copy()
+    swarm.update_positions()
+
+    moved = np.flatnonzero(np.any(swarm.positions != positions, axis=1))
+    assert set(moved) <= set(np.flatnonzero(~swarm.sleeping)) | set(woken)
+    assert swarm.active_count >= len(woken)
+
+
+def test_state_is_read_only_view():
+    swarm = DroneSwarm(20, ring(20, 10.0), seed=0)
+    state = swarm.get_state()
+    assert np.shares_memory(state.positions, swarm.positions)
+    assert np.shares_memory(state.target_positions, swarm.target_positions)
+    assert not state.positions.flags.writeable
+    assert not state.ids.flags.writeable
+    assert swarm.positions.flags.writeable
+
+    swarm.update_positions()
+    np.testing.assert_array_equal(state.positions, swarm.positions)
+    assert swarm.get_state().generation > state.generation
+
+
+def test_generation_tracks_changes():
+    swarm = DroneSwarm(20, ring(20, 10.0), seed=0)
+    generation = swarm.get_state().generation
+    swarm.set_drone_position(3, np.array([1.0, 2.0, 3.0]))
+    assert swarm.get_state().generation == generation + 1
+    swarm.set_drone_position(99, np.zeros(3))
+    assert swarm.get_state().generation == generation + 1
+
+
+def test_get_drones_rows_are_views():
+    swarm = DroneSwarm(5, ring(5, 10.0), seed=0)
+    position, target, drone_id = swarm.get_drones()[2]
+    assert drone_id == 2
+    assert np.shares_memory(position, swarm.positions)
+    np.testing.assert_array_equal(target, swarm.target_positions[2])
@@ -0,0 +1,91 @@
+"""Кэш формаций: попадания и промахи, ключ по параметрам, вытеснение LRU"""
+import os
+
+import cv2
+import numpy as np
+
+from formation_cache import FormationCache, content_key
+from image_processor import ImageProcessor
+
+
+def test_hit_and_miss(tmp_path):
+    cache = FormationCache(str(tmp_path))
+    assert cache.get("key", "points") is None
+    assert cache.misses == 1
+
+    array = np.arange(12.0).reshape(4, 3)
+    cache.put("key", "points", array)
+    np.testing.assert_array_equal(cache.get("key", "points"), array)
+    assert cache.hits == 1
+
+    # Новый экземпляр читает с диска
+    other = FormationCache(str(tmp_path))
+    np.testing.assert_array_equal(other.get("key", "points"), array)
+    assert other.hits == 1
+
+
+def test_put_does_not_freeze_callers_array(tmp_path):
+    cache = FormationCache(str(tmp_path))
+    array = np.zeros(5)
+    cache.put("key", "points", array)
+    assert array.flags.writeable
+    array[0] = 1.0
+
+    cached = cache.get("key", "points")
+    assert cached[0] == 0.0
+    assert not cached.flags.writeable
+
+
+def test_key_depends_on_content_and_params():
+    params = {"blur_size": 5, "scale": 100.0}
+    assert content_key(b"image", params) == content_key(b"image", dict(reversed(params.items())))
+    assert content_key(b"image", params) != content_key(b"other", params)
+    assert content_key(b"image", params) != content_key(b"image", {**params, "scale": 50.0})
+
+
+def test_processor_misses_after_param_change(tmp_path):
+    image = np.zeros((200, 300), np.uint8)
+    cv2.rectangle(image, (50, 50), (250, 150), 255, -1)
+    path = str(tmp_path / "shape.png")
+    cv2.imwrite(path, image)
+
+    cache = FormationCache(str(tmp_path / "cache"))
+    processor = ImageProcessor(cache=cache)
+    points = processor.process_image(path)
+    assert processor.contour_points.flags.writeable
+    misses = cache.misses
+
+    assert np.array_equal(ImageProcessor(cache=cache).process_image(path), points)
+    assert cache.misses == misses
+
+    changed = ImageProcessor(cache=cache)
+    changed.scale = 50.0
+    changed.process_image(path)
+    assert cache.misses > misses
+
+
+def test_memory_lru(tmp_path):
+    cache = FormationCache(str(tmp_path), memory_items=2)
+    for name in "abc":
+        cache.put("key", name, np.zeros(3))
+    assert list(cache.memory) == [("key", "b"), ("key", "c")]
+
+    cache.get("key", "b")
+    cache.get("key", "a")
+    assert list(cache.memory) == [("key", "b"), ("key", "a")]
+
+
+def test_disk_eviction_keeps_recently_used(tmp_path):
+    array = np.zeros(1000)
+    cache = FormationCache(str(tmp_path), max_bytes=int(3.5 * (array.nbytes + 128)), memory_items=0)
+    for index, name in enumerate("abc"):
+        cache.put("key", name, array)
+        os.utime(cache._path("key", name), (index, index))
+
+    # Чтение "a" делает ее самой свежей, вытесняется "b"
+    assert cache.get("key", "a") is not None
+    cache.put("key", "d", array)
+    assert cache.get("key", "b") is None
+    for name in "acd":
+        assert cache.get("key", name) is not None
+    assert cache.total_bytes == sum(entry.stat().st_size for entry in os.scandir(tmp_path))
@@ -0,0 +1,72 @@
+"""Пакетная подготовка формаций: манифест, загрузка и проигрывание шоу"""
+import json
+
+import cv2
+import numpy as np
+
+import pso
+from formation_compiler import MANIFEST_NAME, compile_formations, find_manifest, load_manifest
+from formation_stream import manifest_formations
+
+
+def write_images(directory):
+    """Квадрат, пустой кадр (ошибка обработки) и круг"""
+    directory.mkdir()
+    square = np.zeros((200, 200), np.uint8)
+    cv2.rectangle(square, (50, 50), (150, 150), 255, -1)
+    circle = np.zeros((200, 200), np.uint8)
+    cv2.circle(circle, (100, 100), 60, 255, -1)
+    cv2.imwrite(str(directory / "a_square.png"), square)
+    cv2.imwrite(str(directory / "b_blank.png"), np.zeros((200, 200), np.uint8))
+    cv2.imwrite(str(directory / "c_circle.png"), circle)
+    (directory / "notes.txt").write_text("не изображение")
+    return str(directory)
+
+
+def test_compile_and_load_manifest(tmp_path):
+    source = write_images(tmp_path / "images")
+    output = tmp_path / "show"
+    manifest = compile_formations(source, 50, str(output), workers=2)
+
+    entries = manifest["formations"]
+    assert [entry["image"].rsplit("/", 1)[1] for entry in entries] == \
+        ["a_square.png", "b_blank.png", "c_circle.png"]
+    assert "error" in entries[1]
+    assert json.loads((output / MANIFEST_NAME).read_text(encoding="utf-8")) == manifest
+
+    formations = load_manifest(str(output))
+    assert [formation["index"] for formation in formations] == [0, 2]
+    for formation in formations:
+        targets = np.load(formation["targets"])
+        assert targets.shape == (50, 3) and targets.dtype == np.float32
+        assert formation["num_drones"] == 50
+        assert formation["offsets"][-1] == 50
+
+    assert load_manifest(str(output / MANIFEST_NAME)) == formations
+    frames = list(manifest_formations(str(output)))
+    assert [frame.frame for frame in frames] == [0, 2]
+    np.testing.assert_allclose(frames[1].targets, np.load(formations[1]["targets"]))
+
+
+def test_find_manifest(tmp_path):
+    assert find_manifest(str(tmp_path)) is None
+    path = tmp_path / MANIFEST_NAME
+    path.write_text('{"num_drones": null, "formations": []}', encoding="utf-8")
+    assert find_manifest(str(tmp_path)) == str(path)
+    assert find_manifest(str(path)) == str(path)
+    assert find_manifest(str(tmp_path / "clip.mp4")) is None
+
+
+def test_show_plays_manifest(tmp_path):
+    source = write_images(tmp_path / "images")
+    output = tmp_path / "show"
+    compile_formations(source, 40, str(output), workers=1)
+
+    report = tmp_path / "report.json"
+    code = pso.main(["show", str(output), "--formation-rate", "6", "--seed", "0",
+                     "--output", str(report)])
+    assert code == 0
+    result = json.loads(report.read_text(encoding="utf-8"))
+    assert result["num_drones"] == 40
+    assert result["frames"] == [0, 2]
+    assert result["steps"] == 2 * 10
@@ -0,0 +1,51 @@
+"""Потоковые формации: порядок кадров, пропуски и ограничение чтения"""
+import time
+
+import cv2
+import numpy as np
+
+from formation_stream import FormationStream, read_frames
+
+
+def write_frames(directory, shifts):
+    """Кадры с квадратом, сдвинутым на shift пикселей (None - пустой кадр)"""
+    for index, shift in enumerate(shifts):
+        image = np.zeros((200, 300), np.uint8)
+        if shift is not None:
+            cv2.rectangle(image, (40 + shift, 60), (120 + shift, 140), 255, -1)
+        cv2.imwrite(str(directory / f"frame_{index:03d}.png"), image)
+    return str(directory)
+
+
+def test_read_frames_step(tmp_path):
+    source = write_frames(tmp_path, [0, 10, 20, 30, 40])
+    assert [index for index, _ in read_frames(source)] == [0, 1, 2, 3, 4]
+    frames = list(read_frames(source, frame_step=2))
+    assert [index for index, _ in frames] == [0, 2, 4]
+    assert frames[0][1].shape == (200, 300)
+
+
+def test_stream_order_and_skips(tmp_path):
+    # Кадр 2 повторяет кадр 1, кадр 4 пустой
+    source = write_frames(tmp_path, [0, 30, 30, 60, None, 90, 120])
+    stream = FormationStream(source, 40, workers=3)
+    formations = list(stream)
+
+    assert [formation.frame for formation in formations] == [0, 1, 3, 5, 6]
+    centers = [formation.targets[:, 0].mean() for formation in formations]
+    assert np.all(np.diff(centers) > 0)
+    for formation in formations:
+        assert formation.targets.shape == (40, 3)
+        assert formation.offsets[-1] == 40
+    assert (stream.frames_read, stream.emitted, stream.skipped, stream.failed) == (7, 5, 1, 1)
+
+
+def test_stream_waits_for_consumer(tmp_path):
+    source = write_frames(tmp_path, list(range(0, 100, 5)))
+    stream = FormationStream(source, 20, workers=1, max_pending=2, min_change=0)
+    formations = iter(stream)
+    next(formations)
+    time.sleep(0.3)
+    # Выдан один кадр, в конвейере не больше max_pending
+    assert stream.frames_read <= 3
+    assert len(list(formations)) == 19
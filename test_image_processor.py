@@ -0,0 +1,280 @@
+"""Преобразование контура в 3D и равномерная расстановка точек по контурам"""
+import cv2
+import numpy as np
+import pytest
+
+from formation_cache import FormationCache
+from image_processor import (
+    ImageProcessor, allocate_budget, loop_lengths, loop_segments, poisson_disk_samples, resample_loops
+)
+
+
+def rectangle(x0, z0, width, depth):
+    return np.array([[x0, 0, z0], [x0 + width, 0, z0], [x0 + width, 0, z0 + depth], [x0, 0, z0 + depth]], dtype=float)
+
+
+def arc_positions(loop, points):
+    """Длина дуги от первой вершины loop до каждой из points (points лежат на loop)"""
+    start = loop
+    end = np.roll(loop, -1, axis=0)
+    lengths = np.linalg.norm(end - start, axis=1)
+    arc = np.concatenate([[0.0], np.cumsum(lengths)])
+
+    positions = []
+    for point in points:
+        t = np.einsum("ij,ij->i", point - start, end - start) / lengths ** 2
+        t = np.clip(t, 0, 1)
+        dist = np.linalg.norm(start + t[:, None] * (end - start) - point, axis=1)
+        segment = np.argmin(dist)
+        assert dist[segment] < 1e-9
+        positions.append(arc[segment] + t[segment] * lengths[segment])
+    return np.array(positions)
+
+
+def test_resample_loops_is_evenly_spaced():
+    first = rectangle(0, 0, 3, 2)
+    second = np.array([[10, 0, 0], [14, 0, 0], [10, 0, 3]], dtype=float)
+    points = np.concatenate([first, second])
+    offsets = np.array([0, 4, 7])
+    counts = np.array([7, 5])
+
+    result = resample_loops(points, offsets, counts)
+    assert len(result) == counts.sum()
+
+    # Заранее посчитанные сегменты дают тот же результат
+    segments = loop_segments(points, offsets)
+    np.testing.assert_allclose(loop_lengths(points, offsets, segments), [10.0, 12.0])
+    np.testing.assert_array_equal(resample_loops(points, offsets, counts, segments), result)
+
+    for loop, part, perimeter in [(first, result[:7], 10.0), (second, result[7:], 12.0)]:
+        np.testing.assert_allclose(part[0], loop[0])
+        steps = np.diff(arc_positions(loop, part))
+        np.testing.assert_allclose(steps, perimeter / len(part), atol=1e-9)
+
+
+def test_resample_loops_skips_zero_length_segments():
+    square = rectangle(0, 0, 1, 1)
+    doubled = np.concatenate([square[:2], square[1:2], square[2:]])
+    expected = resample_loops(square, np.array([0, 4]), np.array([8]))
+    result = resample_loops(doubled, np.array([0, 5]), np.array([8]))
+    np.testing.assert_allclose(result, expected, atol=1e-12)
+
+
+def test_resample_loops_degenerate_loop():
+    point = np.array([[2.0, 0.0, 5.0]] * 3)
+    result = resample_loops(point, np.array([0, 3]), np.array([4]))
+    np.testing.assert_array_equal(result, np.repeat(point[:1], 4, axis=0))
+
+
+def test_allocate_budget_is_exact():
+    counts = allocate_budget([10.0, 3.0, 0.5], 17, minimum=3)
+    assert counts.sum() == 17
+    assert counts.min() >= 3
+    assert counts[0] > counts[1]
+
+
+def test_contour_to_3d():
+    processor = ImageProcessor()
+    processor.image_shape = (200, 400)
+    contour = np.array([[[200, 100]], [[0, 0]], [[400, 200]]])
+
+    points = processor.contour_to_3d(contour)
+    expected = [[0, 0, 0], [-50, 0, 50], [50, 0, -50]]
+    np.testing.assert_allclose(points, expected)
+
+
+def test_distribute_points_evenly_splits_by_perimeter():
+    processor = ImageProcessor()
+    loops = [rectangle(0, 0, 3, 1), rectangle(10, 0, 1, 1)]
+    processor.contour_points = np.concatenate(loops)
+    processor.contour_offsets = np.array([0, 4, 8])
+
+    # Каждому контуру по 3 точки, остальные 6 - пропорционально периметрам 8 и 4
+    targets = processor.distribute_points_evenly(12)
+    offsets = processor.target_offsets
+    np.testing.assert_array_equal(offsets, [0, 7, 12])
+
+    for loop, start, stop, perimeter in [(loops[0], 0, 7, 8.0), (loops[1], 7, 12, 4.0)]:
+        steps = np.diff(arc_positions(loop, targets[start:stop]))
+        np.testing.assert_allclose(steps, perimeter / (stop - start), atol=1e-9)
+
+
+def star_image(path, size=2400):
+    angle = np.linspace(0, 2 * np.pi, 24, endpoint=False)
+    radius = np.where(np.arange(24) % 2 == 0, 0.45, 0.2) * size
+    points = np.stack([size / 2 + radius * np.cos(angle), size / 2 + radius * np.sin(angle)], axis=1)
+    image = np.zeros((size, size), np.uint8)
+    cv2.fillPoly(image, [np.round(points).astype(np.int32)], 255)
+    cv2.circle(image, (size // 2, size // 2), size // 10, 0, -1)
+    cv2.imwrite(str(path), image)
+    return str(path)
+
+
+@pytest.mark.parametrize("target_count", [12, 40, 150])
+def test_simplify_hits_target_count(target_count):
+    angle = np.linspace(0, 2 * np.pi, 5000, endpoint=False)
+    radius = 500 + 80 * np.sin(7 * angle) + 30 * np.cos(23 * angle)
+    contour = np.round(np.stack([radius * np.cos(angle), radius * np.sin(angle)], axis=1))
+    contour = contour.astype(np.int32).reshape(-1, 1, 2)
+
+    processor = ImageProcessor()
+    approx = processor.simplify(contour, target_count)
+    assert abs(len(approx) - target_count) <= max(1, int(processor.target_tolerance * target_count))
+
+
+def test_process_image_target_count(tmp_path):
+    path = star_image(tmp_path / "star.png")
+    processor = ImageProcessor()
+    processor.multi_contour = True
+    points = processor.process_image(path, 100, target_count=100)
+    assert abs(len(points) - 100) <= 6
+    assert len(processor.contour_offsets) == 3
+
+
+@pytest.mark.parametrize("adaptive", [True, False])
+def test_resimplify_reuses_source_contour(tmp_path, monkeypatch, adaptive):
+    path = star_image(tmp_path / "star.png")
+
+    def fresh(target_count):
+        processor = ImageProcessor()
+        processor.adaptive = adaptive
+        return processor.process_image(path, 60, target_count)
+
+    processor = ImageProcessor()
+    processor.adaptive = adaptive
+    processor.process_image(path, 60, 60)
+    expected = fresh(24)
+
+    # Изображение повторно не читается и не декодируется
+    def fail(*args, **kwargs):
+        raise AssertionError("изображение прочитано повторно")
+    monkeypatch.setattr(cv2, "imread", fail)
+    monkeypatch.setattr(cv2, "imdecode", fail)
+
+    np.testing.assert_array_equal(processor.resimplify(24), expected)
+    assert processor.get_recommended_drone_count() == len(expected)
+
+
+def test_resimplify_after_cache_hit(tmp_path, monkeypatch):
+    path = star_image(tmp_path / "star.png")
+    cache = FormationCache(str(tmp_path / "cache"))
+    processor = ImageProcessor(cache=cache)
+    processor.adaptive = False
+    processor.process_image(path, 60, 60)
+    expected = processor.resimplify(24)
+
+    cached = ImageProcessor(cache=cache)
+    cached.adaptive = False
+    monkeypatch.setattr(cv2, "imdecode", lambda *args: pytest.fail("кэш не использован"))
+    cached.process_image(path, 60, 60)
+    np.testing.assert_array_equal(cached.resimplify(24), expected)
+
+
+def polygon_image(path, size=4000):
+    corners = np.array([[0.5, 0.08], [0.93, 0.4], [0.76, 0.9], [0.22, 0.85], [0.1, 0.35]]) * size
+    image = np.zeros((size, size), np.uint8)
+    cv2.fillPoly(image, [np.round(corners).astype(np.int32)], 255)
+    cv2.imwrite(str(path), image)
+    return str(path), corners
+
+
+def test_pyramid_level():
+    processor = ImageProcessor()
+    processor.min_level_size = 1000
+    processor.oversample = 4
+    assert processor.pyramid_level(8000, 6000) == 3
+    assert processor.pyramid_level(800, 600) == 0
+    # Периметр уровня должен вместить oversample точек на дрона
+    assert processor.pyramid_level(8000, 6000, num_drones=1500) == 2
+    assert processor.pyramid_level(8000, 6000, num_drones=20000) == 0
+
+
+def test_refined_vertices_hit_corners(tmp_path):
+    path, corners = polygon_image(tmp_path / "polygon.png")
+    processor = ImageProcessor()
+    processor.min_level_size = 256
+    processor.process_image(path, 5, target_count=5)
+    assert processor._pyramid[2] == 8
+
+    # Вершины на уровне пирамиды сдвинуты на пиксели уровня, после
+    # уточнения - на пиксели исходного изображения
+    vertices = processor._refine_all([processor.simplify(contour, 5) for contour in processor._pyramid[3]])[0]
+    vertices = vertices.reshape(-1, 2)
+    assert len(vertices) == 5
+    distance = np.linalg.norm(vertices[:, None] - corners[None], axis=2).min(axis=0)
+    assert distance.max() < 4
+
+
+def test_memory_limit_reduces_decode(tmp_path):
+    path, corners = polygon_image(tmp_path / "polygon.png")
+    encoded = len(open(path, "rb").read())
+    processor = ImageProcessor()
+    processor.memory_limit = encoded + 4 * 2000 * 2000
+    processor.process_image(path, 5, target_count=5)
+    assert processor._pyramid[1] == 2
+    assert processor._pyramid[0].shape == (2000, 2000)
+    # Координаты контура остаются в пикселях исходного изображения
+    assert processor.image_shape == (4000, 4000)
+    assert processor.contours[0].reshape(-1, 2).max() > 3500
+
+    processor.memory_limit = encoded + 4 * 400 * 400
+    with pytest.raises(ValueError):
+        processor.process_image(path, 5)
+
+
+@pytest.mark.parametrize("num_points", [7, 100, 1001])
+def test_part_budgets_sum_to_num_points(tmp_path, num_points):
+    path = star_image(tmp_path / "star.png")
+    processor = ImageProcessor()
+    processor.multi_contour = True
+    processor.process_image(path, num_points)
+    targets = processor.distribute_points_evenly(num_points)
+    assert len(targets) == num_points
+    assert processor.target_offsets[-1] == num_points
+    assert np.all(np.diff(processor.target_offsets) >= 3)
+
+
+def min_distance(points):
+    cKDTree = pytest.importorskip("scipy.spatial").cKDTree
+    distance, _ = cKDTree(points).query(points, k=2)
+    return distance[:, 1].min()
+
+
+def test_poisson_disk_samples_spacing():
+    mask = np.zeros((300, 400), dtype=bool)
+    mask[50:250, 30:370] = True
+    mask[120:180, 150:250] = False
+    samples = poisson_disk_samples(mask, 7.0, np.random.default_rng(1))
+
+    assert min_distance(samples) >= 7.0
+    assert mask[samples[:, 1].astype(int), samples[:, 0].astype(int)].all()
+    # Выборка плотная: не меньше половины предельной плотности 0.7 / spacing²
+    assert len(samples) > 0.35 * mask.sum() / 7.0 ** 2
+
+
+@pytest.mark.parametrize("num_points", [50, 500, 3000])
+def test_fill_points_count_and_spacing(tmp_path, num_points):
+    path = star_image(tmp_path / "star.png", size=800)
+    processor = ImageProcessor()
+    processor.multi_contour = True
+    processor.process_image(path)
+    points = processor.fill_points(num_points, seed=0)
+
+    assert points.shape == (num_points, 3)
+    np.testing.assert_array_equal(processor.target_offsets, [0, num_points])
+    assert min_distance(points[:, [0, 2]]) >= processor.fill_spacing * (1 - 1e-9)
+    np.testing.assert_array_equal(processor.fill_points(num_points, seed=0), points)
+
+
+def test_fill_points_tops_up_from_outline(tmp_path):
+    # Фигура не вмещает столько точек даже на расстоянии в пиксель маски
+    image = np.zeros((200, 200), np.uint8)
+    cv2.rectangle(image, (20, 95), (180, 105), 255, -1)
+    path = tmp_path / "bar.png"
+    cv2.imwrite(str(path), image)
+
+    processor = ImageProcessor()
+    processor.max_fill_mask = 256
+    processor.process_image(str(path))
+    points = processor.fill_points(2000, seed=0)
+    assert len(points) == 2000
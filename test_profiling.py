@@ -0,0 +1,89 @@
+"""Профилировщик фаз: процентили, кольцевой буфер и экспорт"""
+import csv
+import json
+
+import pytest
+
+from profiling import SUMMARY_FIELDS, PhaseProfiler
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def timed(profiler, timer, name, seconds):
+    with profiler.phase(name):
+        timer.now += seconds
+
+
+def test_phase_statistics():
+    timer = FakeTimer()
+    profiler = PhaseProfiler(enabled=True, timer=timer)
+    for ms in range(1, 101):
+        timed(profiler, timer, "step", ms / 1000.0)
+    timed(profiler, timer, "draw", 0.002)
+
+    step, draw = profiler.summary()
+    assert step["phase"] == "step" and draw["phase"] == "draw"
+    assert step["count"] == 100
+    assert step["mean_ms"] == pytest.approx(50.5)
+    assert step["p50_ms"] == pytest.approx(50.5)
+    assert step["p99_ms"] == pytest.approx(99.01)
+    assert step["max_ms"] == pytest.approx(100.0)
+    assert draw["p95_ms"] == pytest.approx(2.0)
+
+
+def test_window_keeps_recent_samples():
+    profiler = PhaseProfiler(window=4, enabled=True)
+    for ms in (100, 100, 1, 2, 3, 4):
+        profiler.add("step", ms / 1000.0)
+    row = profiler.summary()[0]
+    assert row["count"] == 6
+    assert row["max_ms"] == pytest.approx(4.0)
+    assert row["mean_ms"] == pytest.approx(2.5)
+
+
+def test_disabled_profiler_measures_nothing():
+    timer = FakeTimer()
+    profiler = PhaseProfiler(timer=timer)
+    assert profiler.phase("step") is profiler.phase("draw")
+    timed(profiler, timer, "step", 1.0)
+    assert profiler.summary() == []
+    assert profiler.format_summary() == "Нет данных"
+
+
+def test_external_rows_and_reset():
+    profiler = PhaseProfiler(enabled=True)
+    profiler.add("draw", 0.001)
+    worker = {field: 0.0 for field in SUMMARY_FIELDS}
+    worker.update(phase="worker step", count=3)
+    profiler.set_external([worker])
+    assert [row["phase"] for row in profiler.summary()] == ["draw", "worker step"]
+    assert "worker step" in profiler.format_summary()
+
+    profiler.reset()
+    assert profiler.summary() == []
+
+
+def test_export(tmp_path):
+    profiler = PhaseProfiler(window=10, enabled=True)
+    profiler.add("step", 0.003)
+    profiler.add("step", 0.005)
+
+    json_path = tmp_path / "profile.json"
+    profiler.export(str(json_path))
+    data = json.loads(json_path.read_text(encoding="utf-8"))
+    assert data["window"] == 10
+    assert data["phases"][0]["mean_ms"] == pytest.approx(4.0)
+
+    csv_path = tmp_path / "profile.csv"
+    profiler.export(str(csv_path))
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert tuple(rows[0]) == SUMMARY_FIELDS
+    assert rows[0]["phase"] == "step" and rows[0]["count"] == "2"
+    assert float(rows[0]["max_ms"]) == pytest.approx(5.0)
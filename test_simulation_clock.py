@@ -0,0 +1,73 @@
+"""Часы симуляции с фиксированным шагом на подставном таймере"""
+import pytest
+
+from simulation_clock import SimulationClock
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_clock(**kwargs):
+    timer = FakeTimer()
+    clock = SimulationClock(dt=0.01, timer=timer, **kwargs)
+    clock.reset()
+    return clock, timer
+
+
+def test_accumulator_carries_remainder():
+    clock, timer = make_clock()
+    steps = []
+    for _ in range(4):
+        timer.now += 0.025
+        steps.append(clock.advance())
+
+    # 0.025 с на кадр: 2 шага и остаток 0.005, который дает третий шаг через кадр
+    assert steps == [2, 3, 2, 3]
+    assert clock.accumulator == pytest.approx(0.0, abs=1e-12)
+
+
+def test_max_substeps_drops_excess_time():
+    clock, timer = make_clock(max_substeps=5)
+    timer.now += 0.5
+    assert clock.advance() == 5
+    assert clock.dropped_time == pytest.approx(0.45)
+    assert clock.accumulator == 0.0
+
+    # После долгого кадра догоняющих шагов нет
+    timer.now += 0.01
+    assert clock.advance() == 1
+
+
+@pytest.mark.parametrize("frame_time", [0.004, 1.0 / 60.0, 0.033])
+def test_simulation_time_follows_real_time(frame_time):
+    clock, timer = make_clock(max_substeps=10)
+    calls = []
+    frames = int(round(2.0 / frame_time))
+    for _ in range(frames):
+        timer.now += frame_time
+        clock.run(lambda: calls.append(1))
+
+    # Частота кадров не влияет на скорость симуляции: 2 с - 200 шагов
+    assert abs(len(calls) - 200) <= 1
+    assert clock.total_steps == len(calls)
+
+
+def test_max_speed_runs_until_budget():
+    clock, timer = make_clock()
+    clock.max_speed = True
+    clock.max_speed_budget = 0.05
+
+    def step():
+        timer.now += 0.002
+
+    assert clock.run(step) == 25
+
+    # В обычном режиме время, прошедшее в режиме максимальной скорости, не накапливается
+    clock.max_speed = False
+    timer.now += 0.01
+    assert clock.run(step) == 1
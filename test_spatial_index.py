@@ -0,0 +1,79 @@
+"""Поиск соседей и силы отталкивания сверяются с полным перебором"""
+import numpy as np
+
+from drone_simulation import DroneSwarm
+from spatial_index import SpatialGrid, VerletList
+
+
+def brute_pairs(points, radius):
+    diff = points[:, None, :] - points[None, :, :]
+    close = np.linalg.norm(diff, axis=2) < radius
+    np.fill_diagonal(close, False)
+    return set(zip(*np.nonzero(close)))
+
+
+def make_swarm(count=400, size=12.0, seed=1):
+    rng = np.random.default_rng(seed)
+    swarm = DroneSwarm(count, rng.uniform(0, size, (count, 3)), seed=seed)
+    swarm.positions = rng.uniform(0, size, (count, 3))
+    return swarm
+
+
+def test_grid_pairs_match_brute_force():
+    points = np.random.default_rng(0).uniform(-5, 5, (300, 3))
+    grid = SpatialGrid(1.5)
+    pair_i, pair_j = grid.query_pairs(points, 1.5)
+    assert set(zip(pair_i, pair_j)) == brute_pairs(points, 1.5)
+
+
+def test_grid_query_points_match_brute_force():
+    rng = np.random.default_rng(1)
+    points = rng.uniform(-5, 5, (300, 3))
+    queries = rng.uniform(-6, 6, (50, 3))
+    grid = SpatialGrid(1.5)
+    grid.build(points)
+    query_i, point_j = grid.query_points(queries, 1.5)
+
+    dist = np.linalg.norm(queries[:, None, :] - points[None, :, :], axis=2)
+    assert set(zip(query_i, point_j)) == set(zip(*np.nonzero(dist < 1.5)))
+
+
+def test_verlet_pairs_cover_cutoff():
+    points = np.random.default_rng(2).uniform(-5, 5, (300, 3))
+    verlet = VerletList(1.0, 0.5)
+    verlet.build(points)
+    owners, neighbors = verlet.pairs_for(np.arange(len(points)))
+    assert set(zip(owners, neighbors)) == brute_pairs(points, 1.5)
+
+    subset = np.array([3, 10, 200])
+    owners, neighbors = verlet.pairs_for(subset)
+    expected = {(k, j) for k, i in enumerate(subset) for (a, j) in brute_pairs(points, 1.5) if a == i}
+    assert set(zip(owners, neighbors)) == expected
+
+
+def test_grid_and_verlet_forces_match_brute_force():
+    swarm = make_swarm()
+    expected = swarm.compute_separation_all()
+    assert np.abs(expected).sum() > 0
+
+    np.testing.assert_allclose(swarm.compute_separation_grid(), expected, atol=1e-12)
+    np.testing.assert_allclose(swarm.compute_separation_verlet(), expected, atol=1e-12)
+
+
+def test_verlet_reuse_matches_brute_force():
+    swarm = make_swarm()
+    swarm.compute_separation_verlet()
+    rebuilds = swarm.verlet_list.rebuilds
+
+    # Смещение меньше skin / 2: списки переиспользуются, силы остаются точными
+    drift = np.random.default_rng(3).uniform(-1, 1, swarm.positions.shape)
+    swarm.positions += drift * (0.2 * swarm.verlet_skin / np.sqrt(3))
+    forces = swarm.compute_separation_verlet()
+    assert swarm.verlet_list.rebuilds == rebuilds
+    np.testing.assert_allclose(forces, swarm.compute_separation_all(), atol=1e-12)
+
+    # Смещение больше skin / 2: списки перестраиваются
+    swarm.positions[0] += swarm.verlet_skin
+    forces = swarm.compute_separation_verlet()
+    assert swarm.verlet_list.rebuilds == rebuilds + 1
+    np.testing.assert_allclose(forces, swarm.compute_separation_all(), atol=1e-12)
@@ -0,0 +1,51 @@
+"""Воспроизводимость роя: одинаковый seed и продолжение с контрольной точки"""
+import numpy as np
+
+from drone_simulation import DroneSwarm
+from swarm_checkpoint import STATE_ARRAYS, load_checkpoint, save_checkpoint
+
+
+def make_targets(count=150):
+    angle = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    return np.stack([20 * np.cos(angle), np.zeros(count), 20 * np.sin(angle)], axis=1)
+
+
+def run(swarm, steps):
+    for _ in range(steps):
+        swarm.update_positions()
+    return swarm
+
+
+def assert_same_state(a, b):
+    for name in STATE_ARRAYS:
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name), err_msg=name)
+    assert a.step_count == b.step_count
+
+
+def test_same_seed_gives_identical_runs():
+    a = run(DroneSwarm(150, make_targets(), seed=7), 60)
+    b = run(DroneSwarm(150, make_targets(), seed=7), 60)
+    assert_same_state(a, b)
+
+    c = run(DroneSwarm(150, make_targets(), seed=8), 60)
+    assert not np.array_equal(a.positions, c.positions)
+
+
+def test_resume_is_bit_identical(tmp_path):
+    reference = run(DroneSwarm(150, make_targets(), seed=3), 40)
+    interrupted = run(DroneSwarm(150, make_targets(), seed=3), 20)
+
+    path = tmp_path / "swarm.npz"
+    save_checkpoint(interrupted, path)
+    resumed = run(load_checkpoint(path), 20)
+    assert_same_state(resumed, reference)
+
+
+def test_compressed_checkpoint_round_trip(tmp_path):
+    swarm = run(DroneSwarm(50, make_targets(50), seed=1), 10)
+    path = tmp_path / "swarm.npz"
+    save_checkpoint(swarm, path, compressed=True)
+
+    restored = load_checkpoint(path)
+    assert_same_state(restored, swarm)
+    assert restored.rng.bit_generator.state == swarm.rng.bit_generator.state
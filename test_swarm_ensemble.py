@@ -0,0 +1,84 @@
+"""Ансамбль роев: совпадение с одиночным роем, маски сходимости, воспроизводимость"""
+import numpy as np
+
+from drone_simulation import DroneSwarm
+from swarm_ensemble import SwarmEnsemble
+
+
+def ring(count, radius):
+    angle = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    return np.stack([radius * np.cos(angle), np.zeros(count), radius * np.sin(angle)], axis=1)
+
+
+def test_params_are_not_mutated():
+    params = {"inertia_weight": [0.5, 0.7]}
+    ensemble = SwarmEnsemble(2, 20, ring(20, 10.0), params, seed=0)
+    assert params == {"inertia_weight": [0.5, 0.7]}
+    np.testing.assert_array_equal(ensemble.inertia_weight, [0.5, 0.7])
+    np.testing.assert_array_equal(ensemble.social_param, [1.4, 1.4])
+
+
+def test_separation_matches_single_swarm():
+    params = {"personal_space": [2.0, 3.0, 1.5], "separation_weight": [1.0, 0.5, 2.0]}
+    ensemble = SwarmEnsemble(3, 150, ring(150, 8.0), params, seed=1)
+    ensemble.positions = np.random.default_rng(1).uniform(0, 12, (3, 150, 3))
+    forces = ensemble.compute_separation(np.arange(3))
+
+    for k in range(3):
+        swarm = DroneSwarm(150, ring(150, 8.0), seed=1)
+        swarm.personal_space = params["personal_space"][k]
+        swarm.separation_weight = params["separation_weight"][k]
+        swarm.positions = ensemble.positions[k].copy()
+        expected = swarm.compute_separation_all()
+        assert np.abs(expected).sum() > 0
+        np.testing.assert_allclose(forces[k], expected, atol=1e-12)
+
+
+def test_assignment_matches_single_swarm():
+    ensemble = SwarmEnsemble(3, 40, ring(40, 20.0), seed=2)
+    for k in range(3):
+        swarm = DroneSwarm(40, ring(40, 20.0), seed=2)
+        swarm.positions = ensemble.positions[k].copy()
+        swarm.assign_targets_dynamically()
+        np.testing.assert_array_equal(ensemble.target_indices[k], swarm.target_indices)
+        np.testing.assert_array_equal(ensemble.target_positions[k], swarm.target_positions)
+
+
+def test_swarms_converge_and_freeze():
+    params = {"slowdown_factor": [0.05, 0.15, 0.3]}
+    ensemble = SwarmEnsemble(3, 60, ring(60, 30.0), params, seed=3)
+    frozen = {}
+    while ensemble.active.any() and ensemble.step_count < 5000:
+        ensemble.step()
+        for k in np.flatnonzero(~ensemble.active):
+            if k in frozen:
+                np.testing.assert_array_equal(ensemble.positions[k], frozen[k])
+            else:
+                frozen[k] = ensemble.positions[k].copy()
+
+    assert not ensemble.active.any()
+    steps = ensemble.steps_to_convergence
+    assert np.all(steps > 0)
+    assert steps[0] > steps[2]
+    np.testing.assert_array_equal(ensemble.steps, steps)
+    assert np.all(ensemble.get_average_errors() < ensemble.convergence_threshold)
+
+    # Одиночный рой с теми же параметрами тоже сходится
+    for k, slowdown in enumerate(params["slowdown_factor"]):
+        swarm = DroneSwarm(60, ring(60, 30.0), seed=3)
+        swarm.slowdown_factor = slowdown
+        for _ in range(3 * steps[k]):
+            swarm.update_positions()
+            if swarm.get_average_error() < 1.0:
+                break
+        assert swarm.get_average_error() < 1.0
+
+
+def test_same_seed_is_reproducible():
+    results = []
+    for _ in range(2):
+        ensemble = SwarmEnsemble(2, 40, ring(40, 15.0), {"inertia_weight": [0.5, 0.7]}, seed=5)
+        ensemble.run(300)
+        results.append((ensemble.positions.copy(), ensemble.get_results()))
+    np.testing.assert_array_equal(results[0][0], results[1][0])
+    assert results[0][1] == results[1][1]
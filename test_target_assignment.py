@@ -0,0 +1,86 @@
+"""Назначение целей: точность аукциона, корректность приближенных режимов, выбор решателя"""
+import numpy as np
+import pytest
+
+import target_assignment
+from drone_simulation import DroneSwarm
+from target_assignment import (
+    TargetAssigner, auction_assignment, distance_matrix, greedy_assignment, nearest_free_assignment
+)
+
+
+def total_cost(cost, result):
+    rows = np.flatnonzero(result >= 0)
+    return cost[rows, result[rows]].sum()
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (8, 8), (30, 30), (12, 20), (20, 12)])
+@pytest.mark.parametrize("seed", range(3))
+def test_auction_matches_linear_sum_assignment(shape, seed):
+    rng = np.random.default_rng(seed)
+    cost = distance_matrix(rng.uniform(-10, 10, (shape[0], 3)), rng.uniform(-10, 10, (shape[1], 3)))
+
+    linear_sum_assignment = pytest.importorskip("scipy.optimize").linear_sum_assignment
+    result = auction_assignment(cost)
+    row_idx, col_idx = linear_sum_assignment(cost)
+    assert (result >= 0).sum() == min(shape)
+    assert len(np.unique(result[result >= 0])) == min(shape)
+    assert total_cost(cost, result) == pytest.approx(cost[row_idx, col_idx].sum(), rel=1e-6)
+
+
+@pytest.mark.parametrize("assign", [nearest_free_assignment, greedy_assignment])
+@pytest.mark.parametrize("drones, targets", [(300, 300), (300, 200), (200, 300)])
+def test_approximate_assignment_is_valid(assign, drones, targets):
+    rng = np.random.default_rng(drones + targets)
+    positions = rng.uniform(-50, 50, (drones, 3))
+    points = rng.uniform(-20, 20, (targets, 3))
+
+    result = assign(positions, points)
+    assigned = result[result >= 0]
+    assert len(result) == drones
+    assert len(assigned) == min(drones, targets)
+    assert len(np.unique(assigned)) == len(assigned)
+    assert assigned.max() < targets
+
+
+def test_nearest_free_assignment_clustered_start():
+    rng = np.random.default_rng(5)
+    positions = rng.normal(0, 0.5, (2000, 3))
+    angle = np.linspace(0, 2 * np.pi, 2000, endpoint=False)
+    points = np.stack([40 * np.cos(angle), np.zeros(2000), 40 * np.sin(angle)], axis=1)
+
+    result = nearest_free_assignment(positions, points)
+    assert np.array_equal(np.sort(result), np.arange(2000))
+
+
+def test_auto_mode_switches_at_optimal_limit(monkeypatch):
+    calls = []
+    monkeypatch.setattr(target_assignment, "optimal_assignment",
+                        lambda cost: calls.append("optimal") or np.arange(len(cost)))
+    monkeypatch.setattr(target_assignment, "nearest_free_assignment",
+                        lambda positions, targets: calls.append("nearest") or np.arange(len(positions)))
+
+    assigner = TargetAssigner("auto", optimal_limit=100)
+    assert assigner.resolve_mode(10, 10) == "optimal"
+    assert assigner.resolve_mode(10, 11) == "nearest"
+    assert assigner.resolve_mode(10, 11, mode="greedy") == "greedy"
+
+    points = np.zeros((10, 3))
+    assigner.assign(points, points)
+    assigner.assign(points, np.zeros((11, 3)))
+    assigner.assign(points, np.zeros((11, 3)), mode="optimal")
+    assert calls == ["optimal", "nearest", "optimal"]
+
+
+def test_reassign_targets_defaults_to_auto(monkeypatch):
+    swarm = DroneSwarm(50, np.random.default_rng(0).uniform(-10, 10, (50, 3)), seed=0)
+    swarm.target_assigner.optimal_limit = 50 * 50 - 1
+
+    modes = []
+    resolve = swarm.target_assigner.resolve_mode
+    monkeypatch.setattr(swarm.target_assigner, "resolve_mode",
+                        lambda *args: modes.append(resolve(*args)) or modes[-1])
+    swarm.reassign_targets()
+    swarm.reassign_targets("optimal")
+    assert modes == ["nearest", "optimal"]
+    assert len(np.unique(swarm.target_indices)) == 50
@@ -0,0 +1,109 @@
+"""Запись траектории в файл, чтение прерванной записи и воспроизведение"""
+import os
+
+import numpy as np
+import pytest
+
+from drone_simulation import DroneSwarm
+from trajectory import HEADER_SIZE, Trajectory, TrajectoryRecorder, TrajectoryReplay
+
+
+def record(path, ticks, dtype=np.float64, include_targets=True, chunk_ticks=4, close=True):
+    swarm = DroneSwarm(30, np.random.default_rng(0).uniform(-10, 10, (30, 3)), seed=0)
+    recorder = TrajectoryRecorder(str(path), 30, dtype=dtype, include_targets=include_targets,
+                                  chunk_ticks=chunk_ticks)
+    frames = []
+    for _ in range(ticks):
+        swarm.update_positions()
+        recorder.record(swarm)
+        frames.append((swarm.positions.copy(), swarm.velocities.copy(), swarm.target_positions.copy()))
+    if close:
+        recorder.close()
+    else:
+        recorder.frames.flush()
+        recorder.header.flush()
+    return frames
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("include_targets", [True, False])
+def test_round_trip(tmp_path, dtype, include_targets):
+    path = tmp_path / "run.traj"
+    frames = record(path, 10, dtype, include_targets)
+
+    trajectory = Trajectory(str(path))
+    assert trajectory.num_ticks == 10
+    assert trajectory.num_drones == 30
+    assert trajectory.frames.dtype == dtype
+    assert os.path.getsize(path) == HEADER_SIZE + 10 * trajectory.frames[0].nbytes
+    for tick, (positions, velocities, targets) in enumerate(frames):
+        np.testing.assert_array_equal(trajectory.positions(tick), positions.astype(dtype))
+        np.testing.assert_array_equal(trajectory.velocities(tick), velocities.astype(dtype))
+        expected = targets if include_targets else positions
+        np.testing.assert_array_equal(trajectory.target_positions(tick), expected.astype(dtype))
+
+
+def test_unclosed_recording(tmp_path):
+    # Запись прервана до close: файл длиннее записанного, счетчик - из заголовка
+    path = tmp_path / "run.traj"
+    frames = record(path, 6, chunk_ticks=4, close=False)
+    assert os.path.getsize(path) > HEADER_SIZE + 6 * 3 * 30 * 3 * 8
+
+    trajectory = Trajectory(str(path))
+    assert trajectory.num_ticks == 6
+    np.testing.assert_array_equal(trajectory.positions(5), frames[5][0])
+
+
+def test_truncated_file(tmp_path):
+    # Файл обрезан посреди кадра: читаются только целые кадры
+    path = tmp_path / "run.traj"
+    frames = record(path, 10)
+    frame_bytes = 3 * 30 * 3 * 8
+    with open(path, "r+b") as f:
+        f.truncate(HEADER_SIZE + 7 * frame_bytes + frame_bytes // 2)
+
+    trajectory = Trajectory(str(path))
+    assert trajectory.num_ticks == 7
+    np.testing.assert_array_equal(trajectory.positions(6), frames[6][0])
+
+    with open(path, "r+b") as f:
+        f.truncate(HEADER_SIZE)
+    assert Trajectory(str(path)).num_ticks == 0
+
+
+def test_not_a_trajectory(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\0" * 100)
+    with pytest.raises(ValueError):
+        Trajectory(str(path))
+
+
+def test_replay(tmp_path):
+    path = tmp_path / "run.traj"
+    frames = record(path, 10)
+    replay = TrajectoryReplay(Trajectory(str(path)))
+
+    state = replay.get_state()
+    np.testing.assert_array_equal(state.positions, frames[0][0])
+    assert not state.positions.flags.writeable
+
+    replay.speed = 2.5
+    replay.update_positions()
+    replay.update_positions()
+    assert replay.tick == 5
+    assert replay.get_state().generation == 5
+    np.testing.assert_array_equal(replay.get_state().target_positions, frames[5][2])
+
+    replay.speed = -4
+    replay.update_positions()
+    replay.update_positions()
+    assert replay.tick == 0
+
+    replay.seek(100)
+    assert replay.tick == 9
+    replay.playing = False
+    replay.update_positions()
+    assert replay.tick == 9
+    assert replay.get_average_error() == pytest.approx(
+        np.linalg.norm(frames[9][0] - frames[9][2], axis=1).mean()
+    )
@@ -0,0 +1,226 @@
+"""Запись траекторий роя в файл с отображением в память и их воспроизведение
+
+Формат файла: заголовок фиксированного размера, затем кадры подряд.
+Кадр - массив (F, N, 3): позиции, скорости и (по желанию) цели всех
+дронов. Весь файл читается как массив (T, F, N, 3) через np.memmap, без
+создания объектов на каждый дрон.
+"""
+import os
+
+import numpy as np
+
+from drone_simulation import DroneState, read_only
+
+
+MAGIC = b"PSOTRAJ1"
+HEADER_SIZE = 64
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("num_drones", "<u8"),
+    ("num_ticks", "<u8"),
+    ("num_fields", "<u4"),
+    ("dtype", "S4"),
+    ("reserved", "S32"),
+])
+
+FIELDS = ("positions", "velocities", "target_positions")
+
+
+class TrajectoryRecorder:
+    """Дозапись кадров роя в файл траектории
+
+    Файл увеличивается блоками по chunk_ticks кадров и отображается в память
+    заново только при расширении; после close лишний хвост обрезается.
+    """
+
+    def __init__(self, path, num_drones, dtype=np.float32, include_targets=True,
+                 chunk_ticks=1024):
+        self.path = path
+        self.num_drones = num_drones
+        self.dtype = np.dtype(dtype)
+        self.num_fields = 3 if include_targets else 2
+        self.chunk_ticks = chunk_ticks
+        self.frame_bytes = self.num_fields * num_drones * 3 * self.dtype.itemsize
+
+        self.num_ticks = 0
+        self.capacity = 0
+        self.frames = None
+
+        with open(path, "wb") as f:
+            f.write(b"\0" * HEADER_SIZE)
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        self.header["magic"] = MAGIC
+        self.header["num_drones"] = num_drones
+        self.header["num_ticks"] = 0
+        self.header["num_fields"] = self.num_fields
+        self.header["dtype"] = self.dtype.str.encode("ascii")
+        self.header.flush()
+
+    def _grow(self):
+        """Расширение файла на chunk_ticks кадров"""
+        if self.frames is not None:
+            self.frames.flush()
+            self.frames = None
+
+        self.capacity += self.chunk_ticks
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER_SIZE + self.capacity * self.frame_bytes)
+
+        self.frames = np.memmap(
+            self.path, dtype=self.dtype, mode="r+", offset=HEADER_SIZE,
+            shape=(self.capacity, self.num_fields, self.num_drones, 3),
+        )
+
+    def record(self, swarm):
+        """Запись текущего состояния роя как очередного кадра"""
+        if self.num_ticks == self.capacity:
+            self._grow()
+
+        frame = self.frames[self.num_ticks]
+        frame[0] = swarm.positions
+        frame[1] = swarm.velocities
+        if self.num_fields == 3:
+            frame[2] = swarm.target_positions
+
+        self.num_ticks += 1
+        self.header["num_ticks"] = self.num_ticks
+
+    def close(self):
+        if self.frames is not None:
+            self.frames.flush()
+            self.frames = None
+        self.header.flush()
+        self.header = None
+
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER_SIZE + self.num_ticks * self.frame_bytes)
+
+
+class Trajectory:
+    """Записанная траектория, доступная как массив (T, F, N, 3) без загрузки"""
+
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC:
+            raise ValueError("Файл не является траекторией роя")
+
+        self.path = path
+        self.num_drones = int(header["num_drones"][0])
+        self.num_fields = int(header["num_fields"][0])
+        self.dtype = np.dtype(header["dtype"][0].decode("ascii"))
+
+        # Число кадров берется по размеру файла: запись могла быть прервана
+        frame_bytes = self.num_fields * self.num_drones * 3 * self.dtype.itemsize
+        available = (os.path.getsize(path) - HEADER_SIZE) // frame_bytes if frame_bytes else 0
+        self.num_ticks = int(min(int(header["num_ticks"][0]), available))
+
+        if self.num_ticks > 0:
+            self.frames = np.memmap(
+                path, dtype=self.dtype, mode="r", offset=HEADER_SIZE,
+                shape=(self.num_ticks, self.num_fields, self.num_drones, 3),
+            )
+        else:
+            self.frames = np.zeros((0, self.num_fields, self.num_drones, 3), dtype=self.dtype)
+
+    @property
+    def has_targets(self):
+        return self.num_fields == 3
+
+    def positions(self, tick):
+        return self.frames[tick, 0]
+
+    def velocities(self, tick):
+        return self.frames[tick, 1]
+
+    def target_positions(self, tick):
+        return self.frames[tick, 2] if self.has_targets else self.frames[tick, 0]
+
+
+class TrajectoryReplay:
+    """Воспроизведение траектории с интерфейсом чтения DroneSwarm
+
+    update_positions сдвигает позицию воспроизведения на speed кадров (скорость
+    может быть дробной и отрицательной), поэтому визуализация проигрывает
+    запись так же, как шагает рой. Перетаскивание в режиме просмотра не
+    действует.
+    """
+
+    def __init__(self, trajectory):
+        self.trajectory = trajectory
+        self.playhead = 0.0
+        self.speed = 1.0
+        self.playing = True
+        self.ids = read_only(np.arange(trajectory.num_drones, dtype=np.int64))
+
+    @property
+    def tick(self):
+        return int(self.playhead)
+
+    @property
+    def num_ticks(self):
+        return self.trajectory.num_ticks
+
+    def seek(self, tick):
+        last = max(self.num_ticks - 1, 0)
+        self.playhead = float(min(max(tick, 0), last))
+
+    def update_positions(self):
+        if self.playing:
+            self.seek(self.playhead + self.speed)
+
+    def _frame(self):
+        if self.num_ticks == 0:
+            return None
+        return self.trajectory.frames[self.tick]
+
+    def get_state(self):
+        """Снимок текущего кадра записи; поколением служит номер кадра"""
+        frame = self._frame()
+        if frame is None:
+            empty = np.zeros((0, 3))
+            return DroneState(empty, empty, self.ids, 0)
+        targets = frame[2] if self.trajectory.has_targets else frame[0]
+        return DroneState(read_only(frame[0]), read_only(targets), self.ids, self.tick)
+
+    def get_drones(self):
+        frame = self._frame()
+        if frame is None:
+            return []
+        targets = frame[2] if self.trajectory.has_targets else frame[0]
+        return [(frame[0, i], targets[i], i) for i in range(self.trajectory.num_drones)]
+
+    def get_drone_info(self, drone_index):
+        frame = self._frame()
+        if frame is None or not 0 <= drone_index < self.trajectory.num_drones:
+            return None
+        targets = frame[2] if self.trajectory.has_targets else frame[0]
+        return {
+            "position": frame[0, drone_index],
+            "velocity": frame[1, drone_index],
+            "target": targets[drone_index],
+            "fitness": float(np.linalg.norm(frame[0, drone_index] - targets[drone_index])),
+            "id": drone_index
+        }
+
+    def get_average_error(self):
+        frame = self._frame()
+        if frame is None or not self.trajectory.has_targets:
+            return 0.0
+        return float(np.linalg.norm(frame[0] - frame[2], axis=1).mean())
+
+    def is_converged(self, threshold=1.0):
+        return self.get_average_error() < threshold
+
+    # В режиме просмотра рой не управляется
+    def set_drone_position(self, drone_index, new_position):
+        pass
+
+    def start_dragging(self, drone_index):
+        pass
+
+    def stop_dragging(self, drone_index):
+        pass
+
+    def reassign_targets(self):
+        pass
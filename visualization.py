@@ -6,6 +6,9 @@ import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
+from profiling import PhaseProfiler
+from simulation_clock import SimulationClock
+from trajectory import Trajectory, TrajectoryRecorder, TrajectoryReplay
 
 class Visualization3D(ttk.Frame):
     def __init__(self, master):
@@ -29,10 +32,26 @@ class Visualization3D(ttk.Frame):
         self.meters_per_degree_lon = 111319.9 * np.cos(np.radians(self.base_latitude))
 
         self.target_points = []
-        self.drones = []
+        self.target_offsets = [0, 0]
+
+        # Снимок состояния роя (DroneState) и поколение, которое уже отрисовано
+        self.state = None
+        self.drawn_generation = None
+        self.scene_dirty = True
+        self.line_vertices = np.zeros((0, 2, 3))
         self.animation_id = None
         self.drone_swarm = None
 
+        # Физика с фиксированным шагом, не зависящая от отрисовки
+        self.clock = SimulationClock(dt=1.0 / 60.0, max_substeps=5)
+
+        # Замер фаз кадра; рой в этом же процессе пишет в этот же профилировщик
+        self.profiler = PhaseProfiler()
+
+        # Запись траектории и режим воспроизведения записи
+        self.recorder = None
+        self.replay = None
+
         # Параметры для перетаскивания
         self.dragging = False
         self.selected_drone = None
@@ -275,6 +294,8 @@ class Visualization3D(ttk.Frame):
         glLightfv(GL_LIGHT0, GL_AMBIENT, (0.2, 0.2, 0.2, 1))
         glLightfv(GL_LIGHT0, GL_DIFFUSE, (0.8, 0.8, 0.8, 1))
 
+        self.quadric = gluNewQuadric()
+
     def draw_direction_marker(self, position, direction, color):
         """Отрисовка маркера направления"""
         glColor3f(*color)
@@ -290,17 +311,50 @@ class Visualization3D(ttk.Frame):
 
         glPopMatrix()
 
-    def set_target_points(self, points):
-        """Установка целевых точек"""
+    def set_target_points(self, points, offsets=None):
+        """Установка целевых точек
+
+        offsets - границы частей формации (контуров): каждая часть рисуется
+        отдельной замкнутой линией.
+        """
         self.target_points = points
+        self.target_offsets = offsets if offsets is not None else [0, len(points)]
+        self.scene_dirty = True
 
-    def set_drones(self, drones):
-        """Установка позиций дронов"""
-        self.drones = drones
+    def set_state(self, state):
+        """Установка снимка состояния роя (DroneState)"""
+        self.state = state
+        if state.generation != self.drawn_generation:
+            self.scene_dirty = True
 
     def set_drone_swarm(self, swarm):
-        """Установка ссылки на объект DroneSwarm"""
+        """Установка ссылки на объект DroneSwarm (или SimulationProcess)"""
         self.drone_swarm = swarm
+        self.drawn_generation = None
+        self.scene_dirty = True
+        if hasattr(swarm, "profiler"):
+            swarm.profiler = self.profiler
+        if self.in_background():
+            self.drone_swarm.set_profiling(self.profiler.enabled)
+            self.drone_swarm.set_max_speed(self.clock.max_speed)
+            if self.animation_id:
+                self.drone_swarm.resume()
+
+    def set_profiling(self, enabled):
+        """Включение замера фаз, в том числе в рабочем процессе роя"""
+        self.profiler.enabled = enabled
+        self.profiler.reset()
+        if self.in_background():
+            self.drone_swarm.set_profiling(enabled)
+
+    def update_profile(self):
+        """Подстановка статистики фаз шага из рабочего процесса"""
+        if self.profiler.enabled and self.in_background():
+            self.profiler.set_external(self.drone_swarm.profile_summary())
+
+    def in_background(self):
+        """Симуляция выполняется в отдельном процессе"""
+        return getattr(self.drone_swarm, "runs_in_background", False)
 
     def screen_to_world(self, screen_x, screen_y):
         """Преобразование координат экрана в мировые координаты"""
@@ -317,18 +371,14 @@ class Visualization3D(ttk.Frame):
 
     def find_nearest_drone(self, screen_x, screen_y):
         """Поиск ближайшего дрона к точке на экране"""
-        min_dist = float('inf')
-        nearest_idx = None
+        if self.state is None or len(self.state.positions) == 0:
+            return None
 
         world_pos = self.screen_to_world(screen_x, screen_y)
 
-        for idx, (drone_pos, _, _) in enumerate(self.drones):
-            dist = np.linalg.norm(drone_pos - world_pos)
-            if dist < min_dist:
-                min_dist = dist
-                nearest_idx = idx
-
-        return nearest_idx if min_dist < 10.0 else None
+        dist = np.linalg.norm(self.state.positions - world_pos, axis=1)
+        nearest_idx = int(np.argmin(dist))
+        return nearest_idx if dist[nearest_idx] < 10.0 else None
 
     def draw_scene(self):
         """Отрисовка всей сцены"""
@@ -348,13 +398,14 @@ class Visualization3D(ttk.Frame):
         for point in self.target_points:
             self.draw_sphere(point, 0.8)
 
-        # Рисуем замкнутую линию контура
+        # Рисуем замкнутую линию каждого контура
         if len(self.target_points) > 1:
             glLineWidth(2.0)
-            glBegin(GL_LINE_LOOP)
-            for point in self.target_points:
-                glVertex3fv(point)
-            glEnd()
+            for start, end in zip(self.target_offsets[:-1], self.target_offsets[1:]):
+                glBegin(GL_LINE_LOOP)
+                for point in self.target_points[start:end]:
+                    glVertex3fv(point)
+                glEnd()
             glLineWidth(1.0)
 
         # Отрисовка точек целей
@@ -362,23 +413,34 @@ class Visualization3D(ttk.Frame):
             self.draw_sphere(point, 0.8)  # Уменьшенный размер для точек
 
         # Отрисовка дронов
-        for idx, (drone, target, drone_id) in enumerate(self.drones):
-            if idx == self.selected_drone:
-                glColor3f(1.0, 1.0, 0.0)  # Желтый для выбранного дрона
-                self.update_coords_display(idx)
-            else:
-                glColor3f(0.0, 0.0, 1.0)  # Синий для остальных
-
-            self.draw_sphere(drone, 2.0)
-
-            # Линия к цели
-            glBegin(GL_LINES)
-            glVertex3fv(drone)
-            glVertex3fv(target)
-            glEnd()
-
-            # Отображение ID дрона над ним
-            self.render_text(drone, str(drone_id))
+        state = self.state
+        if state is not None and len(state.positions) > 0:
+            for idx, drone in enumerate(state.positions):
+                if idx == self.selected_drone:
+                    glColor3f(1.0, 1.0, 0.0)  # Желтый для выбранного дрона
+                    self.update_coords_display(idx)
+                else:
+                    glColor3f(0.0, 0.0, 1.0)  # Синий для остальных
+
+                self.draw_sphere(drone, 2.0)
+
+                # Отображение ID дрона над ним
+                self.render_text(drone, str(state.ids[idx]))
+
+            # Линии к целям одним вызовом из массива вершин
+            count = len(state.positions)
+            if len(self.line_vertices) != count:
+                self.line_vertices = np.zeros((count, 2, 3))
+            self.line_vertices[:, 0] = state.positions
+            self.line_vertices[:, 1] = state.target_positions
+
+            glColor3f(0.0, 0.0, 1.0)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glVertexPointer(3, GL_DOUBLE, 0, self.line_vertices)
+            glDrawArrays(GL_LINES, 0, 2 * count)
+            glDisableClientState(GL_VERTEX_ARRAY)
+
+            self.drawn_generation = state.generation
 
         # Если нет выбранного дрона, очищаем информацию
         if self.selected_drone is None:
@@ -429,8 +491,7 @@ class Visualization3D(ttk.Frame):
         """Отрисовка сферы"""
         glPushMatrix()
         glTranslatef(*position)
-        quad = gluNewQuadric()
-        gluSphere(quad, radius, 16, 16)
+        gluSphere(self.quadric, radius, 16, 16)
         glPopMatrix()
 
     def render_text(self, position, text):
@@ -442,6 +503,9 @@ class Visualization3D(ttk.Frame):
     def start_animation(self):
         """Запуск анимации"""
         if not self.animation_id:
+            self.clock.reset()
+            if self.in_background():
+                self.drone_swarm.resume()
             self.animation_id = self.after(16, self.update)
 
     def stop_animation(self):
@@ -449,11 +513,14 @@ class Visualization3D(ttk.Frame):
         if self.animation_id:
             self.after_cancel(self.animation_id)
             self.animation_id = None
+            if self.in_background():
+                self.drone_swarm.pause()
 
     def update(self):
         """Обновление сцены"""
-        # Обработка событий Pygame
+        # Обработка событий Pygame; любое событие может изменить сцену
         for event in pygame.event.get():
+            self.scene_dirty = True
             if event.type == QUIT:
                 pygame.quit()
                 return
@@ -496,25 +563,108 @@ class Visualization3D(ttk.Frame):
             elif event.type == KEYDOWN:
                 if event.key == K_r:  # Клавиша R для сброса камеры
                     self.reset_camera()
+                elif self.replay is not None and self.handle_replay_key(event.key):
+                    pass
                 elif event.key == K_SPACE:  # Пробел для перераспределения целей
                     if self.drone_swarm:
                         self.drone_swarm.reassign_targets()
+                elif event.key == K_m:  # Клавиша M - режим максимальной скорости
+                    self.set_max_speed(not self.clock.max_speed)
 
-        # Обновление позиций дронов
+        # Обновление позиций дронов (несколько шагов физики за кадр);
+        # при симуляции в отдельном процессе берется последний готовый кадр
+        profiler = self.profiler
         if self.drone_swarm:
-            self.drone_swarm.update_positions()
-            self.drones = self.drone_swarm.get_drones()
-
-        # Отрисовка сцены
-        self.draw_scene()
+            if not self.in_background():
+                with profiler.phase("physics"):
+                    self.clock.run(self.physics_step)
+            with profiler.phase("get_state"):
+                self.set_state(self.drone_swarm.get_state())
+
+        # Отрисовка сцены, только если что-то изменилось
+        if self.scene_dirty:
+            with profiler.phase("draw_scene"):
+                self.draw_scene()
+            self.scene_dirty = False
 
         # Планирование следующего обновления
-        self.animation_id = self.after(16, self.update)
+        delay = 1 if self.clock.max_speed and not self.in_background() else 16
+        self.animation_id = self.after(delay, self.update)
+
+    def physics_step(self):
+        """Один шаг физики с записью кадра траектории"""
+        self.drone_swarm.update_positions()
+        if self.recorder is not None:
+            self.recorder.record(self.drone_swarm)
+
+    def start_recording(self, path):
+        """Начало записи траектории текущего роя"""
+        self.stop_recording()
+        if self.drone_swarm is None or self.replay is not None:
+            return
+        if self.in_background():
+            self.drone_swarm.start_recording(path)
+        else:
+            self.recorder = TrajectoryRecorder(path, len(self.drone_swarm.positions))
+
+    def stop_recording(self):
+        """Остановка записи траектории"""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.in_background():
+            self.drone_swarm.stop_recording()
+
+    def start_replay(self, path):
+        """Воспроизведение записанной траектории вместо симуляции"""
+        self.stop_recording()
+        self.replay = TrajectoryReplay(Trajectory(path))
+        self.set_drone_swarm(self.replay)
+        if self.replay.num_ticks > 0 and self.replay.trajectory.has_targets:
+            self.set_target_points(self.replay.trajectory.target_positions(0))
+        self.set_state(self.replay.get_state())
+        return self.replay
+
+    def stop_replay(self):
+        self.replay = None
+
+    def handle_replay_key(self, key):
+        """Управление воспроизведением; True, если клавиша обработана"""
+        if key == K_SPACE:  # Пауза / продолжение
+            self.replay.playing = not self.replay.playing
+        elif key == K_LEFT:  # Кадр назад
+            self.replay.playing = False
+            self.replay.seek(self.replay.tick - 1)
+        elif key == K_RIGHT:  # Кадр вперед
+            self.replay.playing = False
+            self.replay.seek(self.replay.tick + 1)
+        elif key == K_UP:  # Быстрее
+            self.replay.speed *= 2.0
+        elif key == K_DOWN:  # Медленнее
+            self.replay.speed /= 2.0
+        elif key == K_BACKSPACE:  # Обратное направление
+            self.replay.speed = -self.replay.speed
+        elif key == K_HOME:
+            self.replay.seek(0)
+        elif key == K_END:
+            self.replay.seek(self.replay.num_ticks - 1)
+        else:
+            return False
+        self.set_state(self.replay.get_state())
+        return True
+
+    def set_max_speed(self, enabled):
+        """Режим максимальной скорости: физика без привязки к реальному времени"""
+        self.clock.max_speed = enabled
+        self.clock.reset()
+        if self.in_background():
+            self.drone_swarm.set_max_speed(enabled)
 
     def reset_camera(self):
         """Сброс положения камеры к начальным значениям"""
         self.camera_distance = 200
         self.camera_rotation = [45, 45, 0]
+        self.scene_dirty = True
 
     def set_base_coordinates(self, latitude, longitude, altitude=0):
         """Установка базовых географических координат"""
@@ -527,4 +677,5 @@ class Visualization3D(ttk.Frame):
     def cleanup(self):
         """Очистка ресурсов при закрытии"""
         self.stop_animation()
+        self.stop_recording()
         pygame.quit()
\ No newline at end of file